@@ -0,0 +1,49 @@
+"""Content addressed files
+
+Revision ID: 3b67b54d7c68
+Revises: e3c908a46076
+Create Date: 2026-10-19 16:02:18.730145
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b67b54d7c68'
+down_revision: Union[str, None] = 'e3c908a46076'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('stored_files',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('path', sa.String(), nullable=False),
+    sa.Column('file_type', sa.String(), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('sha256'),
+    sa.UniqueConstraint('path')
+    )
+    op.create_table('file_references',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('item_type', sa.String(), nullable=False),
+    sa.Column('item_id', sa.Integer(), nullable=False),
+    sa.Column('field', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['sha256'], ['stored_files.sha256'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('sha256', 'item_type', 'item_id', 'field', name='_file_reference_uc')
+    )
+    op.create_index(op.f('ix_file_references_sha256'), 'file_references', ['sha256'], unique=False)
+    op.create_index('ix_file_references_item', 'file_references', ['item_type', 'item_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_file_references_item', table_name='file_references')
+    op.drop_index(op.f('ix_file_references_sha256'), table_name='file_references')
+    op.drop_table('file_references')
+    op.drop_table('stored_files')
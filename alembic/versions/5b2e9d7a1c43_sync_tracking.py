@@ -0,0 +1,55 @@
+"""Sync tracking
+
+Revision ID: 5b2e9d7a1c43
+Revises: c4fc1b4c32cf
+Create Date: 2026-10-19 09:12:41.218311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b2e9d7a1c43'
+down_revision: Union[str, None] = 'c4fc1b4c32cf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SYNCED_TABLES = ('hardware', 'software', 'books')
+
+
+def upgrade() -> None:
+    op.execute(sa.schema.CreateSequence(sa.Sequence('sync_version_seq')))
+
+    for table in SYNCED_TABLES:
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=True))
+        # The server default backfills existing rows so the first sync after the upgrade returns everything.
+        op.add_column(table, sa.Column('sync_version', sa.BigInteger(),
+                                       server_default=sa.text("nextval('sync_version_seq')"), nullable=True))
+        op.create_index(op.f(f'ix_{table}_sync_version'), table, ['sync_version'], unique=False)
+
+    op.create_table('sync_tombstones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('item_type', sa.String(), nullable=False),
+    sa.Column('item_id', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.Column('sync_version', sa.BigInteger(), server_default=sa.text("nextval('sync_version_seq')"), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_sync_tombstones_id'), 'sync_tombstones', ['id'], unique=False)
+    op.create_index(op.f('ix_sync_tombstones_sync_version'), 'sync_tombstones', ['sync_version'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_sync_tombstones_sync_version'), table_name='sync_tombstones')
+    op.drop_index(op.f('ix_sync_tombstones_id'), table_name='sync_tombstones')
+    op.drop_table('sync_tombstones')
+
+    for table in SYNCED_TABLES:
+        op.drop_index(op.f(f'ix_{table}_sync_version'), table_name=table)
+        op.drop_column(table, 'sync_version')
+        op.drop_column(table, 'updated_at')
+
+    op.execute(sa.schema.DropSequence(sa.Sequence('sync_version_seq')))
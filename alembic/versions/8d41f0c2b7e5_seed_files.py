@@ -0,0 +1,33 @@
+"""Seed files
+
+Revision ID: 8d41f0c2b7e5
+Revises: 3b67b54d7c68
+Create Date: 2026-10-19 18:12:40.215873
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d41f0c2b7e5'
+down_revision: Union[str, None] = '3b67b54d7c68'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('seed_files',
+    sa.Column('filename', sa.String(), nullable=False),
+    sa.Column('checksum', sa.String(length=64), nullable=False),
+    sa.Column('statements', sa.Integer(), nullable=False),
+    sa.Column('duration_ms', sa.Float(), nullable=True),
+    sa.Column('applied_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('filename')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('seed_files')
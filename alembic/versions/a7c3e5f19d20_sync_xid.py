@@ -0,0 +1,48 @@
+"""Sync transaction ids
+
+Revision ID: a7c3e5f19d20
+Revises: 8d41f0c2b7e5
+Create Date: 2026-10-19 21:04:11.532907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e5f19d20'
+down_revision: Union[str, None] = '8d41f0c2b7e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SYNCED_TABLES = ('hardware', 'software', 'books', 'sync_tombstones')
+
+
+def upgrade() -> None:
+    # a trigger rather than a column default, so every write records its transaction, ORM or not
+    op.execute("""
+        CREATE FUNCTION set_sync_xid() RETURNS trigger AS $$
+        BEGIN
+            NEW.sync_xid := pg_current_xact_id()::text::bigint;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+
+    for table in SYNCED_TABLES:
+        op.add_column(table, sa.Column('sync_xid', sa.BigInteger(), nullable=True))
+        op.execute(f"UPDATE {table} SET sync_xid = pg_current_xact_id()::text::bigint")
+        op.create_index(op.f(f'ix_{table}_sync_xid'), table, ['sync_xid'], unique=False)
+        op.execute(f"CREATE TRIGGER {table}_sync_xid BEFORE INSERT OR UPDATE ON {table} "
+                   "FOR EACH ROW EXECUTE FUNCTION set_sync_xid()")
+
+
+def downgrade() -> None:
+    for table in SYNCED_TABLES:
+        op.execute(f"DROP TRIGGER {table}_sync_xid ON {table}")
+        op.drop_index(op.f(f'ix_{table}_sync_xid'), table_name=table)
+        op.drop_column(table, 'sync_xid')
+
+    op.execute("DROP FUNCTION set_sync_xid()")
@@ -0,0 +1,97 @@
+"""Backfill file references
+
+Revision ID: c52d8e4a9b17
+Revises: a7c3e5f19d20
+Create Date: 2026-10-20 10:41:27.118204
+
+"""
+import hashlib
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c52d8e4a9b17'
+down_revision: Union[str, None] = 'a7c3e5f19d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# as of this revision; the upload directories are relative to the app directory, where run.sh runs alembic
+UPLOAD_DIRS = {'doc': os.path.join("uploads", "documents"), 'img': os.path.join("uploads", "images")}
+FILE_FIELDS = {'hardware': ('photos', 'user_manual', 'invoice'), 'software': ('photo',)}
+CHUNK_SIZE = 1024 * 1024
+
+
+def _upload_name(value: str) -> str:
+    return os.path.basename(value.split("?", 1)[0].rstrip("/"))
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _register_legacy_file(conn, name: str, known_hashes):
+    """Records a pre content addressing upload under its old name; returns its hash, or None if it is not on disk."""
+    for file_type, directory in UPLOAD_DIRS.items():
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            sha256 = _file_sha256(path)
+            if sha256 not in known_hashes:
+                conn.execute(sa.text("INSERT INTO stored_files (sha256, path, file_type, size) "
+                                     "VALUES (:sha256, :path, :file_type, :size) ON CONFLICT DO NOTHING"),
+                             {"sha256": sha256, "path": path, "file_type": file_type, "size": os.path.getsize(path)})
+                known_hashes.add(sha256)
+            return sha256
+    return None
+
+
+def backfill_file_references(conn):
+    """
+    Links every item to the files its fields name, whatever form the path is in, and registers the legacy uploads
+    they use. After this, file cleanup decides orphans from file_references alone.
+    """
+    stored = conn.execute(sa.text("SELECT path, sha256 FROM stored_files")).all()
+    hashes_by_name = {os.path.basename(path): sha256 for path, sha256 in stored}
+    known_hashes = {sha256 for _, sha256 in stored}
+
+    references, missing = set(), set()
+    for item_type, fields in FILE_FIELDS.items():
+        rows = conn.execute(sa.text(f"SELECT id, {', '.join(fields)} FROM {item_type}")).mappings().all()
+        for row in rows:
+            for field in fields:
+                for value in (row[field] or '').split(','):
+                    name = _upload_name(value.strip())
+                    if not name or name in missing:
+                        continue
+                    # by the stored path's name, or by the hash a content addressed name carries
+                    stem = name.split(".", 1)[0]
+                    sha256 = hashes_by_name.get(name) or (stem if stem in known_hashes else None)
+                    if sha256 is None:
+                        sha256 = _register_legacy_file(conn, name, known_hashes)
+                        if sha256 is None:
+                            missing.add(name)
+                            continue
+                        hashes_by_name[name] = sha256
+                    references.add((sha256, item_type, row['id'], field))
+
+    if references:
+        conn.execute(sa.text("INSERT INTO file_references (sha256, item_type, item_id, field) "
+                             "VALUES (:sha256, :item_type, :item_id, :field) ON CONFLICT DO NOTHING"),
+                     [{"sha256": sha256, "item_type": item_type, "item_id": item_id, "field": field}
+                      for sha256, item_type, item_id, field in references])
+
+
+def upgrade() -> None:
+    backfill_file_references(op.get_bind())
+
+
+def downgrade() -> None:
+    # the references are what the application maintains anyway, there is nothing to undo
+    pass
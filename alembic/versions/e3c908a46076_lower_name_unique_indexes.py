@@ -0,0 +1,54 @@
+"""Lower name unique indexes
+
+Revision ID: e3c908a46076
+Revises: 5b2e9d7a1c43
+Create Date: 2026-10-19 14:37:05.512904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3c908a46076'
+down_revision: Union[str, None] = '5b2e9d7a1c43'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# lookup table -> (table, column) pairs pointing at it
+NAME_TABLES = {
+    'hardware_brand': [('hardware', 'brand_id')],
+    'hardware_category': [('hardware', 'category_id'), ('component_type', 'hardware_category_id')],
+    'software_category': [('software', 'category_id')],
+    'software_publisher': [('software', 'publisher_id')],
+    'software_developer': [('software', 'developer_id')],
+    'software_platform': [('software', 'platform_id')],
+    'software_type': [('software', 'media_type_id')],
+}
+SYNCED_TABLES = ('hardware', 'software')
+
+DUPLICATES = "SELECT id, min(id) OVER (PARTITION BY lower(name)) AS keep_id FROM {table} WHERE name IS NOT NULL"
+
+
+def _merge_duplicates(table, references):
+    # Names differing only in case are merged into the oldest row before the unique index can be built.
+    duplicates = DUPLICATES.format(table=table)
+    for ref_table, column in references:
+        # Raw updates skip the ORM onupdate, bump the sync version by hand so clients pick up the new reference.
+        bump = ", sync_version = nextval('sync_version_seq'), updated_at = now()" if ref_table in SYNCED_TABLES else ""
+        op.execute(f"UPDATE {ref_table} SET {column} = d.keep_id{bump} FROM ({duplicates}) AS d "
+                   f"WHERE {ref_table}.{column} = d.id AND d.id <> d.keep_id")
+    op.execute(f"DELETE FROM {table} USING ({duplicates}) AS d WHERE {table}.id = d.id AND d.id <> d.keep_id")
+
+
+def upgrade() -> None:
+    for table, references in NAME_TABLES.items():
+        _merge_duplicates(table, references)
+        op.create_index(f'ix_{table}_name_lower', table, [sa.text('lower(name)')], unique=True)
+
+
+def downgrade() -> None:
+    for table in NAME_TABLES:
+        op.drop_index(f'ix_{table}_name_lower', table_name=table)
@@ -0,0 +1,82 @@
+"""Google Books stub server module
+
+A stand-in for the Google Books volumes API, so ISBN autofill can be exercised and benchmarked without network
+access or quota:
+
+    python -m benchmarks.books_stub --port 8099 --latency-ms 150 --failure-rate 0.1
+    GOOGLE_BOOKS_URL=http://127.0.0.1:8099/books/v1/volumes uvicorn main:app
+
+ISBNs ending in 0 are reported as unknown, the key "invalid" gets a 400 like Google does for a bad key, and
+--failure-rate answers that share of requests with a 503 to exercise the client's retries.
+"""
+import argparse
+import asyncio
+import random
+
+import uvicorn
+from fastapi import FastAPI, Query
+from fastapi.responses import JSONResponse
+
+app = FastAPI()
+app.state.latency_ms = 0
+app.state.failure_rate = 0.0
+app.state.requests = 0
+
+
+def _volume(isbn: str):
+    return {
+        "volumeInfo": {
+            "title": f"Stub Book {isbn}",
+            "subtitle": "Served by benchmarks.books_stub",
+            "authors": ["Stub Author"],
+            "publisher": "Stub Press",
+            "publishedDate": "2001",
+            "description": "A book that only exists on the stub server.",
+            "categories": ["Testing"],
+            "printType": "BOOK",
+            "maturityRating": "NOT_MATURE",
+            "industryIdentifiers": [
+                {"type": "ISBN_13", "identifier": isbn if len(isbn) == 13 else f"978{isbn[:9]}0"},
+                {"type": "ISBN_10", "identifier": isbn if len(isbn) == 10 else isbn[3:]},
+            ],
+        }
+    }
+
+
+@app.get("/books/v1/volumes")
+async def volumes(q: str = Query(...), key: str = Query(None)):
+    app.state.requests += 1
+    if app.state.latency_ms:
+        await asyncio.sleep(app.state.latency_ms / 1000)
+
+    if key == "invalid":
+        return JSONResponse(status_code=400, content={"error": {"code": 400, "message": "API key not valid."}})
+    if random.random() < app.state.failure_rate:
+        return JSONResponse(status_code=503, content={"error": {"code": 503, "message": "Backend Error"}})
+
+    isbn = q.removeprefix("isbn:")
+    if isbn.endswith("0"):
+        return {"kind": "books#volumes", "totalItems": 0}
+    return {"kind": "books#volumes", "totalItems": 1, "items": [_volume(isbn)]}
+
+
+@app.get("/stats")
+async def stats():
+    return {"requests": app.state.requests}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local Google Books stub")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency-ms', type=int, default=0)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    app.state.latency_ms = args.latency_ms
+    app.state.failure_rate = args.failure_rate
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == '__main__':
+    main()
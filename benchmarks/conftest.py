@@ -0,0 +1,41 @@
+"""Fixtures for the micro-benchmark suite (pytest benchmarks)
+
+Without BENCHMARK_DATABASE_URL a temporary SQLite database is created and seeded with benchmarks.seed up to the largest
+benchmarked size, so no services are needed. A given database, e.g. a seeded PostgreSQL, is used as-is and must
+already hold enough rows.
+"""
+import os
+import shutil
+import tempfile
+
+import pytest
+
+# rows seeded per item type, enough for the largest size in test_micro.BENCHMARK_SIZES
+BENCHMARK_ROWS = 10000
+BENCHMARK_DATABASE_URL = os.getenv("BENCHMARK_DATABASE_URL")
+
+# database.py builds the engine at import time, so the URL has to be in place before anything imports it
+_temp_dir = None
+if BENCHMARK_DATABASE_URL:
+    os.environ['SQLALCHEMY_DATABASE_URL'] = BENCHMARK_DATABASE_URL
+else:
+    _temp_dir = tempfile.mkdtemp(prefix='mancave-micro-')
+    os.environ['SQLALCHEMY_DATABASE_URL'] = f"sqlite:///{os.path.join(_temp_dir, 'micro.db')}"
+
+
+@pytest.fixture(scope='session')
+def db():
+    import database
+    import models  # noqa: F401 - registers the tables on Base
+    from benchmarks.seed import seed
+
+    if _temp_dir:
+        database.Base.metadata.create_all(database.engine)
+        seed(hardware=BENCHMARK_ROWS, software=BENCHMARK_ROWS, books=BENCHMARK_ROWS)
+
+    session = database.SessionLocal()
+    yield session
+    session.close()
+    database.engine.dispose()
+    if _temp_dir:
+        shutil.rmtree(_temp_dir, ignore_errors=True)
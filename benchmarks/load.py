@@ -0,0 +1,296 @@
+"""Load benchmark module
+
+Drives the main read and write endpoints at a fixed concurrency and reports latency percentiles, throughput and
+SQL query counts (taken from the Server-Timing header) as JSON:
+
+    python -m benchmarks.load --requests 500 --concurrency 10 --output bench.json
+    python -m benchmarks.load --base-url http://127.0.0.1:3131 --baseline bench.json
+
+Without --base-url the app runs in-process through httpx's ASGI transport, including its lifespan, so Postgres
+and Redis from .env must be reachable. Query parameters are picked from the same database.
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import subprocess
+import sys
+import time
+from datetime import timedelta
+
+import httpx
+from sqlalchemy.orm import sessionmaker
+
+import database
+from models import Users, Hardware, Software, SoftwarePlatform, Books, HardwareBrand, ComponentType, \
+    SoftwareCategory, SoftwarePublisher, SoftwareDeveloper, Location
+
+Session = sessionmaker(bind=database.engine)
+
+QUERY_COUNT_PATTERN = re.compile(r'desc="(\d+) queries"')
+DEFAULT_MAX_REGRESSION = 10.0
+
+
+def _percentile(values, percent):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _first_id(session, model):
+    return session.query(model.id).order_by(model.id).limit(1).scalar()
+
+
+def load_fixtures(rng):
+    """Collects ids and names from the database so every scenario hits existing rows."""
+    session = Session()
+    try:
+        admin = session.query(Users).filter(Users.is_admin.is_(True)).order_by(Users.id).first()
+        if admin is None:
+            raise SystemExit("No admin user found, run /admin/first_run on the benchmark database first")
+
+        component_type = session.query(ComponentType).first()
+        return {
+            'admin': (admin.username, admin.id),
+            'hardware_ids': [row_id for (row_id,) in session.query(Hardware.id).limit(5000)],
+            'software_ids': [row_id for (row_id,) in session.query(Software.id).limit(5000)],
+            'book_ids': [row_id for (row_id,) in session.query(Books.id).limit(5000)],
+            'platforms': [name for (name,) in session.query(SoftwarePlatform.name)],
+            'book_titles': [title.split()[0] for (title,) in session.query(Books.title).limit(1000) if title],
+            'models': [model.split()[0] for (model,) in session.query(Hardware.model).limit(1000) if model],
+            'hardware_refs': {
+                'category_id': component_type.hardware_category_id if component_type else None,
+                'component_type_id': component_type.id if component_type else None,
+                'brand_id': _first_id(session, HardwareBrand),
+            },
+            'software_refs': {
+                'category_id': _first_id(session, SoftwareCategory),
+                'publisher_id': _first_id(session, SoftwarePublisher),
+                'developer_id': _first_id(session, SoftwareDeveloper),
+                'platform_id': _first_id(session, SoftwarePlatform),
+            },
+            'location_id': _first_id(session, Location),
+            'rng': rng,
+        }
+    finally:
+        session.close()
+
+
+def _hardware_payload(fx):
+    return {**fx['hardware_refs'], 'model': f"Bench {fx['rng'].randint(0, 10 ** 6)}", 'condition': 'Used',
+            'quantity': 1, 'is_new': False, 'tags': ['bench'], 'location_id': fx['location_id']}
+
+
+def _software_payload(fx):
+    return {**fx['software_refs'], 'name': f"Bench {fx['rng'].randint(0, 10 ** 6)}", 'tags': ['bench'],
+            'location_id': fx['location_id']}
+
+
+# name -> (method, build(fixtures) -> (path, params, json body)); every scenario runs on its own
+SCENARIOS = {
+    'hardware_get_all': ('GET', lambda fx: ('/hardware/get_all', None, None)),
+    'hardware_get_by_id': ('GET', lambda fx: ('/hardware/get_by_id/',
+                                              {'hw_id': fx['rng'].choice(fx['hardware_ids'])}, None)),
+    'hardware_search': ('GET', lambda fx: ('/hardware/search/', {'model': fx['rng'].choice(fx['models'])}, None)),
+    'software_get_all': ('GET', lambda fx: ('/software/get_all', None, None)),
+    'software_get_by_id': ('GET', lambda fx: (f"/software/get_by_id/{fx['rng'].choice(fx['software_ids'])}",
+                                              None, None)),
+    'software_get_all_by_platform': ('GET', lambda fx: ('/software/get_all_by_platform',
+                                                        {'platform_name': fx['rng'].choice(fx['platforms'])}, None)),
+    'books_get_by_id': ('GET', lambda fx: (f"/books/get_by_id/{fx['rng'].choice(fx['book_ids'])}", None, None)),
+    'books_search': ('GET', lambda fx: ('/books/search/', {'title': fx['rng'].choice(fx['book_titles'])}, None)),
+    'tags_get_all': ('GET', lambda fx: ('/tags/get_all', {'tag_type': 'hardware'}, None)),
+    'location_all': ('GET', lambda fx: ('/location/all', None, None)),
+    'sync_full': ('GET', lambda fx: ('/sync', {'limit': 500}, None)),
+    'hardware_add': ('POST', lambda fx: ('/hardware/add', None, _hardware_payload(fx))),
+    'hardware_update': ('PUT', lambda fx: (f"/hardware/update/{fx['rng'].choice(fx['hardware_ids'])}", None,
+                                           _hardware_payload(fx))),
+    'software_add': ('POST', lambda fx: ('/software/add', None, _software_payload(fx))),
+}
+
+# fixture lists a scenario can't run without
+SCENARIO_REQUIRES = {
+    'hardware_get_by_id': 'hardware_ids', 'hardware_search': 'models', 'hardware_update': 'hardware_ids',
+    'software_get_by_id': 'software_ids', 'software_get_all_by_platform': 'platforms',
+    'books_get_by_id': 'book_ids', 'books_search': 'book_titles',
+}
+
+
+async def run_scenario(client, name, fixtures, requests: int, concurrency: int, warmup: int):
+    method, build = SCENARIOS[name]
+    latencies, queries, statuses = [], [], {}
+
+    async def send(record: bool):
+        path, params, body = build(fixtures)
+        start = time.perf_counter()
+        response = await client.request(method, path, params=params, json=body)
+        await response.aread()
+        elapsed = time.perf_counter() - start
+        if not record:
+            return
+        latencies.append(elapsed * 1000)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        match = QUERY_COUNT_PATTERN.search(response.headers.get('server-timing', ''))
+        if match:
+            queries.append(int(match.group(1)))
+
+    for _ in range(warmup):
+        await send(False)
+
+    remaining = [requests]
+
+    async def worker():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            await send(True)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+
+    errors = sum(count for code, count in statuses.items() if code >= 400)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'statuses': {str(code): count for code, count in sorted(statuses.items())},
+        'throughput_rps': round(len(latencies) / wall, 1) if wall else None,
+        'mean_ms': round(sum(latencies) / len(latencies), 2) if latencies else None,
+        'p50_ms': round(_percentile(latencies, 50), 2) if latencies else None,
+        'p95_ms': round(_percentile(latencies, 95), 2) if latencies else None,
+        'p99_ms': round(_percentile(latencies, 99), 2) if latencies else None,
+        'max_ms': round(max(latencies), 2) if latencies else None,
+        'queries_p50': _percentile(queries, 50),
+        'queries_max': max(queries) if queries else None,
+    }
+
+
+async def _run_all(client, scenarios, fixtures, requests: int, concurrency: int, warmup: int):
+    results = {}
+    for name in scenarios:
+        required = SCENARIO_REQUIRES.get(name)
+        if required and not fixtures[required]:
+            results[name] = {'skipped': f"no {required} in the database"}
+            continue
+        results[name] = await run_scenario(client, name, fixtures, requests, concurrency, warmup)
+    return results
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+async def run(base_url, scenarios, requests: int, concurrency: int, warmup: int, seed_value: int):
+    from routers.auth import create_access_token
+
+    fixtures = load_fixtures(random.Random(seed_value))
+    username, user_id = fixtures['admin']
+    token = create_access_token(username, user_id, True, timedelta(hours=1))
+    headers = {'Authorization': f"Bearer {token}"}
+
+    if base_url:
+        async with httpx.AsyncClient(base_url=base_url, headers=headers, timeout=60) as client:
+            results = await _run_all(client, scenarios, fixtures, requests, concurrency, warmup)
+    else:
+        import main
+        transport = httpx.ASGITransport(app=main.app)
+        async with main.app.router.lifespan_context(main.app):
+            async with httpx.AsyncClient(transport=transport, base_url='http://bench', headers=headers,
+                                         timeout=60) as client:
+                results = await _run_all(client, scenarios, fixtures, requests, concurrency, warmup)
+
+    return {
+        'meta': {
+            'revision': _git_revision(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'target': base_url or 'in-process',
+            'requests': requests,
+            'concurrency': concurrency,
+            'warmup': warmup,
+            'seed': seed_value,
+            'dataset': {
+                'hardware': len(fixtures['hardware_ids']),
+                'software': len(fixtures['software_ids']),
+                'books': len(fixtures['book_ids']),
+            },
+        },
+        'results': results,
+    }
+
+
+def compare(report, baseline, max_regression: float):
+    """
+    Prints p50/p95/throughput deltas against a stored report and returns the scenarios whose p95 got worse
+    by more than max_regression percent.
+    """
+    regressions = []
+    for name, result in report['results'].items():
+        previous = baseline.get('results', {}).get(name)
+        if 'skipped' in result:
+            continue
+        if not previous or not previous.get('p95_ms') or result.get('p95_ms') is None:
+            print(f"{name:32} no baseline")
+            continue
+        deltas = {}
+        for metric in ('p50_ms', 'p95_ms', 'throughput_rps'):
+            if previous.get(metric):
+                deltas[metric] = (result[metric] - previous[metric]) / previous[metric] * 100
+        print(f"{name:32} p50 {result['p50_ms']:>9.2f}ms ({deltas.get('p50_ms', 0):+6.1f}%)  "
+              f"p95 {result['p95_ms']:>9.2f}ms ({deltas.get('p95_ms', 0):+6.1f}%)  "
+              f"rps {result['throughput_rps']:>8.1f} ({deltas.get('throughput_rps', 0):+6.1f}%)  "
+              f"queries {result['queries_p50']} (was {previous.get('queries_p50')})")
+        if deltas.get('p95_ms', 0) > max_regression:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Mancaveman load benchmark")
+    parser.add_argument('--base-url', help="Benchmark a running server instead of the in-process app")
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help="Scenario to run, repeatable (default: all)")
+    parser.add_argument('--requests', type=int, default=200, help="Measured requests per scenario")
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--warmup', type=int, default=10, help="Unmeasured requests per scenario")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write the JSON report to this file")
+    parser.add_argument('--baseline', help="Compare against a previous JSON report")
+    parser.add_argument('--max-regression', type=float, default=DEFAULT_MAX_REGRESSION,
+                        help="Fail when a scenario's p95 is this many percent slower than the baseline")
+    parser.add_argument('--reads-only', action='store_true', help="Skip the scenarios that write to the database")
+    args = parser.parse_args()
+
+    scenarios = args.scenario or list(SCENARIOS)
+    if args.reads_only:
+        scenarios = [name for name in scenarios if SCENARIOS[name][0] == 'GET']
+
+    report = asyncio.run(run(args.base_url, scenarios, args.requests, args.concurrency, args.warmup, args.seed))
+
+    skipped = [name for name, result in report['results'].items() if 'skipped' in result]
+    if skipped:
+        print(f"Skipped scenarios: {', '.join(skipped)}", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output)
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(report, baseline, args.max_regression)
+        if regressions:
+            print(f"p95 regressed by more than {args.max_regression}%: {', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
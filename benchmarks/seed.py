@@ -0,0 +1,234 @@
+"""Synthetic dataset generator module
+
+Fills the database pointed to by SQLALCHEMY_DATABASE_URL with a reproducible inventory for benchmarking:
+
+    python -m benchmarks.seed --hardware 10000 --software 10000 --books 5000 --seed 42
+
+Reference data (categories, component types, brands, publishers...) comes from sql/components, so run it
+against a dedicated database, never the live one.
+"""
+import argparse
+import json
+import random
+import time
+
+from sqlalchemy import func, insert
+from sqlalchemy.orm import sessionmaker
+
+import database
+from models import Hardware, HardwareBrand, ComponentType, Software, SoftwareCategory, SoftwarePublisher, \
+    SoftwareDeveloper, SoftwarePlatform, SoftwareMediaType, Books, BookAuthor, BookCategory, BookAuthorAssociation, \
+    BookCategoryAssociation, Tag, HardwareTag, SoftwareTag, Location, ItemLocation
+from tools.config_manager import inject_sql_data
+
+Session = sessionmaker(bind=database.engine)
+
+BATCH_SIZE = 1000
+CONDITIONS = ['New', 'Mint', 'Used', 'Untested', 'Faulty']
+PRINT_TYPES = ['BOOK', 'MAGAZINE']
+WORDS = ['alpha', 'beta', 'gamma', 'delta', 'turbo', 'ultra', 'mini', 'mega', 'retro', 'pro', 'classic', 'deluxe',
+         'edition', 'series', 'gold', 'silver', 'plus', 'max', 'lite', 'zero', 'prime', 'nova', 'titan', 'pixel']
+
+
+def _name(rng, words=3):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).title()
+
+
+def _insert(session, model, rows):
+    ids = []
+    for start in range(0, len(rows), BATCH_SIZE):
+        batch = rows[start:start + BATCH_SIZE]
+        ids.extend(session.execute(insert(model).returning(model.id), batch).scalars().all())
+    return ids
+
+
+def _insert_plain(session, model, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        session.execute(insert(model), rows[start:start + BATCH_SIZE])
+
+
+def _ids(session, model):
+    return [row_id for (row_id,) in session.query(model.id).order_by(model.id)]
+
+
+def ensure_reference_data(session):
+    if session.query(func.count(ComponentType.id)).scalar() == 0:
+        # 1xx files are software lookups, 2xx are hardware categories, component types and brands
+        inject_sql_data(['1', '2'])
+    session.expire_all()
+
+
+def seed_locations(session, rng, depth: int, breadth: int):
+    location_ids = []
+    parents = [None]
+    for level in range(depth):
+        rows = [{'name': f"Bench L{level} {_name(rng, 1)} {index}", 'parent_id': parent}
+                for parent in parents for index in range(breadth)]
+        parents = _insert(session, Location, rows)
+        location_ids.extend(parents)
+    return location_ids
+
+
+def seed_tags(session, rng, count: int, tag_type: str):
+    rows = [{'name': f"{tag_type}-{_name(rng, 1).lower()}-{index}", 'tag_type': tag_type} for index in range(count)]
+    return _insert(session, Tag, rows)
+
+
+def _seed_item_links(session, rng, item_type, item_ids, location_ids, tag_model, tag_column, tag_ids):
+    _insert_plain(session, ItemLocation, [
+        {'item_id': item_id, 'item_type': item_type, 'location_id': rng.choice(location_ids)} for item_id in item_ids])
+    if tag_ids:
+        _insert_plain(session, tag_model, [
+            {tag_column: item_id, 'tag_id': tag_id}
+            for item_id in item_ids for tag_id in rng.sample(tag_ids, rng.randint(0, min(3, len(tag_ids))))])
+
+
+def seed_hardware(session, rng, count: int, location_ids, tag_ids):
+    component_types = session.query(ComponentType.id, ComponentType.hardware_category_id).all()
+    brand_ids = _ids(session, HardwareBrand)
+    rows = []
+    for index in range(count):
+        component_type_id, category_id = rng.choice(component_types)
+        rows.append({
+            'category_id': category_id,
+            'component_type_id': component_type_id,
+            'brand_id': rng.choice(brand_ids),
+            'model': f"{_name(rng)} {rng.randint(100, 9999)}",
+            'condition': rng.choice(CONDITIONS),
+            'quantity': rng.randint(1, 5),
+            'is_new': rng.random() < 0.2,
+            'purchase_date': f"20{rng.randint(0, 24):02d}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            'purchased_from': rng.choice(['eBay', 'Amazon', 'Local shop', 'Car boot sale', None]),
+            'barcode': f"HW{index:08d}",
+            'notes': _name(rng, 8) if rng.random() < 0.5 else None,
+            'position': f"Shelf {rng.randint(1, 20)}",
+        })
+    hardware_ids = _insert(session, Hardware, rows)
+    _seed_item_links(session, rng, 'hardware', hardware_ids, location_ids, HardwareTag, 'hardware_id', tag_ids)
+    return hardware_ids
+
+
+def seed_software(session, rng, count: int, location_ids, tag_ids):
+    category_ids = _ids(session, SoftwareCategory)
+    publisher_ids = _ids(session, SoftwarePublisher)
+    developer_ids = _ids(session, SoftwareDeveloper)
+    platform_ids = _ids(session, SoftwarePlatform)
+    media_type_ids = _ids(session, SoftwareMediaType)
+    rows = [{
+        'category_id': rng.choice(category_ids),
+        'name': f"{_name(rng)} {rng.randint(1, 9)}",
+        'publisher_id': rng.choice(publisher_ids),
+        'developer_id': rng.choice(developer_ids),
+        'platform_id': rng.choice(platform_ids),
+        'year': rng.randint(1980, 2025),
+        'barcode': f"SW{index:08d}",
+        'media_type_id': rng.choice(media_type_ids),
+        'media_count': rng.randint(1, 6),
+        'condition': rng.choice(CONDITIONS),
+        'multiple_copies': False,
+        'image_backups': rng.random() < 0.3,
+        'notes': _name(rng, 8) if rng.random() < 0.5 else None,
+        'position': f"Box {rng.randint(1, 50)}",
+    } for index in range(count)]
+    software_ids = _insert(session, Software, rows)
+    _seed_item_links(session, rng, 'software', software_ids, location_ids, SoftwareTag, 'software_id', tag_ids)
+    return software_ids
+
+
+def seed_books(session, rng, count: int, location_ids, authors: int, categories: int):
+    author_ids = _insert(session, BookAuthor, [{'name': f"{_name(rng, 2)} {index}"} for index in range(authors)])
+    category_ids = _insert(session, BookCategory,
+                           [{'name': f"{_name(rng, 1)} {index}"} for index in range(categories)])
+    rows = [{
+        'isbn_10': f"{index:010d}",
+        'isbn_13': f"979{index:010d}",
+        'title': _name(rng, 4),
+        'subtitle': _name(rng, 3) if rng.random() < 0.3 else None,
+        'publisher': f"{rng.choice(WORDS).title()} Press",
+        'published_date': str(rng.randint(1950, 2025)),
+        'description': _name(rng, 40),
+        'print_type': rng.choice(PRINT_TYPES),
+        'maturity_rating': 'NOT_MATURE',
+        'condition': rng.choice(CONDITIONS),
+        'position': f"Bookcase {rng.randint(1, 10)}",
+    } for index in range(count)]
+    book_ids = _insert(session, Books, rows)
+
+    _insert_plain(session, BookAuthorAssociation, [
+        {'book_id': book_id, 'author_id': author_id}
+        for book_id in book_ids for author_id in rng.sample(author_ids, rng.randint(1, min(3, len(author_ids))))])
+    _insert_plain(session, BookCategoryAssociation, [
+        {'book_id': book_id, 'book_category_id': category_id}
+        for book_id in book_ids for category_id in rng.sample(category_ids, rng.randint(1, min(2, len(category_ids))))])
+    _insert_plain(session, ItemLocation, [
+        {'item_id': book_id, 'item_type': 'book', 'location_id': rng.choice(location_ids)} for book_id in book_ids])
+    return book_ids
+
+
+def seed(hardware: int = 1000, software: int = 1000, books: int = 500, tags: int = 50,
+         location_depth: int = 3, location_breadth: int = 4, authors: int = 300, book_categories: int = 40,
+         seed_value: int = 42):
+    """
+    Seeds the configured database and returns the number of rows created per table.
+    The same arguments and seed always produce the same dataset on an empty database.
+    """
+    rng = random.Random(seed_value)
+    session = Session()
+    timings = {}
+    try:
+        start = time.perf_counter()
+        ensure_reference_data(session)
+        location_ids = seed_locations(session, rng, location_depth, location_breadth)
+        hardware_tag_ids = seed_tags(session, rng, tags, 'hardware')
+        software_tag_ids = seed_tags(session, rng, tags, 'software')
+        timings['reference_seconds'] = round(time.perf_counter() - start, 2)
+
+        start = time.perf_counter()
+        hardware_ids = seed_hardware(session, rng, hardware, location_ids, hardware_tag_ids)
+        timings['hardware_seconds'] = round(time.perf_counter() - start, 2)
+
+        start = time.perf_counter()
+        software_ids = seed_software(session, rng, software, location_ids, software_tag_ids)
+        timings['software_seconds'] = round(time.perf_counter() - start, 2)
+
+        start = time.perf_counter()
+        book_ids = seed_books(session, rng, books, location_ids, authors, book_categories)
+        timings['books_seconds'] = round(time.perf_counter() - start, 2)
+
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+    return {
+        'hardware': len(hardware_ids),
+        'software': len(software_ids),
+        'books': len(book_ids),
+        'tags': len(hardware_tag_ids) + len(software_tag_ids),
+        'locations': len(location_ids),
+        'timings': timings,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a benchmark database with a synthetic inventory")
+    parser.add_argument('--hardware', type=int, default=1000)
+    parser.add_argument('--software', type=int, default=1000)
+    parser.add_argument('--books', type=int, default=500)
+    parser.add_argument('--tags', type=int, default=50, help="Tags per item type")
+    parser.add_argument('--location-depth', type=int, default=3)
+    parser.add_argument('--location-breadth', type=int, default=4)
+    parser.add_argument('--authors', type=int, default=300)
+    parser.add_argument('--book-categories', type=int, default=40)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    result = seed(args.hardware, args.software, args.books, args.tags, args.location_depth, args.location_breadth,
+                  args.authors, args.book_categories, args.seed)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""Micro-benchmarks for the response formatters and the response cache encoding
+
+Times format_hardware_response, format_software_response and format_book_response, and the orjson + gzip encoding
+cache_response stores for cache:all_hardware and cache:all_software, at 100, 1k and 10k rows. Next to the timings,
+benchmark.extra_info carries the time per row, SQL queries per row and peak allocations (tracemalloc):
+
+    pytest benchmarks
+    pytest benchmarks -k hardware --benchmark-json micro.json
+    pytest benchmarks --benchmark-compare        # against the last --benchmark-autosave run
+
+Run it on its own, not together with tests/, which uses a different database.
+"""
+import tracemalloc
+
+import pytest
+from sqlalchemy.orm import joinedload
+
+from models import Hardware, Software, Books
+from routers.books import format_book_response
+from routers.hardware import format_hardware_response
+from routers.software import format_software_response
+from tools.cache import encode_cache_entry, decode_cache_entry
+from tools.common import detail_options
+from tools.request_stats import count_queries
+
+BENCHMARK_SIZES = (100, 1000, 10000)
+ROUNDS = 3
+
+
+# the same eager loads the get_all endpoints use (detail=full), so the numbers match what a request pays
+def _load_hardware(db, rows):
+    return (db.query(Hardware)
+            .options(joinedload(Hardware.brand), joinedload(Hardware.category), *detail_options())
+            .order_by(Hardware.id).limit(rows).all())
+
+
+def _load_software(db, rows):
+    return (db.query(Software)
+            .options(joinedload(Software.category), joinedload(Software.publisher), joinedload(Software.developer),
+                     joinedload(Software.platform), joinedload(Software.media_type), *detail_options())
+            .order_by(Software.id).limit(rows).all())
+
+
+def _load_books(db, rows):
+    return db.query(Books).options(*detail_options()).order_by(Books.id).limit(rows).all()
+
+
+FORMATTERS = {
+    'hardware': (_load_hardware, format_hardware_response),
+    'software': (_load_software, format_software_response),
+    'books': (_load_books, format_book_response),
+}
+
+
+def _load(db, kind: str, rows: int):
+    models = FORMATTERS[kind][0](db, rows)
+    if len(models) < rows:
+        pytest.skip(f"{kind}: only {len(models)} rows available")
+    return models
+
+
+def _measure(benchmark, func, rows: int):
+    """Times func, then adds the query count and peak allocation of one more, traced run to extra_info."""
+    result = benchmark.pedantic(func, rounds=ROUNDS, iterations=1)
+
+    tracemalloc.start()
+    try:
+        with count_queries() as stats:
+            func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    benchmark.extra_info.update({
+        'rows': rows,
+        'queries': stats['queries'],
+        'queries_per_row': round(stats['queries'] / rows, 2),
+        'peak_kib': round(peak / 1024, 1),
+        'peak_bytes_per_row': round(peak / rows),
+    })
+    if benchmark.stats:
+        benchmark.extra_info['per_row_us'] = round(benchmark.stats.stats.min / rows * 1_000_000, 2)
+    return result
+
+
+@pytest.fixture(scope='module')
+def formatted(db):
+    """Formatter output per (kind, rows), the input of the cache benchmarks."""
+    results = {}
+
+    def get(kind: str, rows: int):
+        if (kind, rows) not in results:
+            formatter = FORMATTERS[kind][1]
+            results[kind, rows] = [formatter(model, db) for model in _load(db, kind, rows)]
+            db.expunge_all()
+        return results[kind, rows]
+    return get
+
+
+@pytest.mark.parametrize('rows', BENCHMARK_SIZES)
+@pytest.mark.parametrize('kind', list(FORMATTERS))
+def test_formatter(benchmark, db, kind, rows):
+    models = _load(db, kind, rows)
+    formatter = FORMATTERS[kind][1]
+    benchmark.group = formatter.__name__
+
+    result = _measure(benchmark, lambda: [formatter(model, db) for model in models], rows)
+
+    assert len(result) == rows
+    db.expunge_all()
+
+
+@pytest.mark.parametrize('rows', BENCHMARK_SIZES)
+@pytest.mark.parametrize('kind', ['hardware', 'software'])
+def test_cache_encode(benchmark, formatted, kind, rows):
+    data = formatted(kind, rows)
+    benchmark.group = f"cache:all_{kind} encode"
+
+    body, stored = _measure(benchmark, lambda: encode_cache_entry(data), rows)
+
+    benchmark.extra_info.update({'payload_kib': round(len(body) / 1024, 1),
+                                 'stored_kib': round(len(stored) / 1024, 1)})
+    assert decode_cache_entry(stored) == decode_cache_entry(body)
+
+
+@pytest.mark.parametrize('rows', BENCHMARK_SIZES)
+@pytest.mark.parametrize('kind', ['hardware', 'software'])
+def test_cache_decode(benchmark, formatted, kind, rows):
+    _, stored = encode_cache_entry(formatted(kind, rows))
+    benchmark.group = f"cache:all_{kind} decode"
+
+    result = _measure(benchmark, lambda: decode_cache_entry(stored), rows)
+
+    assert len(result) == rows
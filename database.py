@@ -6,6 +6,8 @@ from dotenv import load_dotenv
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
+from tools.metrics import record_redis_command
+
 load_dotenv()
 
 SQLALCHEMY_DATABASE_URL = os.getenv("SQLALCHEMY_DATABASE_URL")
@@ -17,8 +19,20 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+class InstrumentedRedis(aioredis.Redis):
+    async def execute_command(self, *args, **options):
+        result = await super().execute_command(*args, **options)
+        record_redis_command(args, result)
+        return result
+
+
 async def get_redis_connection():
-    return aioredis.from_url(REDIS_URL, encoding="utf-8", decode_responses=True)
+    return InstrumentedRedis.from_url(REDIS_URL, encoding="utf-8", decode_responses=True)
+
+
+async def get_redis_binary_connection():
+    # cache entries may be gzip-compressed, so they have to come back as raw bytes
+    return InstrumentedRedis.from_url(REDIS_URL)
 
 
 async def close_redis_connection(redis):
@@ -13,3 +13,5 @@ DESC_TAG_404 = 'Tag not found'
 DESC_404 = 'Not Found'
 DESC_BRAND_404 = 'Brand not found'
 DESC_CATEGORY_404 = 'Category not found'
+DESC_DETAIL = 'full includes notes, documents and descriptions, summary leaves them out'
+DETAIL_PATTERN = '^(full|summary)$'
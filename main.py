@@ -1,19 +1,31 @@
+import asyncio
 import json
 import os
+import time
 from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import AsyncGenerator
 from typing import Dict
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Request
+from fastapi.responses import ORJSONResponse
 from fastapi_limiter import FastAPILimiter
 from fastapi_limiter.depends import RateLimiter
-from starlette.responses import FileResponse
+from prometheus_client import CONTENT_TYPE_LATEST
+from starlette.responses import FileResponse, Response
 
 from database import get_redis_connection, close_redis_connection
-from routers import auth, hardware, software, logging, health, users, admin, books, files, tags, location
-from tools.actionlog import add_log
+from routers import auth, hardware, software, logging, health, users, admin, books, files, tags, location, sync, jobs
+from tools.actionlog import add_log, flush_logs
+from tools.book_populator import close_books_client
+from tools.cache import COMPRESS_MIN_BYTES, COMPRESS_LEVEL, clear_response_caches
+from tools.compression import CompressionMiddleware
+from tools.game_populator import close_redump_client
+from tools.health_sampler import health_sampler
+from tools.metrics import observe_request, render_metrics
+from tools.profiler import profile_request
+from tools.token_cache import revocation_listener
 
 load_dotenv()
 REDIS = os.getenv("REDIS_URL")
@@ -23,17 +35,40 @@ REDIS = os.getenv("REDIS_URL")
 async def lifespan(application: FastAPI) -> AsyncGenerator[None, None]:
     application.state.redis = await get_redis_connection()
     await FastAPILimiter.init(application.state.redis)
+    revocation_task = asyncio.create_task(revocation_listener())
+    sampler_task = asyncio.create_task(health_sampler(application.state.redis))
     try:
         yield
     finally:
-        await application.state.redis.flushall()
+        revocation_task.cancel()
+        sampler_task.cancel()
+        flush_logs()
+        await close_books_client()
+        await close_redump_client()
+        await clear_response_caches(application.state.redis)
         await close_redis_connection(application.state.redis)
 
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 # prod: app = FastAPI(docs_url=None, redoc_url=None)
 # models.Base.metadata.create_all(bind=engine)
 
+
+app.add_middleware(CompressionMiddleware, minimum_size=COMPRESS_MIN_BYTES, compresslevel=COMPRESS_LEVEL)
+
+
+# The last middleware registered is the outermost one; instrumentation wraps profiling so the
+# profiler can read the request's query count.
+@app.middleware("http")
+async def profile_slow_requests(request: Request, call_next):
+    return await profile_request(request, call_next)
+
+
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    return await observe_request(request, call_next)
+
+
 app.include_router(auth.router)
 app.include_router(admin.router)
 app.include_router(users.router)
@@ -45,6 +80,8 @@ app.include_router(location.router)
 app.include_router(hardware.router)
 app.include_router(software.router)
 app.include_router(books.router)
+app.include_router(sync.router)
+app.include_router(jobs.router)
 
 FAVICON_PATH = 'uploads/images/favicon.ico'
 
@@ -57,21 +94,55 @@ async def favicon():
     return FileResponse(FAVICON_PATH)
 
 
+VERSION_PATH = 'version.json'
+VERSION_CHECK_SECONDS = 30
+LIVEZ_BODY = b'{"status":"ok"}'
+
+_version_cache = {'mtime': None, 'checked_at': 0.0, 'body': b''}
+
+
 def load_version_info() -> Dict:
-    with open("version.json", "r") as file:
+    with open(VERSION_PATH, "r") as file:
         version_info = json.load(file)
     return version_info["mancave"][0]
 
 
+def get_version_body() -> bytes:
+    # version.json only changes on deploy; stat it at most every VERSION_CHECK_SECONDS and re-read on mtime change
+    now = time.monotonic()
+    if now - _version_cache['checked_at'] < VERSION_CHECK_SECONDS:
+        return _version_cache['body']
+
+    _version_cache['checked_at'] = now
+    mtime = os.stat(VERSION_PATH).st_mtime
+    if mtime != _version_cache['mtime']:
+        ver_info = load_version_info()
+        _version_cache['body'] = json.dumps({
+            'appName': ver_info["appName"],
+            'version': ver_info["version"],
+            'database': ver_info["database"],
+            "buildDate": ver_info["buildDate"],
+            "buildName": ver_info["buildName"],
+            "buildID": ver_info["buildID"],
+            "buildNumber": ver_info["buildNumber"]
+        }).encode()
+        _version_cache['mtime'] = mtime
+    return _version_cache['body']
+
+
+get_version_body()
+
+
 @app.get('/', dependencies=[Depends(RateLimiter(times=10, seconds=60))])
 async def root():
-    ver_info = load_version_info()
-    return {
-        'appName': ver_info["appName"],
-        'version': ver_info["version"],
-        'database': ver_info["database"],
-        "buildDate": ver_info["buildDate"],
-        "buildName": ver_info["buildName"],
-        "buildID": ver_info["buildID"],
-        "buildNumber": ver_info["buildNumber"]
-    }
+    return Response(content=get_version_body(), media_type="application/json")
+
+
+@app.get('/metrics', include_in_schema=False)
+async def metrics():
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get('/livez', include_in_schema=False)
+async def livez():
+    return Response(content=LIVEZ_BODY, media_type="application/json")
@@ -2,12 +2,25 @@ import datetime
 from typing import Optional, List
 
 from pydantic import BaseModel, Field
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, BigInteger, DateTime, Float, Sequence, Index, \
+    FetchedValue, func
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.schema import UniqueConstraint
 
 from database import Base
 
+# Shared change counter for /sync. Every insert/update of a synced item and every tombstone takes the next value.
+SYNC_VERSION_SEQ = Sequence('sync_version_seq')
+
+
+def sync_xid_column():
+    # id of the transaction that last wrote the row, set by a trigger (see the sync_xid migration). Sequence values are
+    # handed out before commit, so /sync pages by transaction id and stops below the oldest one still running.
+    return Column(BigInteger, server_default=FetchedValue(), server_onupdate=FetchedValue(), index=True)
+
+# Large free-text and file columns are only loaded when a query asks for them with undefer_group(DETAILS_GROUP).
+DETAILS_GROUP = 'details'
+
 
 class Location(Base):
     __tablename__ = 'locations'
@@ -41,6 +54,16 @@ class InitDB(Base):
     status = Column(Boolean, default=False)
 
 
+class SeedFile(Base):
+    # sql/components files already loaded, a file is only run again when its checksum changes
+    __tablename__ = 'seed_files'
+    filename = Column(String, primary_key=True)
+    checksum = Column(String(64), nullable=False)
+    statements = Column(Integer, nullable=False)
+    duration_ms = Column(Float)
+    applied_at = Column(DateTime, server_default=func.now())
+
+
 class Users(Base):
     """Class for users"""
     __tablename__ = 'users'
@@ -82,14 +105,17 @@ class Hardware(Base):
     is_new = Column(Boolean, default=False)
     purchase_date = Column(String, nullable=True)
     purchased_from = Column(String, nullable=True)
-    store_link = Column(String, nullable=True)
-    photos = Column(String, nullable=True)
-    user_manual = Column(String, nullable=True)
-    invoice = Column(String, nullable=True)
+    store_link = deferred(Column(String, nullable=True), group=DETAILS_GROUP)
+    photos = deferred(Column(String, nullable=True), group=DETAILS_GROUP)
+    user_manual = deferred(Column(String, nullable=True), group=DETAILS_GROUP)
+    invoice = deferred(Column(String, nullable=True), group=DETAILS_GROUP)
     barcode = Column(String, nullable=True)
-    repair_history = Column(String, nullable=True)
-    notes = Column(String, nullable=True)
+    repair_history = deferred(Column(String, nullable=True), group=DETAILS_GROUP)
+    notes = deferred(Column(String, nullable=True), group=DETAILS_GROUP)
     position = Column(String, nullable=True)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    sync_version = Column(BigInteger, SYNC_VERSION_SEQ, onupdate=SYNC_VERSION_SEQ.next_value(), index=True)
+    sync_xid = sync_xid_column()
 
 
 class HardwareRequest(BaseModel):
@@ -119,6 +145,7 @@ class HardwareBrand(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True)
     hardware = relationship("Hardware", back_populates="brand")
+    __table_args__ = (Index('ix_hardware_brand_name_lower', func.lower(name), unique=True),)
 
 
 class HardwareBrandRequest(BaseModel):
@@ -131,6 +158,7 @@ class HardwareCategory(Base):
     name = Column(String, unique=True)
     hardware = relationship("Hardware", back_populates="category")
     component_types = relationship("ComponentType", back_populates="hardware_category")
+    __table_args__ = (Index('ix_hardware_category_name_lower', func.lower(name), unique=True),)
 
 
 class HardwareCategoryRequest(BaseModel):
@@ -183,15 +211,18 @@ class Software(Base):
     media_type = relationship("SoftwareMediaType", back_populates="software")
     media_count = Column(Integer, nullable=True)
     condition = Column(String, nullable=True)
-    product_key = Column(String, nullable=True)
+    product_key = deferred(Column(String, nullable=True), group=DETAILS_GROUP)
     photo = Column(String, nullable=True)
     multiple_copies = Column(Boolean, nullable=True, default=False)
     multicopy_id = Column(Integer, nullable=True)
     image_backups = Column(Boolean, nullable=True, default=False)
     image_backup_location = Column(String, nullable=True)
     redump_disk_ids = Column(String, nullable=True)
-    notes = Column(String, nullable=True)
+    notes = deferred(Column(String, nullable=True), group=DETAILS_GROUP)
     position = Column(String, nullable=True)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    sync_version = Column(BigInteger, SYNC_VERSION_SEQ, onupdate=SYNC_VERSION_SEQ.next_value(), index=True)
+    sync_xid = sync_xid_column()
 
 
 class SoftwareTag(Base):
@@ -205,6 +236,7 @@ class SoftwareCategory(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String)
     software = relationship("Software", back_populates="category")
+    __table_args__ = (Index('ix_software_category_name_lower', func.lower(name), unique=True),)
 
 
 class SoftwareCategoryRequest(BaseModel):
@@ -216,6 +248,7 @@ class SoftwarePublisher(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String)
     software = relationship("Software", back_populates="publisher")
+    __table_args__ = (Index('ix_software_publisher_name_lower', func.lower(name), unique=True),)
 
 
 class SoftwarePublisherRequest(BaseModel):
@@ -227,6 +260,7 @@ class SoftwareDeveloper(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String)
     software = relationship("Software", back_populates="developer")
+    __table_args__ = (Index('ix_software_developer_name_lower', func.lower(name), unique=True),)
 
 
 class SoftwareDeveloperRequest(BaseModel):
@@ -238,6 +272,7 @@ class SoftwarePlatform(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String)
     software = relationship("Software", back_populates="platform")
+    __table_args__ = (Index('ix_software_platform_name_lower', func.lower(name), unique=True),)
 
 
 class SoftwarePlatformRequest(BaseModel):
@@ -249,6 +284,7 @@ class SoftwareMediaType(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String)
     software = relationship("Software", back_populates="media_type")
+    __table_args__ = (Index('ix_software_type_name_lower', func.lower(name), unique=True),)
 
 
 class SoftwareMediaTypeRequest(BaseModel):
@@ -301,12 +337,15 @@ class Books(Base):
     authors = relationship('BookAuthorAssociation', back_populates='book')
     publisher = Column(String, index=True)
     published_date = Column(String)
-    description = Column(String, nullable=True)
+    description = deferred(Column(String, nullable=True), group=DETAILS_GROUP)
     categories = relationship('BookCategoryAssociation', back_populates='book')
     print_type = Column(String, nullable=True)
     maturity_rating = Column(String, nullable=True)
     condition = Column(String, nullable=True)
     position = Column(String, nullable=True)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    sync_version = Column(BigInteger, SYNC_VERSION_SEQ, onupdate=SYNC_VERSION_SEQ.next_value(), index=True)
+    sync_xid = sync_xid_column()
 
 
 class BookRequest(BaseModel):
@@ -326,6 +365,10 @@ class BookRequest(BaseModel):
     position: Optional[str] = None
 
 
+class BookAutofillBatchRequest(BaseModel):
+    isbns: List[str] = Field(..., min_length=1, max_length=500)
+
+
 class BookAuthorAssociation(Base):
     __tablename__ = 'book_author_association'
     book_id = Column(Integer, ForeignKey('books.id', ondelete="CASCADE"), primary_key=True)
@@ -354,3 +397,38 @@ class BookCategoryAssociation(Base):
     book_category_id = Column(Integer, ForeignKey('book_category.id'), primary_key=True)
     book = relationship('Books', back_populates='categories')
     category = relationship('BookCategory', back_populates='books')
+
+
+class SyncTombstone(Base):
+    __tablename__ = 'sync_tombstones'
+    id = Column(Integer, primary_key=True, index=True)
+    item_type = Column(String, nullable=False)
+    item_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, server_default=func.now())
+    sync_version = Column(BigInteger, SYNC_VERSION_SEQ, index=True)
+    sync_xid = sync_xid_column()
+
+
+class StoredFile(Base):
+    # uploads are stored once under their content hash, however many items use them
+    __tablename__ = 'stored_files'
+    sha256 = Column(String(64), primary_key=True)
+    path = Column(String, nullable=False, unique=True)
+    file_type = Column(String, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+    references = relationship('FileReference', back_populates='stored_file', passive_deletes=True)
+
+
+class FileReference(Base):
+    __tablename__ = 'file_references'
+    id = Column(Integer, primary_key=True)
+    sha256 = Column(String(64), ForeignKey('stored_files.sha256', ondelete="CASCADE"), nullable=False, index=True)
+    item_type = Column(String, nullable=False)
+    item_id = Column(Integer, nullable=False)
+    field = Column(String, nullable=False)
+    stored_file = relationship('StoredFile', back_populates='references')
+    __table_args__ = (
+        UniqueConstraint('sha256', 'item_type', 'item_id', 'field', name='_file_reference_uc'),
+        Index('ix_file_references_item', 'item_type', 'item_id'),
+    )
@@ -1,20 +1,25 @@
-import os
+import asyncio
 from datetime import datetime
 from typing import List
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from fastapi_limiter.depends import RateLimiter
 from starlette import status
 from starlette.exceptions import HTTPException
+from starlette.responses import Response
 
 from database import get_redis_connection, close_redis_connection
-from dependencies import db_dependency, user_dependency, bcrypt_context
-from models import CreateUserRequest, Users, Hardware, Software
+from dependencies import db_dependency, user_dependency
+from models import CreateUserRequest, Users
 from tools import actionlog
 from tools.common import validate_admin
-from tools.config_manager import first_start_config, inject_sql_data
+from tools.config_manager import first_start_config
 from tools.config_manager_redis import get_hostname, get_email_credentials, get_health_check_key, is_app_passwd_valid, \
     is_hostname_valid, set_hostname, set_email_credentials
+from tools.file_cleanup import CLEANUP_GRACE_MINUTES, get_cleanup_progress
+from tools.jobs import start_job
+from tools.passwords import hash_password, get_password_pool_stats
+from tools.profiler import get_profiling_config, set_profiling_config, list_profiles, render_profile
 from .auth import is_unique_username_and_email
 
 router = APIRouter(
@@ -30,10 +35,10 @@ async def create_user(db: db_dependency, user: user_dependency,
     create_user_model = Users(
         email=create_user_request.email,
         username=create_user_request.username,
-        is_admin=create_user_request.is_admin,
-        hashed_password=bcrypt_context.hash(create_user_request.password)
+        is_admin=create_user_request.is_admin
     )
     if is_unique_username_and_email(create_user_model.username, create_user_model.email, db):
+        create_user_model.hashed_password = await hash_password(create_user_request.password)
         db.add(create_user_model)
         db.commit()
         actionlog.add_log("New User", "{} added at {}".format(create_user_model.username,
@@ -80,43 +85,61 @@ async def invalidate_all_caches(user: user_dependency):
     return {"message": "All caches have been invalidated successfully"}
 
 
-@router.post("/cleanup_orphaned_files", dependencies=[Depends(RateLimiter(times=2, seconds=60))])
-async def cleanup_orphaned_files(db: db_dependency, user: user_dependency):
+@router.get("/password_pool", status_code=status.HTTP_200_OK)
+async def password_pool(user: user_dependency):
     validate_admin(user)
+    return get_password_pool_stats()
 
-    images_dir = "uploads/images"
-    documents_dir = "uploads/documents"
 
-    files_to_ignore = {"favicon.ico", "DOCUMENTS"}
+@router.get("/profiling", status_code=status.HTTP_200_OK)
+async def get_profiling(user: user_dependency):
+    validate_admin(user)
+    return await get_profiling_config()
+
 
-    hardware_files = db.query(Hardware.photos, Hardware.user_manual, Hardware.invoice).all()
-    software_files = db.query(Software.photo).all()
+@router.post("/set_profiling", status_code=status.HTTP_200_OK)
+async def set_profiling(user: user_dependency, enabled: bool,
+                        sample_rate: float = Query(0.01, ge=0, le=1), slow_ms: float = Query(1000, ge=0)):
+    validate_admin(user)
+    config = await set_profiling_config(enabled, sample_rate, slow_ms)
+    actionlog.add_log("Profiling Config", f"Profiling set to {config}", user.get('username'))
+    return config
 
-    db_files = [os.path.basename(file) for sublist in hardware_files + software_files for file in sublist if file]
 
-    disk_files_images = [f for f in os.listdir(images_dir) if os.path.isfile(os.path.join(images_dir, f))]
-    disk_files_documents = [f for f in os.listdir(documents_dir) if os.path.isfile(os.path.join(documents_dir, f))]
+@router.get("/profiles", status_code=status.HTTP_200_OK)
+async def get_profiles(user: user_dependency):
+    validate_admin(user)
+    return await asyncio.to_thread(list_profiles)
 
-    orphaned_files = (set(disk_files_images + disk_files_documents) - set(db_files)) - files_to_ignore
 
-    if not orphaned_files:
-        return {"message": "No orphaned files found"}
+@router.get("/profiles/{profile_id}")
+async def download_profile(user: user_dependency, profile_id: str,
+                           output_format: str = Query('html', alias='format', pattern='^(html|speedscope)$')):
+    validate_admin(user)
+    rendered = await asyncio.to_thread(render_profile, profile_id, output_format)
+    if rendered is None:
+        raise HTTPException(status_code=404, detail='Profile not found')
 
-    deleted_files = []
+    if output_format == 'speedscope':
+        return Response(content=rendered, media_type='application/json', headers={
+            'Content-Disposition': f'attachment; filename="{profile_id}.speedscope.json"'})
+    return Response(content=rendered, media_type='text/html')
 
-    for file in orphaned_files:
-        file_path_images = os.path.join(images_dir, file)
-        file_path_documents = os.path.join(documents_dir, file)
-        if os.path.exists(file_path_images):
-            os.remove(file_path_images)
-            deleted_files.append(f"Deleted {file} from Images directory")
-        elif os.path.exists(file_path_documents):
-            os.remove(file_path_documents)
-            deleted_files.append(f"Deleted {file} from Documents directory")
 
-    actionlog.add_log("Cleanup Orphaned Files", f"Deleted {len(orphaned_files)} orphaned files", "System")
+@router.post("/cleanup_orphaned_files", status_code=status.HTTP_202_ACCEPTED,
+             dependencies=[Depends(RateLimiter(times=2, seconds=60))])
+async def cleanup_orphaned_files(user: user_dependency, dry_run: bool = False,
+                                 grace_minutes: int = Query(CLEANUP_GRACE_MINUTES, ge=0)):
+    validate_admin(user)
 
-    return {"orphaned_files": list(orphaned_files), "deleted_files": deleted_files}
+    job = await start_job('cleanup_orphaned_files', {"dry_run": dry_run, "grace_minutes": grace_minutes}, user)
+    return {"message": "Cleanup queued", "job_id": job['id'], "dry_run": dry_run, "grace_minutes": grace_minutes}
+
+
+@router.get("/cleanup_orphaned_files", status_code=status.HTTP_200_OK)
+async def cleanup_orphaned_files_progress(user: user_dependency):
+    validate_admin(user)
+    return await get_cleanup_progress() or {"status": "idle"}
 
 
 @router.get("/get_server_config")
@@ -145,14 +168,12 @@ async def set_server_config(user: user_dependency, host_name: str, email_user: s
     await set_email_credentials(email_user, email_app_passwd)
 
 
-@router.post("/import-sql/")
-async def import_sql(user: user_dependency, prefixes: List[str]):
+@router.post("/import-sql/", status_code=status.HTTP_202_ACCEPTED)
+async def import_sql(user: user_dependency, prefixes: List[str],
+                     force: bool = Query(False, description="Run files again even if they have not changed")):
     validate_admin(user)
-    try:
-        inject_sql_data(prefixes)
-        return {"message": "SQL files imported successfully"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    job = await start_job('import_sql', {"prefixes": prefixes, "force": force}, user)
+    return {"message": "SQL import queued", "job_id": job['id']}
 
 
 @router.get("/first_run", dependencies=[Depends(RateLimiter(times=1, seconds=60))])
@@ -1,5 +1,4 @@
 """Authentication Module"""
-import logging
 import os
 import uuid
 from datetime import timedelta, datetime
@@ -10,13 +9,14 @@ from fastapi import APIRouter, Depends
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi_limiter.depends import RateLimiter
 from jose import jwt, JWTError
-from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 from starlette import status
 from starlette.exceptions import HTTPException
 
 from database import get_db, get_redis_connection
 from models import Users, Token
+from tools.passwords import verify_password
+from tools.token_cache import get_cached_claims, cache_claims, is_revoked, publish_revocation
 
 load_dotenv()
 
@@ -30,19 +30,23 @@ ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES")
 REFRESH_TOKEN_EXPIRE_HOURS = os.getenv("REFRESH_TOKEN_EXPIRE_HOURS")
 
-bcrypt_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl='auth/token')
-logging.getLogger('passlib').setLevel(logging.ERROR)
 
 db_dependency = Annotated[Session, Depends(get_db)]
 
 
-def authenticate_user(username: str, password: str, db):
+async def authenticate_user(username: str, password: str, db):
     user = db.query(Users).filter(Users.username == username).first()
     if not user:
         return False
-    if not bcrypt_context.verify(password, user.hashed_password):
+    valid, new_hash = await verify_password(password, user.hashed_password)
+    if not valid:
         return False
+    if new_hash:
+        # cost parameters changed since this hash was made, upgrade it while we have the plain password
+        user.hashed_password = new_hash
+        db.commit()
+        db.refresh(user)
     db.close()
     return user
 
@@ -62,15 +66,20 @@ def create_access_token(username: str, user_id: int, is_admin: bool, expires_del
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-async def get_current_user(token: str = Depends(oauth2_bearer), redis=Depends(get_redis_connection)):
+async def get_current_user(token: str = Depends(oauth2_bearer)):
     credentials_exception = HTTPException(
         status_code=401,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    claims = get_cached_claims(token)
+    if claims is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            raise credentials_exception
+
         username: str = payload.get('sub')
         user_id: int = payload.get('id')
         is_admin: bool = payload.get('is_admin')
@@ -80,20 +89,20 @@ async def get_current_user(token: str = Depends(oauth2_bearer), redis=Depends(ge
         if username is None or user_id is None or jti is None or expiration is None:
             raise credentials_exception
 
-        if await redis.exists(f"blacklist:{jti}"):
-            raise HTTPException(status_code=401, detail="Token revoked")
+        claims = {'username': username, 'id': user_id, 'is_admin': is_admin, 'jti': jti, 'exp': expiration}
+        cache_claims(token, claims)
 
-        return {'username': username, 'id': user_id, 'is_admin': is_admin, 'jti': jti, 'exp': expiration}
+    if await is_revoked(claims['jti']):
+        raise HTTPException(status_code=401, detail="Token revoked")
 
-    except JWTError:
-        raise credentials_exception
+    return dict(claims)
 
 
 @router.post("/token", response_model=Token,
              status_code=status.HTTP_200_OK,
              dependencies=[Depends(RateLimiter(times=1, seconds=5))])
 async def login_for_access_token(form_data: Annotated[OAuth2PasswordRequestForm, Depends()], db: db_dependency):
-    user = authenticate_user(form_data.username, form_data.password, db)
+    user = await authenticate_user(form_data.username, form_data.password, db)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                             detail='Authentication Failed')
@@ -148,4 +157,5 @@ async def logout(user: dict = Depends(get_current_user),
     expiration_seconds = expiration - datetime.utcnow().timestamp()
     if expiration_seconds > 0:
         await redis.setex(f"blacklist:{jti}", int(expiration_seconds), "true")
+        await publish_revocation(redis, jti, expiration)
     return {"message": "User logged out successfully"}
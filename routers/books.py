@@ -3,16 +3,22 @@
 from datetime import datetime
 from typing import Optional
 
-from fastapi import APIRouter, HTTPException, Query
+import orjson
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func
 from sqlalchemy.orm import joinedload
 from starlette import status
 
+from database import invalidate_redis_cache
+from definitions import DESC_DETAIL, DETAIL_PATTERN
 from dependencies import db_dependency, user_dependency
-from models import Users, Books, BookRequest, BookAuthor, BookAuthorAssociation, BookCategory, BookCategoryAssociation, \
-    Location, ItemLocation
+from models import Users, Books, BookRequest, BookAutofillBatchRequest, BookAuthor, BookAuthorAssociation, \
+    BookCategory, BookCategoryAssociation, Location, ItemLocation, SyncTombstone
 from tools import actionlog
-from tools.book_populator import get_book_info
-from tools.common import validate_admin, validate_user
+from tools.book_populator import get_book_info, get_books_info
+from tools.cache import json_response, get_cached_response, cache_response
+from tools.common import validate_admin, validate_user, detail_options
 
 router = APIRouter(
     prefix='/books',
@@ -20,7 +26,7 @@ router = APIRouter(
 )
 
 
-def format_book_response(book, db_session):
+def format_book_response(book, db_session, detail: str = 'full'):
     author_names = db_session.query(BookAuthor.name).join(
         BookAuthorAssociation, BookAuthorAssociation.author_id == BookAuthor.id
     ).filter(BookAuthorAssociation.book_id == book.id).all()
@@ -54,7 +60,6 @@ def format_book_response(book, db_session):
         "authors": authors_list,
         "publisher": book.publisher,
         "published_date": book.published_date,
-        "description": book.description,
         "categories": categories_list,
         "print_type": book.print_type,
         "maturity_rating": book.maturity_rating,
@@ -63,21 +68,32 @@ def format_book_response(book, db_session):
         "location": location_hierarchy,
     }
 
+    # deferred column; touching it on a summary query would lazy load it row by row
+    if detail == 'full':
+        book_data["description"] = book.description
+
     return book_data
 
 
 @router.get("/get_all", status_code=status.HTTP_200_OK)
-async def get_all(db: db_dependency, user: user_dependency):
+async def get_all(request: Request, db: db_dependency, user: user_dependency,
+                  detail: str = Query('full', pattern=DETAIL_PATTERN, description=DESC_DETAIL)):
     validate_user(user)
-    books = db.query(Books).all()
-    formatted_books = [format_book_response(book, db) for book in books]
-    return formatted_books
+
+    cache_key = "cache:all_books" if detail == 'full' else "cache:all_books:summary"
+    cached_books = await get_cached_response(request, cache_key)
+    if cached_books is not None:
+        return cached_books
+
+    books = db.query(Books).options(*detail_options(detail)).all()
+    formatted_books = [format_book_response(book, db, detail) for book in books]
+    return await cache_response(request, cache_key, formatted_books)
 
 
 @router.get("/get_by_id/{id}", status_code=status.HTTP_200_OK)
 async def get_by_id(db: db_dependency, user: user_dependency, id: int):
     validate_user(user)
-    book = db.query(Books).filter(Books.id == id).first()
+    book = db.query(Books).options(*detail_options()).filter(Books.id == id).first()
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
 
@@ -87,10 +103,11 @@ async def get_by_id(db: db_dependency, user: user_dependency, id: int):
 
 @router.get("/get_by_title/{title}", status_code=status.HTTP_200_OK)
 async def get_by_title(user: user_dependency, db: db_dependency, title: str,
-                       exact_match: bool = Query(False, description="Search for books by an exact title match.")):
+                       exact_match: bool = Query(False, description="Search for books by an exact title match."),
+                       detail: str = Query('full', pattern=DETAIL_PATTERN, description=DESC_DETAIL)):
     validate_user(user)
 
-    query = db.query(Books).options(joinedload(Books.authors), joinedload(Books.categories))
+    query = db.query(Books).options(joinedload(Books.authors), joinedload(Books.categories), *detail_options(detail))
 
     if exact_match:
         books = query.filter(Books.title == title).all()
@@ -100,16 +117,17 @@ async def get_by_title(user: user_dependency, db: db_dependency, title: str,
     if not books:
         raise HTTPException(status_code=404, detail="No books found with the given title.")
 
-    formatted_books = [format_book_response(book, db) for book in books]
-    return formatted_books
+    formatted_books = [format_book_response(book, db, detail) for book in books]
+    return json_response(formatted_books)
 
 
 @router.get("/get_by_author/{author}", status_code=status.HTTP_200_OK)
 async def get_by_author(author: str, db: db_dependency, user: user_dependency,
-                        exact_match: bool = Query(False, description="Search for books by an exact author match.")):
+                        exact_match: bool = Query(False, description="Search for books by an exact author match."),
+                        detail: str = Query('full', pattern=DETAIL_PATTERN, description=DESC_DETAIL)):
     validate_user(user)
 
-    query = db.query(Books).join(BookAuthorAssociation).join(BookAuthor)
+    query = db.query(Books).join(BookAuthorAssociation).join(BookAuthor).options(*detail_options(detail))
     if exact_match:
         books = query.filter(BookAuthor.name == author).all()
     else:
@@ -118,14 +136,15 @@ async def get_by_author(author: str, db: db_dependency, user: user_dependency,
     if not books:
         raise HTTPException(status_code=404, detail="No books found for the given author.")
 
-    formatted_books = [format_book_response(book, db) for book in books]
-    return formatted_books
+    formatted_books = [format_book_response(book, db, detail) for book in books]
+    return json_response(formatted_books)
 
 
 @router.get("/get_by_publisher/{publisher}", status_code=status.HTTP_200_OK)
 async def get_by_publisher(user: user_dependency, db: db_dependency, publisher: str,
                            exact_match: bool = Query(False,
-                                                     description="Search for books by an exact publisher match.")):
+                                                     description="Search for books by an exact publisher match."),
+                           detail: str = Query('full', pattern=DETAIL_PATTERN, description=DESC_DETAIL)):
     validate_user(user)
 
     query = db.query(Books)
@@ -134,23 +153,25 @@ async def get_by_publisher(user: user_dependency, db: db_dependency, publisher:
     else:
         query = query.filter(Books.publisher.ilike(f"%{publisher}%"))
 
-    query = query.options(joinedload(Books.authors), joinedload(Books.categories))
+    query = query.options(joinedload(Books.authors), joinedload(Books.categories), *detail_options(detail))
 
     books = query.all()
 
     if not books:
         raise HTTPException(status_code=404, detail="No books found with the given publisher.")
 
-    formatted_books = [format_book_response(book, db) for book in books]
-    return formatted_books
+    formatted_books = [format_book_response(book, db, detail) for book in books]
+    return json_response(formatted_books)
 
 
 @router.get("/get_by_category/{category}", status_code=status.HTTP_200_OK)
 async def get_by_category(user: user_dependency, db: db_dependency, category: str,
-                          exact_match: bool = Query(False, description="Search for books by an exact category match.")):
+                          exact_match: bool = Query(False,
+                                                    description="Search for books by an exact category match."),
+                          detail: str = Query('full', pattern=DETAIL_PATTERN, description=DESC_DETAIL)):
     validate_user(user)
 
-    query = db.query(Books).join(BookCategoryAssociation).join(BookCategory)
+    query = db.query(Books).join(BookCategoryAssociation).join(BookCategory).options(*detail_options(detail))
     if exact_match:
         books = query.filter(BookCategory.name == category).all()
     else:
@@ -159,26 +180,28 @@ async def get_by_category(user: user_dependency, db: db_dependency, category: st
     if not books:
         raise HTTPException(status_code=404, detail="No books found for the given category.")
 
-    formatted_books = [format_book_response(book, db) for book in books]
-    return formatted_books
+    formatted_books = [format_book_response(book, db, detail) for book in books]
+    return json_response(formatted_books)
 
 
 @router.get("/get_by_print_type/{print_type}", status_code=status.HTTP_200_OK)
 async def get_by_print_type(user: user_dependency, db: db_dependency, print_type: str,
                             exact_match: bool = Query(False,
-                                                      description="Search for books by an exact print type match.")):
+                                                      description="Search for books by an exact print type match."),
+                            detail: str = Query('full', pattern=DETAIL_PATTERN, description=DESC_DETAIL)):
     validate_user(user)
 
+    query = db.query(Books).options(*detail_options(detail))
     if exact_match:
-        books = db.query(Books).filter(Books.print_type == print_type).all()
+        books = query.filter(Books.print_type == print_type).all()
     else:
-        books = db.query(Books).filter(Books.print_type.ilike(f"%{print_type}%")).all()
+        books = query.filter(Books.print_type.ilike(f"%{print_type}%")).all()
 
     if not books:
         raise HTTPException(status_code=404, detail="No books found with the given print type.")
 
-    formatted_books = [format_book_response(book, db) for book in books]
-    return formatted_books
+    formatted_books = [format_book_response(book, db, detail) for book in books]
+    return json_response(formatted_books)
 
 
 @router.get("/get_by_isbn/{isbn}", status_code=status.HTTP_200_OK)
@@ -189,7 +212,7 @@ async def get_by_isbn(db: db_dependency, user: user_dependency, isbn: str):
         raise HTTPException(status_code=400, detail="Invalid ISBN format. ISBN must be either 10 or 13 digits long.")
 
     isbn_field = Books.isbn_10 if len(isbn) == 10 else Books.isbn_13
-    book = db.query(Books).filter(isbn_field == isbn).first()
+    book = db.query(Books).options(*detail_options()).filter(isbn_field == isbn).first()
 
     if book:
         formatted_book = format_book_response(book, db)
@@ -208,11 +231,12 @@ async def book_search(
         category: Optional[str] = None,
         print_type: Optional[str] = None,
         maturity_rating: Optional[str] = None,
-        limit: int = Query(100, description="Limit the number of results", le=1000)
+        limit: int = Query(100, description="Limit the number of results", le=1000),
+        detail: str = Query('full', pattern=DETAIL_PATTERN, description=DESC_DETAIL)
 ):
     validate_user(user)
 
-    query = db.query(Books)
+    query = db.query(Books).options(*detail_options(detail))
 
     if author:
         query = query.join(BookAuthorAssociation).join(BookAuthor).filter(BookAuthor.name.ilike(f"%{author}%"))
@@ -236,8 +260,8 @@ async def book_search(
     if not results:
         raise HTTPException(status_code=404, detail="No books found matching the search criteria.")
 
-    formatted_results = [format_book_response(book, db) for book in results]
-    return formatted_results
+    formatted_results = [format_book_response(book, db, detail) for book in results]
+    return json_response(formatted_results)
 
 
 @router.get('/autofill')
@@ -253,6 +277,25 @@ async def autofill(user: user_dependency, db: db_dependency, isbn: str):
         return await get_book_info(isbn, api_key)
 
 
+@router.post('/autofill/batch')
+async def autofill_batch(user: user_dependency, db: db_dependency, batch_request: BookAutofillBatchRequest):
+    """
+    Autofill for a whole scanning session. Results are streamed as NDJSON, one {"isbn", "book"} line per unique ISBN
+    in the order they complete; "book" is null for unknown ISBNs and {"error": ...} when the lookup failed.
+    """
+    validate_user(user)
+
+    api_key = db.query(Users.books_api_key).filter(Users.id == user.get('id')).scalar()
+    if api_key == 'NOKEY':
+        api_key = None
+
+    async def stream():
+        async for isbn, book in get_books_info(batch_request.isbns, api_key):
+            yield orjson.dumps({"isbn": isbn, "book": book}) + b"\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 @router.post("/add", status_code=status.HTTP_201_CREATED)
 async def add_book(book_request: BookRequest, db: db_dependency, user: user_dependency):
     validate_admin(user)
@@ -280,6 +323,8 @@ async def add_book(book_request: BookRequest, db: db_dependency, user: user_depe
 
     db.commit()
 
+    await invalidate_redis_cache('cache:all_books*')
+
     # Log the action
     actionlog.add_log("New book added",
                       f"Book titled '{book_request.title}' added at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
@@ -323,8 +368,13 @@ async def update_book(book_id: int, book_request: BookRequest, db: db_dependency
             db.add(ItemLocation(item_id=book_id, item_type='book', location_id=book_request.location_id,
                                 position=book_request.position))
 
+    # Author and location changes live in other tables, so bump the row explicitly for /sync.
+    book.updated_at = func.now()
+
     db.commit()
 
+    await invalidate_redis_cache('cache:all_books*')
+
     actionlog.add_log("Book updated",
                       f"Book titled '{book_request.title}' updated at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
                       user.get('username'))
@@ -347,6 +397,9 @@ async def delete_book(book_id: int, db: db_dependency, user: user_dependency):
     db.query(ItemLocation).filter(ItemLocation.item_id == book_id, ItemLocation.item_type == 'book').delete()
 
     db.delete(book)
+    db.add(SyncTombstone(item_type='book', item_id=book_id))
     db.commit()
 
+    await invalidate_redis_cache('cache:all_books*')
+
     return {"message": "Book deleted successfully."}
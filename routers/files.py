@@ -1,15 +1,18 @@
 """Files Module"""
 
+import mimetypes
 import os
 
-from fastapi import APIRouter
+from fastapi import APIRouter, BackgroundTasks, Query, Request
 from fastapi import File, UploadFile, Form, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, FileResponse, Response
 from starlette.exceptions import HTTPException
 
-from dependencies import user_dependency
-from tools.common import randomize_filename
+from dependencies import db_dependency, user_dependency
 from tools.common import validate_user, validate_admin
+from tools.uploads import UPLOAD_DIRS, MAX_UPLOAD_BYTES, IMAGE_VARIANTS, SHA256_PATTERN, UPLOADS_ROOT, \
+    IMMUTABLE_CACHE_CONTROL, MUTABLE_CACHE_CONTROL, FILES_OFFLOAD, FILES_ACCEL_PREFIX, save_upload, variant_path, \
+    generate_image_variants, file_extension, find_stored_file, store_file, resolve_served_path, content_hash
 
 router = APIRouter(
     prefix='/files',
@@ -17,23 +20,82 @@ router = APIRouter(
 )
 
 
+def _file_response(path: str, size: int, sha256: str, file_type: str, existing: bool):
+    response = {"file": path, "size": size, "sha256": sha256, "existing": existing}
+    if file_type == "img":
+        response["variants"] = {variant: variant_path(path, variant) for variant in IMAGE_VARIANTS}
+    return response
+
+
+@router.get("/lookup")
+async def lookup_file(db: db_dependency, user: user_dependency,
+                      sha256: str = Query(..., pattern=SHA256_PATTERN,
+                                          description="Lowercase hex SHA-256 of the file")):
+    validate_admin(user)
+
+    # lets a client that hashed the file locally skip uploading content the server already has
+    stored_file = find_stored_file(db, sha256)
+    if stored_file is None:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    return _file_response(stored_file.path, stored_file.size, sha256, stored_file.file_type, True)
+
+
 @router.post("/upload")
-async def upload_file(user: user_dependency, file_to_upload: UploadFile = File(...), file_type: str = Form(...)):
+async def upload_file(db: db_dependency, user: user_dependency, background_tasks: BackgroundTasks,
+                      file_to_upload: UploadFile = File(...), file_type: str = Form(...)):
     validate_user(user)
     validate_admin(user)
 
     if file_type not in ["doc", "img"]:
         raise HTTPException(status_code=400, detail="Invalid file type. Use 'doc' or 'img'.")
 
-    file_extension = file_to_upload.filename.split(".")[-1]
-    new_filename = randomize_filename(file_extension)
+    max_bytes = MAX_UPLOAD_BYTES[file_type]
+    if file_to_upload.size is not None and file_to_upload.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"File too large, the limit is {max_bytes // (1024 * 1024)} MB")
+
+    temp_path, size, sha256 = await save_upload(file_to_upload, UPLOAD_DIRS[file_type], max_bytes)
+
+    stored_file = find_stored_file(db, sha256)
+    if stored_file is not None:
+        os.remove(temp_path)
+        # restarts the cleanup grace period, the caller is about to attach the file to an item
+        os.utime(stored_file.path)
+        return JSONResponse(content=_file_response(stored_file.path, size, sha256, stored_file.file_type, True))
 
-    if file_type == "doc":
-        upload_path = os.path.join("uploads", "documents", new_filename)
+    upload_path = store_file(db, temp_path, sha256, file_type, file_extension(file_to_upload.filename), size)
+    db.commit()
+
+    if file_type == "img":
+        background_tasks.add_task(generate_image_variants, upload_path)
+
+    return JSONResponse(content=_file_response(upload_path, size, sha256, file_type, False))
+
+
+@router.api_route("/uploads/{file_path:path}", methods=["GET", "HEAD"])
+async def serve_file(request: Request, user: user_dependency, file_path: str):
+    validate_user(user)
+
+    path = resolve_served_path(file_path)
+    if path is None:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    sha256 = content_hash(path)
+    if sha256:
+        # the name is the content hash, so it makes a strong ETag and the file can be cached forever
+        headers = {"ETag": f'"{sha256}"', "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+        if_none_match = request.headers.get("if-none-match", "")
+        if headers["ETag"] in if_none_match or if_none_match.strip() == "*":
+            return Response(status_code=304, headers=headers)
     else:
-        upload_path = os.path.join("uploads", "images", new_filename)
+        headers = {"Cache-Control": MUTABLE_CACHE_CONTROL}
 
-    with open(upload_path, "wb") as file_object:
-        file_object.write(file_to_upload.file.read())
+    if FILES_OFFLOAD == "x-accel-redirect":
+        headers["X-Accel-Redirect"] = FILES_ACCEL_PREFIX + os.path.relpath(path, UPLOADS_ROOT)
+    elif FILES_OFFLOAD == "x-sendfile":
+        headers["X-Sendfile"] = os.path.abspath(path)
+    else:
+        # Range and If-Range are handled by FileResponse, so large manuals and videos can be seeked and resumed
+        return FileResponse(path, headers=headers)
 
-    return JSONResponse(content={"file": upload_path})
+    return Response(headers=headers, media_type=mimetypes.guess_type(path)[0] or "application/octet-stream")
@@ -1,21 +1,24 @@
 """Hardware Module"""
-import json
 from datetime import datetime
 from typing import List
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
 from sqlalchemy import func
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import joinedload
 from starlette import status
 
-from database import get_redis_connection, close_redis_connection, invalidate_redis_cache
-from definitions import DESC_EXACT_MATCH, DESC_404, DESC_BRAND_404, DESC_CATEGORY_404
+from database import invalidate_redis_cache
+from definitions import DESC_EXACT_MATCH, DESC_404, DESC_BRAND_404, DESC_CATEGORY_404, DESC_DETAIL, DETAIL_PATTERN
 from dependencies import db_dependency, user_dependency
 from models import Hardware, HardwareRequest, HardwareCategory, HardwareBrand, HardwareBrandRequest, \
-    HardwareCategoryRequest, Tag, HardwareTag, ComponentTypeRequest, ComponentType, Location, ItemLocation
+    HardwareCategoryRequest, Tag, HardwareTag, ComponentTypeRequest, ComponentType, Location, ItemLocation, \
+    SyncTombstone
 from tools import actionlog
-from tools.common import validate_user, validate_admin
+from tools.cache import get_cached_response, cache_response, json_response
+from tools.common import validate_user, validate_admin, detail_options, insert_unique_name, touch_synced_items
+from tools.dependency_check import is_referenced, reference_preview
+from tools.uploads import sync_file_references, remove_file_references
 
 TAG_TYPE = "hardware"
 
@@ -25,7 +28,7 @@ router = APIRouter(
 )
 
 
-def format_hardware_response(hardware_model, db_session):
+def format_hardware_response(hardware_model, db_session, detail: str = 'full'):
     tags = db_session.query(Tag.name).join(HardwareTag).filter(
         HardwareTag.hardware_id == hardware_model.id,
         Tag.tag_type == TAG_TYPE
@@ -49,7 +52,7 @@ def format_hardware_response(hardware_model, db_session):
                                           "parent_id": location_info.parent_id})
             location_info = db_session.query(Location).filter(Location.id == location_info.parent_id).first()
 
-    return {
+    response = {
         "id": hardware_model.id,
         "category": hardware_model.category.name if hardware_model.category else None,
         "component_type": component_type_name,
@@ -62,18 +65,25 @@ def format_hardware_response(hardware_model, db_session):
         "is_new": hardware_model.is_new,
         "purchase_date": hardware_model.purchase_date,
         "purchased_from": hardware_model.purchased_from,
-        "store_link": hardware_model.store_link,
-        "photos": hardware_model.photos,
-        "user_manual": hardware_model.user_manual,
-        "invoice": hardware_model.invoice,
         "barcode": hardware_model.barcode,
-        "repair_history": hardware_model.repair_history,
-        "notes": hardware_model.notes,
         "tags": tags_list
     }
 
+    # deferred columns; touching them on a summary query would lazy load them row by row
+    if detail == 'full':
+        response.update({
+            "store_link": hardware_model.store_link,
+            "photos": hardware_model.photos,
+            "user_manual": hardware_model.user_manual,
+            "invoice": hardware_model.invoice,
+            "repair_history": hardware_model.repair_history,
+            "notes": hardware_model.notes,
+        })
 
-def search_any_match(db: db_dependency, tags: List[str]):
+    return response
+
+
+def search_any_match(db: db_dependency, tags: List[str], detail: str = 'full'):
     hardware_items = db.query(Hardware). \
         join(HardwareTag). \
         join(Tag). \
@@ -81,12 +91,13 @@ def search_any_match(db: db_dependency, tags: List[str]):
         Tag.name.in_(tags),
         Tag.tag_type == TAG_TYPE
     ). \
+        options(*detail_options(detail)). \
         all()
 
-    return [format_hardware_response(item, db) for item in hardware_items]
+    return [format_hardware_response(item, db, detail) for item in hardware_items]
 
 
-def search_all_match(db: db_dependency, tags: List[str]):
+def search_all_match(db: db_dependency, tags: List[str], detail: str = 'full'):
     matching_hardware_ids = db.query(HardwareTag.hardware_id) \
         .join(Tag) \
         .filter(
@@ -102,36 +113,31 @@ def search_all_match(db: db_dependency, tags: List[str]):
         .filter(Hardware.id == matching_hardware_ids.c.hardware_id) \
         .group_by(Hardware.id) \
         .having(func.count(HardwareTag.tag_id) == len(tags)) \
+        .options(*detail_options(detail)) \
         .all()
 
-    return [format_hardware_response(item, db) for item in hardware_items]
+    return [format_hardware_response(item, db, detail) for item in hardware_items]
 
 
 @router.get("/get_all", status_code=status.HTTP_200_OK)
-async def get_all(db: db_dependency, user: user_dependency):
+async def get_all(request: Request, db: db_dependency, user: user_dependency,
+                  detail: str = Query('full', pattern=DETAIL_PATTERN, description=DESC_DETAIL)):
     validate_user(user)
 
-    redis = await get_redis_connection()
-    try:
-        cached_hardware = await redis.get("cache:all_hardware")
-        if cached_hardware:
-            print("\033[92m########## CACHE HIT ##########\033[0m")
-            return json.loads(cached_hardware)
-
-        hardware_list = (
-            db.query(Hardware)
-            .options(joinedload(Hardware.brand), joinedload(Hardware.category))
-            .all()
-        )
-
-        result = [format_hardware_response(hardware, db) for hardware in hardware_list]
+    cache_key = "cache:all_hardware" if detail == 'full' else "cache:all_hardware:summary"
+    cached_hardware = await get_cached_response(request, cache_key)
+    if cached_hardware is not None:
+        return cached_hardware
 
-        await redis.set("cache:all_hardware", json.dumps(result), ex=3600)
+    hardware_list = (
+        db.query(Hardware)
+        .options(joinedload(Hardware.brand), joinedload(Hardware.category), *detail_options(detail))
+        .all()
+    )
 
-        return result
+    result = [format_hardware_response(hardware, db, detail) for hardware in hardware_list]
 
-    finally:
-        await close_redis_connection(redis)
+    return await cache_response(request, cache_key, result)
 
 
 @router.get("/get_by_id/", status_code=status.HTTP_200_OK)
@@ -140,7 +146,7 @@ async def get_by_id(db: db_dependency, user: user_dependency, hw_id: int):
 
     hardware_model = (
         db.query(Hardware)
-        .options(joinedload(Hardware.brand), joinedload(Hardware.category))
+        .options(joinedload(Hardware.brand), joinedload(Hardware.category), *detail_options())
         .filter(Hardware.id == hw_id)
         .first()
     )
@@ -158,7 +164,7 @@ async def get_by_barcode(db: db_dependency, user: user_dependency, barcode: str)
 
     hardware_model = (
         db.query(Hardware)
-        .options(joinedload(Hardware.brand), joinedload(Hardware.category))
+        .options(joinedload(Hardware.brand), joinedload(Hardware.category), *detail_options())
         .filter(Hardware.barcode == barcode)
         .first()
     )
@@ -172,12 +178,13 @@ async def get_by_barcode(db: db_dependency, user: user_dependency, barcode: str)
 
 @router.get("/get_by_model/{model}")
 async def get_by_model(user: user_dependency, db: db_dependency, model: str,
-                       exact_match: bool = Query(False, description=DESC_EXACT_MATCH)):
+                       exact_match: bool = Query(False, description=DESC_EXACT_MATCH),
+                       detail: str = Query('full', pattern=DETAIL_PATTERN, description=DESC_DETAIL)):
     validate_user(user)
 
     hardware_models = (
         db.query(Hardware)
-        .options(joinedload(Hardware.brand), joinedload(Hardware.category))
+        .options(joinedload(Hardware.brand), joinedload(Hardware.category), *detail_options(detail))
         .filter(Hardware.model == model if exact_match else Hardware.model.ilike(f"%{model}%"))
         .all()
     )
@@ -185,21 +192,22 @@ async def get_by_model(user: user_dependency, db: db_dependency, model: str,
     if not hardware_models:
         raise HTTPException(status_code=404, detail=DESC_404)
 
-    responses = [format_hardware_response(hardware_model, db) for hardware_model in hardware_models]
+    responses = [format_hardware_response(hardware_model, db, detail) for hardware_model in hardware_models]
 
-    return responses
+    return json_response(responses)
 
 
 @router.get("/get_by_brand/{brand}")
 async def get_by_brand(user: user_dependency, db: db_dependency, brand: str,
-                       exact_match: bool = Query(False, description=DESC_EXACT_MATCH)):
+                       exact_match: bool = Query(False, description=DESC_EXACT_MATCH),
+                       detail: str = Query('full', pattern=DETAIL_PATTERN, description=DESC_DETAIL)):
     validate_user(user)
 
     hardware_models = (
         db.query(Hardware)
         .join(Hardware.brand)
         .join(Hardware.category)
-        .options(joinedload(Hardware.brand), joinedload(Hardware.category))
+        .options(joinedload(Hardware.brand), joinedload(Hardware.category), *detail_options(detail))
         .filter(HardwareBrand.name == brand if exact_match else HardwareBrand.name.ilike(f"%{brand}%"))
         .all()
     )
@@ -207,20 +215,21 @@ async def get_by_brand(user: user_dependency, db: db_dependency, brand: str,
     if not hardware_models:
         raise HTTPException(status_code=404, detail=DESC_404)
 
-    responses = [format_hardware_response(hardware_model, db) for hardware_model in hardware_models]
+    responses = [format_hardware_response(hardware_model, db, detail) for hardware_model in hardware_models]
 
-    return responses
+    return json_response(responses)
 
 
 @router.get("/get_by_category/{category}")
 async def get_by_category(user: user_dependency, db: db_dependency, category: str,
-                          exact_match: bool = Query(False, description=DESC_EXACT_MATCH)):
+                          exact_match: bool = Query(False, description=DESC_EXACT_MATCH),
+                          detail: str = Query('full', pattern=DETAIL_PATTERN, description=DESC_DETAIL)):
     validate_user(user)
 
     hardware_models = (
         db.query(Hardware)
         .join(Hardware.category)
-        .options(joinedload(Hardware.brand), joinedload(Hardware.category))
+        .options(joinedload(Hardware.brand), joinedload(Hardware.category), *detail_options(detail))
         .filter(HardwareCategory.name == category if exact_match else HardwareCategory.name.ilike(f"%{category}%"))
         .all()
     )
@@ -228,9 +237,9 @@ async def get_by_category(user: user_dependency, db: db_dependency, category: st
     if not hardware_models:
         raise HTTPException(status_code=404, detail=DESC_404)
 
-    responses = [format_hardware_response(hardware_model, db) for hardware_model in hardware_models]
+    responses = [format_hardware_response(hardware_model, db, detail) for hardware_model in hardware_models]
 
-    return responses
+    return json_response(responses)
 
 
 # Hard limit 1000 - maybe too low. I need to check
@@ -245,7 +254,8 @@ async def hardware_search(
         purchased_from: str = None,
         is_new: bool = None,
         component_type: str = None,
-        limit: int = Query(100, description="Limit the number of results", le=1000)
+        limit: int = Query(100, description="Limit the number of results", le=1000),
+        detail: str = Query('full', pattern=DETAIL_PATTERN, description=DESC_DETAIL)
 ):
     validate_user(user)
 
@@ -267,14 +277,15 @@ async def hardware_search(
 
     hardware_models = (
         db.query(Hardware)
-        .options(joinedload(Hardware.brand), joinedload(Hardware.category), joinedload(Hardware.component_type))
+        .options(joinedload(Hardware.brand), joinedload(Hardware.category), joinedload(Hardware.component_type),
+                 *detail_options(detail))
         .filter(*filters)
         .limit(limit)
         .all()
     )
 
-    responses = [format_hardware_response(hardware_model, db) for hardware_model in hardware_models]
-    return responses
+    responses = [format_hardware_response(hardware_model, db, detail) for hardware_model in hardware_models]
+    return json_response(responses)
 
 
 @router.get("/search_by_tags", status_code=200)
@@ -282,38 +293,32 @@ async def search_by_tags(
         db: db_dependency,
         user: user_dependency,
         tags: List[str] = Query(...),
-        match_type: str = Query("all", regex="^(all|any)$")
+        match_type: str = Query("all", regex="^(all|any)$"),
+        detail: str = Query('full', pattern=DETAIL_PATTERN, description=DESC_DETAIL)
 ):
     validate_user(user)
     if match_type == "all":
-        items = search_all_match(db, tags)
+        items = search_all_match(db, tags, detail)
     else:
-        items = search_any_match(db, tags)
+        items = search_any_match(db, tags, detail)
 
-    return items
+    return json_response(items)
 
 
 @router.get("/get_all_brands", status_code=status.HTTP_200_OK)
-async def get_all_brands(user: user_dependency, db: db_dependency):
+async def get_all_brands(request: Request, user: user_dependency, db: db_dependency):
     validate_user(user)
 
     cache_key = "cache:all_brands"
-    redis = await get_redis_connection()
-    try:
-        cached_brands = await redis.get(cache_key)
-
-        if cached_brands:
-            print("\033[92m########## CACHE HIT ##########\033[0m")
-            return json.loads(cached_brands)
+    cached_brands = await get_cached_response(request, cache_key)
 
-        brands = db.query(HardwareBrand).order_by(HardwareBrand.name).all()
-        brands_data = [{"id": brand.id, "name": brand.name} for brand in brands]
+    if cached_brands is not None:
+        return cached_brands
 
-        await redis.set(cache_key, json.dumps(brands_data), ex=3600)
+    brands = db.query(HardwareBrand).order_by(HardwareBrand.name).all()
+    brands_data = [{"id": brand.id, "name": brand.name} for brand in brands]
 
-        return brands_data
-    finally:
-        await close_redis_connection(redis)
+    return await cache_response(request, cache_key, brands_data)
 
 
 @router.get("/get_brand_by_name", status_code=status.HTTP_200_OK)
@@ -334,32 +339,20 @@ async def add_hardware_brand(
         db: db_dependency,
         hardware_brand: HardwareBrandRequest
 ):
-    brand_name_lower = hardware_brand.name.lower()
-
-    existing_brand = db.query(HardwareBrand).filter(func.lower(HardwareBrand.name) == brand_name_lower).first()
-    if existing_brand:
+    brand_id = insert_unique_name(db, HardwareBrand, hardware_brand.name)
+    if brand_id is None:
         raise HTTPException(status_code=400, detail="Brand name already exists")
+    db.commit()
 
-    brand_instance = HardwareBrand(name=hardware_brand.name)
-    db.add(brand_instance)
-    try:
-        db.commit()
-
-        await invalidate_redis_cache('cache:all_brands')
-
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=400, detail="Error adding brand")
-
-    db.refresh(brand_instance)
+    await invalidate_redis_cache('cache:all_brands')
 
     actionlog.add_log(
         "New hardware brand",
-        "{} added at {}".format(brand_instance.name, datetime.now().strftime("%H:%M:%S")),
+        "{} added at {}".format(hardware_brand.name, datetime.now().strftime("%H:%M:%S")),
         user.get('username')
     )
 
-    return {"message": "Brand added successfully", "id": brand_instance.id, "name": brand_instance.name}
+    return {"message": "Brand added successfully", "id": brand_id, "name": hardware_brand.name}
 
 
 @router.put("/update_brand", status_code=status.HTTP_200_OK)
@@ -370,26 +363,17 @@ async def update_brand(db: db_dependency, user: user_dependency,
                        ):
     validate_admin(user)
 
-    brand_name_lower = hardware_brand.name.lower()
-
-    existing_brand = db.query(HardwareBrand).filter(
-        func.lower(HardwareBrand.name) == brand_name_lower,
-        HardwareBrand.id != brand_id
-    ).first()
-
-    if existing_brand:
-        raise HTTPException(status_code=400, detail="Brand name already exists with another ID")
-
     brand_to_update = db.query(HardwareBrand).filter(HardwareBrand.id == brand_id).first()
     if not brand_to_update:
         raise HTTPException(status_code=404, detail=DESC_BRAND_404)
 
+    touch_synced_items(db, Hardware, Hardware.brand_id == brand_id)
     brand_to_update.name = hardware_brand.name
     try:
         db.commit()
     except IntegrityError:
         db.rollback()
-        raise HTTPException(status_code=400, detail="Error updating brand")
+        raise HTTPException(status_code=400, detail="Brand name already exists with another ID")
 
     db.refresh(brand_to_update)
 
@@ -413,7 +397,7 @@ async def remove_brand(brand_id: int, db: db_dependency, user: user_dependency):
     if not brand_to_delete:
         raise HTTPException(status_code=404, detail=DESC_BRAND_404)
 
-    if db.query(Hardware).filter(Hardware.brand_id == brand_id).first():
+    if is_referenced(db.query(Hardware.id).filter(Hardware.brand_id == brand_id)):
         raise HTTPException(status_code=400, detail="Cannot delete brand with associated hardware items")
 
     db.delete(brand_to_delete)
@@ -426,29 +410,18 @@ async def remove_brand(brand_id: int, db: db_dependency, user: user_dependency):
 
 
 @router.get("/get_all_categories", status_code=status.HTTP_200_OK)
-async def get_all_categories(user: user_dependency, db: db_dependency):
+async def get_all_categories(request: Request, user: user_dependency, db: db_dependency):
     validate_user(user)
 
     cache_key = "cache:all_categories"
-    redis = await get_redis_connection()
-    try:
-        cached_categories = await redis.get(cache_key)
-        if cached_categories:
-            print("\033[92m########## CACHE HIT ##########\033[0m")
-            return json.loads(cached_categories)
-    finally:
-        await close_redis_connection(redis)
+    cached_categories = await get_cached_response(request, cache_key)
+    if cached_categories is not None:
+        return cached_categories
 
     categories = db.query(HardwareCategory).order_by(HardwareCategory.name).all()
     categories_list = [{"id": category.id, "name": category.name} for category in categories]
 
-    redis = await get_redis_connection()
-    try:
-        await redis.set(cache_key, json.dumps(categories_list), ex=3600)
-    finally:
-        await close_redis_connection(redis)
-
-    return categories_list
+    return await cache_response(request, cache_key, categories_list)
 
 
 @router.get("/get_category_by_name", status_code=status.HTTP_200_OK)
@@ -470,14 +443,14 @@ async def add_hardware_category(
         db: db_dependency,
         hardware_category: HardwareCategoryRequest
 ):
-    category_instance = HardwareCategory(name=hardware_category.name)
-    db.add(category_instance)
+    category_id = insert_unique_name(db, HardwareCategory, hardware_category.name)
+    if category_id is None:
+        raise HTTPException(status_code=400, detail="Category name already exists")
     db.commit()
-    db.refresh(category_instance)
 
     actionlog.add_log(
         "New hardware category",
-        "{} added at {}".format(category_instance.name, datetime.now().strftime("%H:%M:%S")),
+        "{} added at {}".format(hardware_category.name, datetime.now().strftime("%H:%M:%S")),
         user.get('username')
     )
 
@@ -496,24 +469,17 @@ async def update_category(db: db_dependency,
                           ):
     validate_admin(user)
 
-    existing_category = db.query(HardwareCategory).filter(
-        func.lower(HardwareCategory.name) == hardware_category.name.lower(),
-        HardwareCategory.id != category_id
-    ).first()
-
-    if existing_category:
-        raise HTTPException(status_code=400, detail="Category name already exists with another ID")
-
     category_to_update = db.query(HardwareCategory).filter(HardwareCategory.id == category_id).first()
     if not category_to_update:
         raise HTTPException(status_code=404, detail=DESC_CATEGORY_404)
 
+    touch_synced_items(db, Hardware, Hardware.category_id == category_id)
     category_to_update.name = hardware_category.name
     try:
         db.commit()
     except IntegrityError:
         db.rollback()
-        raise HTTPException(status_code=400, detail="Error updating category")
+        raise HTTPException(status_code=400, detail="Category name already exists with another ID")
 
     db.refresh(category_to_update)
 
@@ -537,7 +503,7 @@ async def remove_category(category_id: int, db: db_dependency, user: user_depend
     if not category_to_delete:
         raise HTTPException(status_code=404, detail=DESC_CATEGORY_404)
 
-    if db.query(Hardware).filter(Hardware.category_id == category_id).first():
+    if is_referenced(db.query(Hardware.id).filter(Hardware.category_id == category_id)):
         raise HTTPException(status_code=400, detail="Cannot delete category with associated hardware items")
 
     db.delete(category_to_delete)
@@ -550,27 +516,21 @@ async def remove_category(category_id: int, db: db_dependency, user: user_depend
 
 
 @router.get("/component_types/by_hardware_category/{hardware_category_id}")
-async def get_component_types_by_hardware_category(hardware_category_id: int, db: db_dependency, user: user_dependency):
+async def get_component_types_by_hardware_category(request: Request, hardware_category_id: int, db: db_dependency,
+                                                   user: user_dependency):
     validate_admin(user)
 
-    redis = await get_redis_connection()
-    try:
-        cache_key = f"cache:component_types_{hardware_category_id}"
-        cached_component_types = await redis.get(cache_key)
-        if cached_component_types:
-            print("\033[92m########## CACHE HIT ##########\033[0m")
-            return json.loads(cached_component_types)
-
-        component_types = db.query(ComponentType).filter(
-            ComponentType.hardware_category_id == hardware_category_id
-        ).order_by(ComponentType.name).all()
+    cache_key = f"cache:component_types_{hardware_category_id}"
+    cached_component_types = await get_cached_response(request, cache_key)
+    if cached_component_types is not None:
+        return cached_component_types
 
-        result = [{"id": this_type.id, "name": this_type.name} for this_type in component_types]
-        await redis.set(cache_key, json.dumps(result), ex=3600)
+    component_types = db.query(ComponentType).filter(
+        ComponentType.hardware_category_id == hardware_category_id
+    ).order_by(ComponentType.name).all()
 
-        return result
-    finally:
-        await close_redis_connection(redis)
+    result = [{"id": this_type.id, "name": this_type.name} for this_type in component_types]
+    return await cache_response(request, cache_key, result)
 
 
 @router.post("/component_type/add")
@@ -605,6 +565,7 @@ async def update_component_type(component_type_id: int, request: ComponentTypeRe
 
     component_type.name = request.name
     component_type.hardware_category_id = request.hardware_category_id
+    touch_synced_items(db, Hardware, Hardware.component_type_id == component_type_id)
     db.commit()
     await invalidate_redis_cache("cache:component_types_*")
     return {"id": component_type.id, "name": component_type.name}
@@ -618,8 +579,7 @@ async def delete_component_type(component_type_id: int, db: db_dependency, user:
         raise HTTPException(status_code=404, detail="Component type not found")
 
     # Check if the component type is associated with any hardware
-    associated_hardware = db.query(Hardware).filter(Hardware.component_type_id == component_type_id).first()
-    if associated_hardware:
+    if is_referenced(db.query(Hardware.id).filter(Hardware.component_type_id == component_type_id)):
         raise HTTPException(status_code=400, detail="Cannot delete component type associated with existing hardware")
 
     db.delete(component_type)
@@ -633,12 +593,14 @@ async def delete_component_types_by_category(hardware_category_id: int, db: db_d
                                              delete_category: bool = False):
     validate_admin(user)
 
-    hardware_items = db.query(Hardware).join(ComponentType).filter(
-        ComponentType.hardware_category_id == hardware_category_id).all()
+    hardware_items = reference_preview(
+        db.query(Hardware.id, Hardware.model.label('name'), ComponentType.name.label('component_type'))
+        .join(ComponentType)
+        .filter(ComponentType.hardware_category_id == hardware_category_id)
+        .order_by(Hardware.id))
     if hardware_items:
-        items_details = [{"id": item.id, "name": item.model, "component_type": item.component_type.name} for item in
-                         hardware_items]
-        return {"message": "Cannot delete category as it's being used by hardware items", "items": items_details}
+        return {"message": "Cannot delete category as it's being used by hardware items",
+                "items": hardware_items["items"], "total": hardware_items["total"]}
 
     component_types_to_delete = db.query(ComponentType).filter(
         ComponentType.hardware_category_id == hardware_category_id).all()
@@ -712,9 +674,11 @@ async def add_hardware(
             hardware_tag = HardwareTag(hardware_id=hardware_model.id, tag_id=tag.id)
             db.add(hardware_tag)
 
+    sync_file_references(db, 'hardware', hardware_model.id, hardware_model)
+
     db.commit()
 
-    await invalidate_redis_cache('cache:all_hardware')
+    await invalidate_redis_cache('cache:all_hardware*')
     await invalidate_redis_cache('cache:tags:*')
 
     actionlog.add_log(
@@ -775,9 +739,14 @@ async def update_hardware(
         if hardware_tag:
             db.delete(hardware_tag)
 
+    sync_file_references(db, 'hardware', hardware_id, hardware_model)
+
+    # Tag and location changes live in other tables, so bump the row explicitly for /sync.
+    hardware_model.updated_at = func.now()
+
     db.commit()
 
-    await invalidate_redis_cache('cache:all_hardware')
+    await invalidate_redis_cache('cache:all_hardware*')
     await invalidate_redis_cache('cache:tags:*')
 
     actionlog.add_log("Hardware updated", f"Hardware with ID {hardware_model.id} updated successfully.",
@@ -800,10 +769,13 @@ async def delete_hardware(user: user_dependency, db: db_dependency, hardware_id:
 
     db.query(ItemLocation).filter(ItemLocation.item_id == hardware_id, ItemLocation.item_type == 'hardware').delete()
 
+    remove_file_references(db, 'hardware', hardware_id)
+
     db.delete(hardware_model)
+    db.add(SyncTombstone(item_type='hardware', item_id=hardware_id))
     db.commit()
 
-    await invalidate_redis_cache('cache:all_hardware')
+    await invalidate_redis_cache('cache:all_hardware*')
     await invalidate_redis_cache('cache:tags:*')
 
     actionlog.add_log(
@@ -1,14 +1,16 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from fastapi_limiter.depends import RateLimiter
 from starlette import status
+from starlette.concurrency import run_in_threadpool
 from starlette.exceptions import HTTPException
 
-from database import get_redis_connection, close_redis_connection
-from dependencies import db_dependency, user_dependency
+from dependencies import user_dependency
 from tools.common import validate_admin
 from tools.config_manager_redis import get_health_check_key, health_check_keygen
-from tools.health_benchmark import postgres_health_check, redis_health_check, check_cpu, check_memory, vacuum_db, \
-    analyze_db, reindex_db
+from tools.health_benchmark import latency_check, check_cpu, check_memory
+from tools.health_sampler import get_latest_sample, get_window_stats, take_sample
+from tools.jobs import start_job
+from tools.maintenance_planner import get_maintenance_plan
 
 router = APIRouter(
     prefix='/health',
@@ -18,23 +20,28 @@ router = APIRouter(
 
 @router.get("/status", status_code=status.HTTP_200_OK,
             dependencies=[Depends(RateLimiter(times=3, seconds=60))])
-async def health_check(db: db_dependency, key=None):
+async def health_check(request: Request, key=None):
     health_key = await get_health_check_key()
 
     if key == '' or key is None:
         return {'ERROR': 'Missing key'}
     elif key == health_key:
-        pg_health = postgres_health_check(db)
-        cpu = check_cpu()
-        mem = check_memory()
-
-        redis = await get_redis_connection()
-        try:
-            rd_health = await redis_health_check(redis)
-            return {'health': [pg_health, rd_health, cpu, mem]}
-        finally:
-            if redis:
-                await close_redis_connection(redis)
+        sample = get_latest_sample()
+        if sample is None:
+            # only happens right after startup, before the background sampler's first run
+            sample = await take_sample(request.app.state.redis)
+
+        return {
+            'health': [
+                latency_check('PostgreSQL Health', sample['postgres_ms']),
+                latency_check('Redis Health', sample['redis_ms']),
+                check_cpu(sample['cpu']),
+                check_memory(sample['memory'])
+            ],
+            'sampled_at': sample['timestamp'],
+            'latest': sample,
+            'window': get_window_stats()
+        }
     else:
         return {'ERROR': 'Invalid key'}
 
@@ -50,19 +57,40 @@ async def keygen(user: user_dependency):
         raise HTTPException(status_code=401, detail="Not authenticated or user is not in admin group")
 
 
-@router.get("/vacuum", status_code=status.HTTP_200_OK, dependencies=[Depends(RateLimiter(times=1, seconds=60))])
-async def vacuum_postgresql(db: db_dependency, user: user_dependency):
+@router.get("/vacuum", status_code=status.HTTP_202_ACCEPTED,
+            dependencies=[Depends(RateLimiter(times=1, seconds=60))])
+async def vacuum_postgresql(user: user_dependency):
+    validate_admin(user)
+    job = await start_job('vacuum', {}, user)
+    return {"status": "queued", "job_id": job['id'], "message": "VACUUM operation queued."}
+
+
+@router.get("/analyze", status_code=status.HTTP_202_ACCEPTED,
+            dependencies=[Depends(RateLimiter(times=1, seconds=60))])
+async def analyze_postgresql(user: user_dependency):
+    validate_admin(user)
+    job = await start_job('analyze', {}, user)
+    return {"status": "queued", "job_id": job['id'], "message": "ANALYZE operation queued."}
+
+
+@router.get("/reindex", status_code=status.HTTP_202_ACCEPTED,
+            dependencies=[Depends(RateLimiter(times=1, seconds=60))])
+async def reindex_postgresql(user: user_dependency):
     validate_admin(user)
-    return vacuum_db(db)
+    job = await start_job('reindex', {}, user)
+    return {"status": "queued", "job_id": job['id'], "message": "REINDEX operation queued."}
 
 
-@router.get("/analyze", status_code=status.HTTP_200_OK, dependencies=[Depends(RateLimiter(times=1, seconds=60))])
-async def analyze_postgresql(db: db_dependency, user: user_dependency):
+@router.get("/maintenance_plan", status_code=status.HTTP_200_OK)
+async def maintenance_plan(user: user_dependency):
+    """Dry run of /health/maintenance: what it would vacuum, analyze and reindex right now, and why."""
     validate_admin(user)
-    return analyze_db(db)
+    return await run_in_threadpool(get_maintenance_plan)
 
 
-@router.get("/reindex", status_code=status.HTTP_200_OK, dependencies=[Depends(RateLimiter(times=1, seconds=60))])
-async def reindex_postgresql(db: db_dependency, user: user_dependency):
+@router.get("/maintenance", status_code=status.HTTP_202_ACCEPTED,
+            dependencies=[Depends(RateLimiter(times=1, seconds=60))])
+async def targeted_maintenance(user: user_dependency):
     validate_admin(user)
-    return reindex_db(db)
+    job = await start_job('maintenance', {}, user)
+    return {"status": "queued", "job_id": job['id'], "message": "Targeted maintenance queued."}
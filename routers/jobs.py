@@ -0,0 +1,47 @@
+"""Jobs Module"""
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from starlette import status
+
+from dependencies import user_dependency
+from tools.common import validate_admin
+from tools.jobs import get_recent_jobs, get_job, cancel_job
+
+router = APIRouter(
+    prefix='/jobs',
+    tags=['jobs']
+)
+
+JOB_STATUS_PATTERN = "^(queued|running|finished|failed|cancelled)$"
+
+
+@router.get("/get_all", status_code=status.HTTP_200_OK)
+async def get_all_jobs(user: user_dependency, job_type: Optional[str] = None,
+                       job_status: Optional[str] = Query(None, pattern=JOB_STATUS_PATTERN)):
+    validate_admin(user)
+    return await get_recent_jobs(job_type, job_status)
+
+
+@router.get("/get_by_id/{job_id}", status_code=status.HTTP_200_OK)
+async def get_job_by_id(user: user_dependency, job_id: str):
+    validate_admin(user)
+
+    job = await get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/cancel/{job_id}", status_code=status.HTTP_202_ACCEPTED)
+async def cancel_job_by_id(user: user_dependency, job_id: str):
+    validate_admin(user)
+
+    job = await cancel_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job['status'] in ('finished', 'failed'):
+        raise HTTPException(status_code=409, detail=f"Job already {job['status']}")
+    if job['status'] == 'running':
+        return {"message": "Cancel requested, the job stops at its next checkpoint", "job": job}
+    return {"message": "Job cancelled", "job": job}
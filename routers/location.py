@@ -2,8 +2,9 @@ from fastapi import APIRouter
 from starlette.exceptions import HTTPException
 
 from dependencies import db_dependency, user_dependency
-from models import LocationRequest, Location, LocationUpdateRequest
-from tools.common import validate_admin, validate_user
+from models import LocationRequest, Location, LocationUpdateRequest, ItemLocation
+from tools.common import validate_admin, validate_user, touch_items_in_location
+from tools.dependency_check import is_referenced
 
 router = APIRouter(
     prefix='/location',
@@ -63,6 +64,7 @@ async def update_location(location_id: int, location_data: LocationUpdateRequest
     if location_data.name:
         location.name = location_data.name
 
+    touch_items_in_location(db, location_id)
     db.commit()
     return location
 
@@ -74,6 +76,11 @@ async def delete_location(location_id: int, db: db_dependency, user: user_depend
     if not location:
         raise HTTPException(status_code=404, detail="Location not found")
 
+    if is_referenced(db.query(Location.id).filter(Location.parent_id == location_id)):
+        raise HTTPException(status_code=400, detail="Cannot delete location that contains other locations")
+    if is_referenced(db.query(ItemLocation.id).filter(ItemLocation.location_id == location_id)):
+        raise HTTPException(status_code=400, detail="Cannot delete location with items stored in it")
+
     db.delete(location)
     db.commit()
     return {"message": f"Location with ID {location_id} has been successfully deleted."}
@@ -1,22 +1,25 @@
 """Software Module"""
-import json
 from datetime import datetime
 from typing import List
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
 from sqlalchemy import func
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import joinedload
 from starlette import status
 
-from database import get_redis_connection, close_redis_connection, invalidate_redis_cache
-from definitions import DESC_FUZZY
+from database import invalidate_redis_cache
+from definitions import DESC_FUZZY, DESC_DETAIL, DETAIL_PATTERN
 from dependencies import db_dependency, user_dependency
 from models import Software, SoftwareRequest, SoftwareCategory, SoftwareCategoryRequest, SoftwarePublisher, \
     SoftwarePublisherRequest, SoftwareDeveloper, SoftwareDeveloperRequest, SoftwarePlatform, SoftwarePlatformRequest, \
-    SoftwareMediaType, SoftwareMediaTypeRequest, SoftwareTag, Tag, Location, ItemLocation
+    SoftwareMediaType, SoftwareMediaTypeRequest, SoftwareTag, Tag, Location, ItemLocation, SyncTombstone
 from tools import actionlog
-from tools.common import validate_user, validate_admin
+from tools.cache import get_cached_response, cache_response, json_response
+from tools.common import validate_user, validate_admin, detail_options, insert_unique_name, touch_synced_items
+from tools.dependency_check import reference_preview
+from tools.game_populator import get_game_info, get_games_info, split_disc_ids, parse_disc_id
+from tools.uploads import sync_file_references, remove_file_references
 
 TAG_TYPE = "software"
 
@@ -26,7 +29,7 @@ router = APIRouter(
 )
 
 
-def search_any_match(db: db_dependency, tags: List[str]):
+def search_any_match(db: db_dependency, tags: List[str], detail: str = 'full'):
     software_items = db.query(Software). \
         join(SoftwareTag). \
         join(Tag). \
@@ -34,12 +37,13 @@ def search_any_match(db: db_dependency, tags: List[str]):
         Tag.name.in_(tags),
         Tag.tag_type == TAG_TYPE
     ). \
+        options(*detail_options(detail)). \
         all()
 
-    return [format_software_response(item, db) for item in software_items]
+    return [format_software_response(item, db, detail) for item in software_items]
 
 
-def search_all_match(db: db_dependency, tags: List[str]):
+def search_all_match(db: db_dependency, tags: List[str], detail: str = 'full'):
     matching_software_ids = db.query(SoftwareTag.software_id) \
         .join(Tag) \
         .filter(
@@ -55,12 +59,13 @@ def search_all_match(db: db_dependency, tags: List[str]):
         .filter(Software.id == matching_software_ids.c.software_id) \
         .group_by(Software.id) \
         .having(func.count(SoftwareTag.tag_id) == len(tags)) \
+        .options(*detail_options(detail)) \
         .all()
 
-    return [format_software_response(item, db) for item in software_items]
+    return [format_software_response(item, db, detail) for item in software_items]
 
 
-def format_software_response(software_model, db_session):
+def format_software_response(software_model, db_session, detail: str = 'full'):
     tags = db_session.query(Tag.name).join(SoftwareTag).filter(
         SoftwareTag.software_id == software_model.id,
         Tag.tag_type == TAG_TYPE
@@ -81,7 +86,7 @@ def format_software_response(software_model, db_session):
                                           "parent_id": location_info.parent_id})
             location_info = db_session.query(Location).filter(Location.id == location_info.parent_id).first()
 
-    return {
+    response = {
         "id": software_model.id,
         "name": software_model.name,
         "year": software_model.year,
@@ -90,14 +95,12 @@ def format_software_response(software_model, db_session):
         "location": location_hierarchy,
         "media_count": software_model.media_count,
         "condition": software_model.condition,
-        "product_key": software_model.product_key,
         "photo": software_model.photo,
         "multiple_copies": software_model.multiple_copies,
         "multicopy_id": software_model.multicopy_id,
         "image_backups": software_model.image_backups,
         "image_backup_location": software_model.image_backup_location,
         "redump_disk_ids": software_model.redump_disk_ids,
-        "notes": software_model.notes,
         "tags": tags_list,
         "category": software_model.category.name if software_model.category else None,
         "publisher": software_model.publisher.name if software_model.publisher else None,
@@ -106,28 +109,30 @@ def format_software_response(software_model, db_session):
         "media_type": software_model.media_type.name if software_model.media_type else None
     }
 
+    # deferred columns; touching them on a summary query would lazy load them row by row
+    if detail == 'full':
+        response.update({
+            "product_key": software_model.product_key,
+            "notes": software_model.notes,
+        })
+
+    return response
+
 
 @router.get("/get_all_categories", status_code=status.HTTP_200_OK)
-async def get_all_categories(user: user_dependency, db: db_dependency):
+async def get_all_categories(request: Request, user: user_dependency, db: db_dependency):
     validate_user(user)
 
     cache_key = "cache:all_sw_categories"
-    redis = await get_redis_connection()
-    try:
-        cached_categories = await redis.get(cache_key)
+    cached_categories = await get_cached_response(request, cache_key)
 
-        if cached_categories:
-            print("\033[92m########## CACHE HIT ##########\033[0m")
-            return json.loads(cached_categories)
+    if cached_categories is not None:
+        return cached_categories
 
-        categories = db.query(SoftwareCategory).order_by(SoftwareCategory.name).all()
-        categories_data = [{"id": category.id, "name": category.name} for category in categories]
+    categories = db.query(SoftwareCategory).order_by(SoftwareCategory.name).all()
+    categories_data = [{"id": category.id, "name": category.name} for category in categories]
 
-        await redis.set(cache_key, json.dumps(categories_data), ex=3600)
-
-        return categories_data
-    finally:
-        await close_redis_connection(redis)
+    return await cache_response(request, cache_key, categories_data)
 
 
 @router.get("/get_category_by_name", status_code=status.HTTP_200_OK)
@@ -148,33 +153,20 @@ async def add_category(
         db: db_dependency,
         category_request: SoftwareCategoryRequest
 ):
-    category_name_lower = category_request.name.lower()
-
-    existing_category = db.query(SoftwareCategory).filter(
-        func.lower(SoftwareCategory.name) == category_name_lower).first()
-    if existing_category:
+    category_id = insert_unique_name(db, SoftwareCategory, category_request.name)
+    if category_id is None:
         raise HTTPException(status_code=400, detail="Category name already exists")
+    db.commit()
 
-    category_instance = SoftwareCategory(name=category_request.name)
-    db.add(category_instance)
-    try:
-        db.commit()
-
-        await invalidate_redis_cache('cache:all_sw_categories')
-
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=400, detail="Error adding category")
-
-    db.refresh(category_instance)
+    await invalidate_redis_cache('cache:all_sw_categories')
 
     actionlog.add_log(
         "New software category",
-        "{} added at {}".format(category_instance.name, datetime.now().strftime("%H:%M:%S")),
+        "{} added at {}".format(category_request.name, datetime.now().strftime("%H:%M:%S")),
         user.get('username')
     )
 
-    return {"message": "Category added successfully", "id": category_instance.id, "name": category_instance.name}
+    return {"message": "Category added successfully", "id": category_id, "name": category_request.name}
 
 
 @router.put("/update_category", status_code=status.HTTP_200_OK)
@@ -183,26 +175,17 @@ async def update_category(db: db_dependency, user: user_dependency,
                           category_id: int = Query(..., description="The ID of the category to be updated")):
     validate_admin(user)
 
-    category_name_lower = category_request.name.lower()
-
-    existing_category = db.query(SoftwareCategory).filter(
-        func.lower(SoftwareCategory.name) == category_name_lower,
-        SoftwareCategory.id != category_id
-    ).first()
-
-    if existing_category:
-        raise HTTPException(status_code=400, detail="Category name already exists with another ID")
-
     category_to_update = db.query(SoftwareCategory).filter(SoftwareCategory.id == category_id).first()
     if not category_to_update:
         raise HTTPException(status_code=404, detail="Category not found")
 
+    touch_synced_items(db, Software, Software.category_id == category_id)
     category_to_update.name = category_request.name
     try:
         db.commit()
     except IntegrityError:
         db.rollback()
-        raise HTTPException(status_code=400, detail="Error updating category")
+        raise HTTPException(status_code=400, detail="Category name already exists with another ID")
 
     db.refresh(category_to_update)
 
@@ -226,11 +209,12 @@ async def remove_category(category_id: int, db: db_dependency, user: user_depend
     if not category_to_delete:
         raise HTTPException(status_code=404, detail="Category not found")
 
-    associated_software = db.query(Software).filter(Software.category_id == category_id).all()
+    associated_software = reference_preview(
+        db.query(Software.id, Software.name).filter(Software.category_id == category_id).order_by(Software.id))
     if associated_software:
-        associated_software_details = [{"id": software.id, "name": software.name} for software in associated_software]
         return {"message": "Cannot delete category with associated software items",
-                "associated_software": associated_software_details}
+                "associated_software": associated_software["items"],
+                "total": associated_software["total"]}
 
     db.delete(category_to_delete)
     db.commit()
@@ -241,26 +225,19 @@ async def remove_category(category_id: int, db: db_dependency, user: user_depend
 
 
 @router.get("/get_all_publishers", status_code=status.HTTP_200_OK)
-async def get_all_publishers(user: user_dependency, db: db_dependency):
+async def get_all_publishers(request: Request, user: user_dependency, db: db_dependency):
     validate_user(user)
 
     cache_key = "cache:all_publishers"
-    redis = await get_redis_connection()
-    try:
-        cached_publishers = await redis.get(cache_key)
-
-        if cached_publishers:
-            print("\033[92m########## CACHE HIT ##########\033[0m")
-            return json.loads(cached_publishers)
+    cached_publishers = await get_cached_response(request, cache_key)
 
-        publishers = db.query(SoftwarePublisher).order_by(SoftwarePublisher.name).all()
-        publishers_data = [{"id": publisher.id, "name": publisher.name} for publisher in publishers]
+    if cached_publishers is not None:
+        return cached_publishers
 
-        await redis.set(cache_key, json.dumps(publishers_data), ex=3600)
+    publishers = db.query(SoftwarePublisher).order_by(SoftwarePublisher.name).all()
+    publishers_data = [{"id": publisher.id, "name": publisher.name} for publisher in publishers]
 
-        return publishers_data
-    finally:
-        await close_redis_connection(redis)
+    return await cache_response(request, cache_key, publishers_data)
 
 
 @router.get("/get_publisher_by_name", status_code=status.HTTP_200_OK)
@@ -283,33 +260,20 @@ async def add_publisher(
         db: db_dependency,
         publisher_request: SoftwarePublisherRequest
 ):
-    publisher_name_lower = publisher_request.name.lower()
-
-    existing_publisher = db.query(SoftwarePublisher).filter(
-        func.lower(SoftwarePublisher.name) == publisher_name_lower).first()
-    if existing_publisher:
+    publisher_id = insert_unique_name(db, SoftwarePublisher, publisher_request.name)
+    if publisher_id is None:
         raise HTTPException(status_code=400, detail="Publisher name already exists")
+    db.commit()
 
-    publisher_instance = SoftwarePublisher(name=publisher_request.name)
-    db.add(publisher_instance)
-    try:
-        db.commit()
-
-        await invalidate_redis_cache('cache:all_publishers')
-
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=400, detail="Error adding publisher")
-
-    db.refresh(publisher_instance)
+    await invalidate_redis_cache('cache:all_publishers')
 
     actionlog.add_log(
         "New software publisher",
-        "{} added at {}".format(publisher_instance.name, datetime.now().strftime("%H:%M:%S")),
+        "{} added at {}".format(publisher_request.name, datetime.now().strftime("%H:%M:%S")),
         user.get('username')
     )
 
-    return {"message": "Publisher added successfully", "id": publisher_instance.id, "name": publisher_instance.name}
+    return {"message": "Publisher added successfully", "id": publisher_id, "name": publisher_request.name}
 
 
 @router.put("/update_publisher", status_code=status.HTTP_200_OK)
@@ -318,26 +282,17 @@ async def update_publisher(db: db_dependency, user: user_dependency,
                            publisher_id: int = Query(..., description="The ID of the publisher to be updated")):
     validate_admin(user)
 
-    publisher_name_lower = publisher_request.name.lower()
-
-    existing_publisher = db.query(SoftwarePublisher).filter(
-        func.lower(SoftwarePublisher.name) == publisher_name_lower,
-        SoftwarePublisher.id != publisher_id
-    ).first()
-
-    if existing_publisher:
-        raise HTTPException(status_code=400, detail="Publisher name already exists with another ID")
-
     publisher_to_update = db.query(SoftwarePublisher).filter(SoftwarePublisher.id == publisher_id).first()
     if not publisher_to_update:
         raise HTTPException(status_code=404, detail="Publisher not found")
 
+    touch_synced_items(db, Software, Software.publisher_id == publisher_id)
     publisher_to_update.name = publisher_request.name
     try:
         db.commit()
     except IntegrityError:
         db.rollback()
-        raise HTTPException(status_code=400, detail="Error updating publisher")
+        raise HTTPException(status_code=400, detail="Publisher name already exists with another ID")
 
     db.refresh(publisher_to_update)
 
@@ -362,11 +317,12 @@ async def remove_publisher(publisher_id: int, db: db_dependency, user: user_depe
     if not publisher_to_delete:
         raise HTTPException(status_code=404, detail="Publisher not found")
 
-    associated_software = db.query(Software).filter(Software.publisher_id == publisher_id).all()
+    associated_software = reference_preview(
+        db.query(Software.id, Software.name).filter(Software.publisher_id == publisher_id).order_by(Software.id))
     if associated_software:
-        associated_software_details = [{"id": software.id, "name": software.name} for software in associated_software]
         return {"message": "Cannot delete publisher with associated software items",
-                "associated_software": associated_software_details}
+                "associated_software": associated_software["items"],
+                "total": associated_software["total"]}
 
     db.delete(publisher_to_delete)
     db.commit()
@@ -377,26 +333,19 @@ async def remove_publisher(publisher_id: int, db: db_dependency, user: user_depe
 
 
 @router.get("/get_all_developers", status_code=status.HTTP_200_OK)
-async def get_all_developers(user: user_dependency, db: db_dependency):
+async def get_all_developers(request: Request, user: user_dependency, db: db_dependency):
     validate_user(user)
 
     cache_key = "cache:all_developers"
-    redis = await get_redis_connection()
-    try:
-        cached_developers = await redis.get(cache_key)
+    cached_developers = await get_cached_response(request, cache_key)
 
-        if cached_developers:
-            print("\033[92m########## CACHE HIT ##########\033[0m")
-            return json.loads(cached_developers)
+    if cached_developers is not None:
+        return cached_developers
 
-        developers = db.query(SoftwareDeveloper).order_by(SoftwareDeveloper.name).all()
-        developers_data = [{"id": developer.id, "name": developer.name} for developer in developers]
+    developers = db.query(SoftwareDeveloper).order_by(SoftwareDeveloper.name).all()
+    developers_data = [{"id": developer.id, "name": developer.name} for developer in developers]
 
-        await redis.set(cache_key, json.dumps(developers_data), ex=3600)
-
-        return developers_data
-    finally:
-        await close_redis_connection(redis)
+    return await cache_response(request, cache_key, developers_data)
 
 
 @router.get("/get_developer_by_name", status_code=status.HTTP_200_OK)
@@ -419,33 +368,20 @@ async def add_developer(
         db: db_dependency,
         developer_request: SoftwareDeveloperRequest
 ):
-    developer_name_lower = developer_request.name.lower()
-
-    existing_developer = db.query(SoftwareDeveloper).filter(
-        func.lower(SoftwareDeveloper.name) == developer_name_lower).first()
-    if existing_developer:
+    developer_id = insert_unique_name(db, SoftwareDeveloper, developer_request.name)
+    if developer_id is None:
         raise HTTPException(status_code=400, detail="Developer name already exists")
+    db.commit()
 
-    developer_instance = SoftwareDeveloper(name=developer_request.name)
-    db.add(developer_instance)
-    try:
-        db.commit()
-
-        await invalidate_redis_cache('cache:all_developers')
-
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=400, detail="Error adding developer")
-
-    db.refresh(developer_instance)
+    await invalidate_redis_cache('cache:all_developers')
 
     actionlog.add_log(
         "New software developer",
-        "{} added at {}".format(developer_instance.name, datetime.now().strftime("%H:%M:%S")),
+        "{} added at {}".format(developer_request.name, datetime.now().strftime("%H:%M:%S")),
         user.get('username')
     )
 
-    return {"message": "Developer added successfully", "id": developer_instance.id, "name": developer_instance.name}
+    return {"message": "Developer added successfully", "id": developer_id, "name": developer_request.name}
 
 
 @router.put("/update_developer", status_code=status.HTTP_200_OK)
@@ -454,26 +390,17 @@ async def update_developer(db: db_dependency, user: user_dependency,
                            developer_id: int = Query(..., description="The ID of the developer to be updated")):
     validate_admin(user)
 
-    developer_name_lower = developer_request.name.lower()
-
-    existing_developer = db.query(SoftwareDeveloper).filter(
-        func.lower(SoftwareDeveloper.name) == developer_name_lower,
-        SoftwareDeveloper.id != developer_id
-    ).first()
-
-    if existing_developer:
-        raise HTTPException(status_code=400, detail="Developer name already exists with another ID")
-
     developer_to_update = db.query(SoftwareDeveloper).filter(SoftwareDeveloper.id == developer_id).first()
     if not developer_to_update:
         raise HTTPException(status_code=404, detail="Developer not found")
 
+    touch_synced_items(db, Software, Software.developer_id == developer_id)
     developer_to_update.name = developer_request.name
     try:
         db.commit()
     except IntegrityError:
         db.rollback()
-        raise HTTPException(status_code=400, detail="Error updating developer")
+        raise HTTPException(status_code=400, detail="Developer name already exists with another ID")
 
     db.refresh(developer_to_update)
 
@@ -497,11 +424,12 @@ async def remove_developer(developer_id: int, db: db_dependency, user: user_depe
     if not developer_to_delete:
         raise HTTPException(status_code=404, detail="Developer not found")
 
-    associated_software = db.query(Software).filter(Software.developer_id == developer_id).all()
+    associated_software = reference_preview(
+        db.query(Software.id, Software.name).filter(Software.developer_id == developer_id).order_by(Software.id))
     if associated_software:
-        associated_software_details = [{"id": software.id, "name": software.name} for software in associated_software]
         return {"message": "Cannot delete developer with associated software items",
-                "associated_software": associated_software_details}
+                "associated_software": associated_software["items"],
+                "total": associated_software["total"]}
 
     db.delete(developer_to_delete)
     db.commit()
@@ -512,26 +440,19 @@ async def remove_developer(developer_id: int, db: db_dependency, user: user_depe
 
 
 @router.get("/get_all_platforms", status_code=status.HTTP_200_OK)
-async def get_all_platforms(user: user_dependency, db: db_dependency):
+async def get_all_platforms(request: Request, user: user_dependency, db: db_dependency):
     validate_user(user)
 
     cache_key = "cache:all_platforms"
-    redis = await get_redis_connection()
-    try:
-        cached_platforms = await redis.get(cache_key)
-
-        if cached_platforms:
-            print("\033[92m########## CACHE HIT ##########\033[0m")
-            return json.loads(cached_platforms)
+    cached_platforms = await get_cached_response(request, cache_key)
 
-        platforms = db.query(SoftwarePlatform).order_by(SoftwarePlatform.name).all()
-        platforms_data = [{"id": platform.id, "name": platform.name} for platform in platforms]
+    if cached_platforms is not None:
+        return cached_platforms
 
-        await redis.set(cache_key, json.dumps(platforms_data), ex=3600)
+    platforms = db.query(SoftwarePlatform).order_by(SoftwarePlatform.name).all()
+    platforms_data = [{"id": platform.id, "name": platform.name} for platform in platforms]
 
-        return platforms_data
-    finally:
-        await close_redis_connection(redis)
+    return await cache_response(request, cache_key, platforms_data)
 
 
 @router.get("/get_platform_by_name", status_code=status.HTTP_200_OK)
@@ -552,33 +473,20 @@ async def add_platform(
         db: db_dependency,
         platform_request: SoftwarePlatformRequest
 ):
-    platform_name_lower = platform_request.name.lower()
-
-    existing_platform = db.query(SoftwarePlatform).filter(
-        func.lower(SoftwarePlatform.name) == platform_name_lower).first()
-    if existing_platform:
+    platform_id = insert_unique_name(db, SoftwarePlatform, platform_request.name)
+    if platform_id is None:
         raise HTTPException(status_code=400, detail="Platform name already exists")
+    db.commit()
 
-    platform_instance = SoftwarePlatform(name=platform_request.name)
-    db.add(platform_instance)
-    try:
-        db.commit()
-
-        await invalidate_redis_cache('cache:all_platforms')  # Invalidate cache
-
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=400, detail="Error adding platform")
-
-    db.refresh(platform_instance)
+    await invalidate_redis_cache('cache:all_platforms')
 
     actionlog.add_log(
         "New software platform",
-        "{} added at {}".format(platform_instance.name, datetime.now().strftime("%H:%M:%S")),
+        "{} added at {}".format(platform_request.name, datetime.now().strftime("%H:%M:%S")),
         user.get('username')
     )
 
-    return {"message": "Platform added successfully", "id": platform_instance.id, "name": platform_instance.name}
+    return {"message": "Platform added successfully", "id": platform_id, "name": platform_request.name}
 
 
 @router.put("/update_platform", status_code=status.HTTP_200_OK)
@@ -587,26 +495,17 @@ async def update_platform(db: db_dependency, user: user_dependency,
                           platform_id: int = Query(..., description="The ID of the platform to be updated")):
     validate_admin(user)
 
-    platform_name_lower = platform_request.name.lower()
-
-    existing_platform = db.query(SoftwarePlatform).filter(
-        func.lower(SoftwarePlatform.name) == platform_name_lower,
-        SoftwarePlatform.id != platform_id
-    ).first()
-
-    if existing_platform:
-        raise HTTPException(status_code=400, detail="Platform name already exists with another ID")
-
     platform_to_update = db.query(SoftwarePlatform).filter(SoftwarePlatform.id == platform_id).first()
     if not platform_to_update:
         raise HTTPException(status_code=404, detail="Platform not found")
 
+    touch_synced_items(db, Software, Software.platform_id == platform_id)
     platform_to_update.name = platform_request.name
     try:
         db.commit()
     except IntegrityError:
         db.rollback()
-        raise HTTPException(status_code=400, detail="Error updating platform")
+        raise HTTPException(status_code=400, detail="Platform name already exists with another ID")
 
     db.refresh(platform_to_update)
 
@@ -631,11 +530,12 @@ async def remove_platform(platform_id: int, db: db_dependency, user: user_depend
     if not platform_to_delete:
         raise HTTPException(status_code=404, detail="Platform not found")
 
-    associated_software = db.query(Software).filter(Software.platform_id == platform_id).all()
+    associated_software = reference_preview(
+        db.query(Software.id, Software.name).filter(Software.platform_id == platform_id).order_by(Software.id))
     if associated_software:
-        associated_software_details = [{"id": software.id, "name": software.name} for software in associated_software]
         return {"message": "Cannot delete platform with associated software items",
-                "associated_software": associated_software_details}
+                "associated_software": associated_software["items"],
+                "total": associated_software["total"]}
 
     db.delete(platform_to_delete)
     db.commit()
@@ -646,26 +546,19 @@ async def remove_platform(platform_id: int, db: db_dependency, user: user_depend
 
 
 @router.get("/get_all_media_types", status_code=status.HTTP_200_OK)
-async def get_all_media_types(user: user_dependency, db: db_dependency):
+async def get_all_media_types(request: Request, user: user_dependency, db: db_dependency):
     validate_user(user)
 
     cache_key = "cache:all_media_types"
-    redis = await get_redis_connection()
-    try:
-        cached_media_types = await redis.get(cache_key)
+    cached_media_types = await get_cached_response(request, cache_key)
 
-        if cached_media_types:
-            print("\033[92m########## CACHE HIT ##########\033[0m")
-            return json.loads(cached_media_types)
+    if cached_media_types is not None:
+        return cached_media_types
 
-        media_types = db.query(SoftwareMediaType).order_by(SoftwareMediaType.name).all()
-        media_types_data = [{"id": media_type.id, "name": media_type.name} for media_type in media_types]
+    media_types = db.query(SoftwareMediaType).order_by(SoftwareMediaType.name).all()
+    media_types_data = [{"id": media_type.id, "name": media_type.name} for media_type in media_types]
 
-        await redis.set(cache_key, json.dumps(media_types_data), ex=3600)
-
-        return media_types_data
-    finally:
-        await close_redis_connection(redis)
+    return await cache_response(request, cache_key, media_types_data)
 
 
 @router.get("/get_media_type_by_name", status_code=status.HTTP_200_OK)
@@ -688,33 +581,20 @@ async def add_media_type(
         db: db_dependency,
         media_type_request: SoftwareMediaTypeRequest
 ):
-    media_type_name_lower = media_type_request.name.lower()
-
-    existing_media_type = db.query(SoftwareMediaType).filter(
-        func.lower(SoftwareMediaType.name) == media_type_name_lower).first()
-    if existing_media_type:
+    media_type_id = insert_unique_name(db, SoftwareMediaType, media_type_request.name)
+    if media_type_id is None:
         raise HTTPException(status_code=400, detail="Media type name already exists")
+    db.commit()
 
-    media_type_instance = SoftwareMediaType(name=media_type_request.name)
-    db.add(media_type_instance)
-    try:
-        db.commit()
-
-        await invalidate_redis_cache('cache:all_media_types')  # Invalidate cache
-
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=400, detail="Error adding media type")
-
-    db.refresh(media_type_instance)
+    await invalidate_redis_cache('cache:all_media_types')
 
     actionlog.add_log(
         "New software media type",
-        "{} added at {}".format(media_type_instance.name, datetime.now().strftime("%H:%M:%S")),
+        "{} added at {}".format(media_type_request.name, datetime.now().strftime("%H:%M:%S")),
         user.get('username')
     )
 
-    return {"message": "Media type added successfully", "id": media_type_instance.id, "name": media_type_instance.name}
+    return {"message": "Media type added successfully", "id": media_type_id, "name": media_type_request.name}
 
 
 @router.put("/update_media_type", status_code=status.HTTP_200_OK)
@@ -723,26 +603,17 @@ async def update_media_type(db: db_dependency, user: user_dependency,
                             media_type_id: int = Query(..., description="The ID of the media type to be updated")):
     validate_admin(user)
 
-    media_type_name_lower = media_type_request.name.lower()
-
-    existing_media_type = db.query(SoftwareMediaType).filter(
-        func.lower(SoftwareMediaType.name) == media_type_name_lower,
-        SoftwareMediaType.id != media_type_id
-    ).first()
-
-    if existing_media_type:
-        raise HTTPException(status_code=400, detail="Media type name already exists with another ID")
-
     media_type_to_update = db.query(SoftwareMediaType).filter(SoftwareMediaType.id == media_type_id).first()
     if not media_type_to_update:
         raise HTTPException(status_code=404, detail="Media type not found")
 
+    touch_synced_items(db, Software, Software.media_type_id == media_type_id)
     media_type_to_update.name = media_type_request.name
     try:
         db.commit()
     except IntegrityError:
         db.rollback()
-        raise HTTPException(status_code=400, detail="Error updating media type")
+        raise HTTPException(status_code=400, detail="Media type name already exists with another ID")
 
     db.refresh(media_type_to_update)
 
@@ -768,11 +639,12 @@ async def remove_media_type(media_type_id: int, db: db_dependency, user: user_de
     if not media_type_to_delete:
         raise HTTPException(status_code=404, detail="Media type not found")
 
-    associated_software = db.query(Software).filter(Software.media_type_id == media_type_id).all()
+    associated_software = reference_preview(
+        db.query(Software.id, Software.name).filter(Software.media_type_id == media_type_id).order_by(Software.id))
     if associated_software:
-        associated_software_details = [{"id": software.id, "name": software.name} for software in associated_software]
         return {"message": "Cannot delete media type with associated software items",
-                "associated_software": associated_software_details}
+                "associated_software": associated_software["items"],
+                "total": associated_software["total"]}
 
     db.delete(media_type_to_delete)
     db.commit()
@@ -783,32 +655,26 @@ async def remove_media_type(media_type_id: int, db: db_dependency, user: user_de
 
 
 @router.get("/get_all", status_code=status.HTTP_200_OK)
-async def get_all_software(db: db_dependency, user: user_dependency):
+async def get_all_software(request: Request, db: db_dependency, user: user_dependency,
+                           detail: str = Query('full', pattern=DETAIL_PATTERN, description=DESC_DETAIL)):
     validate_user(user)
 
-    redis = await get_redis_connection()
-    try:
-        cached_software = await redis.get("cache:all_software")
-        if cached_software:
-            print("\033[92m########## CACHE HIT ##########\033[0m")
-            return json.loads(cached_software)
-
-        software_list = (
-            db.query(Software)
-            .options(joinedload(Software.category), joinedload(Software.publisher),
-                     joinedload(Software.developer), joinedload(Software.platform),
-                     joinedload(Software.media_type))
-            .all()
-        )
-
-        result = [format_software_response(software, db) for software in software_list]
+    cache_key = "cache:all_software" if detail == 'full' else "cache:all_software:summary"
+    cached_software = await get_cached_response(request, cache_key)
+    if cached_software is not None:
+        return cached_software
 
-        await redis.set("cache:all_software", json.dumps(result), ex=3600)
+    software_list = (
+        db.query(Software)
+        .options(joinedload(Software.category), joinedload(Software.publisher),
+                 joinedload(Software.developer), joinedload(Software.platform),
+                 joinedload(Software.media_type), *detail_options(detail))
+        .all()
+    )
 
-        return result
+    result = [format_software_response(software, db, detail) for software in software_list]
 
-    finally:
-        await close_redis_connection(redis)
+    return await cache_response(request, cache_key, result)
 
 
 @router.get("/get_by_id/{id}", status_code=status.HTTP_200_OK)
@@ -819,7 +685,7 @@ async def get_by_id(db: db_dependency, user: user_dependency, id: int):
         db.query(Software)
         .options(joinedload(Software.category), joinedload(Software.publisher),
                  joinedload(Software.developer), joinedload(Software.platform),
-                 joinedload(Software.media_type))
+                 joinedload(Software.media_type), *detail_options())
         .filter(Software.id == id)
         .first()
     )
@@ -833,7 +699,8 @@ async def get_by_id(db: db_dependency, user: user_dependency, id: int):
 
 @router.get("/get_all_by_platform")
 async def get_all_by_platform(user: user_dependency, db: db_dependency, platform_name: str,
-                              exact_match: bool = Query(False, description="Enable exact match for platform name")):
+                              exact_match: bool = Query(False, description="Enable exact match for platform name"),
+                              detail: str = Query('full', pattern=DETAIL_PATTERN, description=DESC_DETAIL)):
     validate_user(user)
 
     platforms_query = db.query(SoftwarePlatform)
@@ -851,13 +718,13 @@ async def get_all_by_platform(user: user_dependency, db: db_dependency, platform
     software_records = (
         db.query(Software)
         .options(joinedload(Software.category), joinedload(Software.publisher),
-                 joinedload(Software.developer), joinedload(Software.media_type))
+                 joinedload(Software.developer), joinedload(Software.media_type), *detail_options(detail))
         .filter(Software.platform_id.in_(platform_ids))
         .all()
     )
 
-    responses = [format_software_response(software, db) for software in software_records]
-    return responses
+    responses = [format_software_response(software, db, detail) for software in software_records]
+    return json_response(responses)
 
 
 @router.get("/get_by_barcode/{barcode}", status_code=status.HTTP_200_OK)
@@ -868,7 +735,7 @@ async def get_software_by_barcode(db: db_dependency, user: user_dependency, barc
         db.query(Software)
         .options(joinedload(Software.category), joinedload(Software.publisher),
                  joinedload(Software.developer), joinedload(Software.platform),
-                 joinedload(Software.media_type))  # Removed joinedload(Software.location)
+                 joinedload(Software.media_type), *detail_options())
         .filter(Software.barcode == barcode)
         .first()
     )
@@ -882,12 +749,13 @@ async def get_software_by_barcode(db: db_dependency, user: user_dependency, barc
 
 @router.get("/get_by_name/{name}", status_code=status.HTTP_200_OK)
 async def get_software_by_name(user: user_dependency, db: db_dependency, name: str,
-                               exact_match: bool = Query(False, description=DESC_FUZZY)):
+                               exact_match: bool = Query(False, description=DESC_FUZZY),
+                               detail: str = Query('full', pattern=DETAIL_PATTERN, description=DESC_DETAIL)):
     validate_user(user)
 
     query = db.query(Software).options(joinedload(Software.category), joinedload(Software.publisher),
                                        joinedload(Software.developer), joinedload(Software.platform),
-                                       joinedload(Software.media_type))
+                                       joinedload(Software.media_type), *detail_options(detail))
     if exact_match:
         software_models = query.filter(Software.name == name).all()
     else:
@@ -896,13 +764,14 @@ async def get_software_by_name(user: user_dependency, db: db_dependency, name: s
     if not software_models:
         raise HTTPException(status_code=404, detail="Software not found with the specified name")
 
-    responses = [format_software_response(software, db) for software in software_models]
-    return responses
+    responses = [format_software_response(software, db, detail) for software in software_models]
+    return json_response(responses)
 
 
 @router.get("/get_by_publisher/{publisher_name}", status_code=status.HTTP_200_OK)
 async def get_by_publisher(user: user_dependency, db: db_dependency, publisher_name: str,
-                           exact_match: bool = Query(False, description=DESC_FUZZY)):
+                           exact_match: bool = Query(False, description=DESC_FUZZY),
+                           detail: str = Query('full', pattern=DETAIL_PATTERN, description=DESC_DETAIL)):
     validate_user(user)
 
     publishers_query = db.query(SoftwarePublisher)
@@ -920,18 +789,19 @@ async def get_by_publisher(user: user_dependency, db: db_dependency, publisher_n
     software_records = (
         db.query(Software)
         .options(joinedload(Software.category), joinedload(Software.developer),
-                 joinedload(Software.platform), joinedload(Software.media_type))
+                 joinedload(Software.platform), joinedload(Software.media_type), *detail_options(detail))
         .filter(Software.publisher_id.in_(publisher_ids))
         .all()
     )
 
-    responses = [format_software_response(software, db) for software in software_records]
-    return responses
+    responses = [format_software_response(software, db, detail) for software in software_records]
+    return json_response(responses)
 
 
 @router.get("/get_by_developer/{developer_name}", status_code=status.HTTP_200_OK)
 async def get_by_developer(user: user_dependency, db: db_dependency, developer_name: str,
-                           exact_match: bool = Query(False, description=DESC_FUZZY)):
+                           exact_match: bool = Query(False, description=DESC_FUZZY),
+                           detail: str = Query('full', pattern=DETAIL_PATTERN, description=DESC_DETAIL)):
     validate_user(user)
 
     developers_query = db.query(SoftwareDeveloper)
@@ -949,23 +819,24 @@ async def get_by_developer(user: user_dependency, db: db_dependency, developer_n
     software_records = (
         db.query(Software)
         .options(joinedload(Software.category), joinedload(Software.publisher),
-                 joinedload(Software.platform), joinedload(Software.media_type))
+                 joinedload(Software.platform), joinedload(Software.media_type), *detail_options(detail))
         .filter(Software.developer_id.in_(developer_ids))
         .all()
     )
 
-    responses = [format_software_response(software, db) for software in software_records]
-    return responses
+    responses = [format_software_response(software, db, detail) for software in software_records]
+    return json_response(responses)
 
 
 @router.get("/get_by_condition/{condition}", status_code=status.HTTP_200_OK)
 async def get_software_by_condition(user: user_dependency, db: db_dependency, condition: str,
-                                    exact_match: bool = Query(False, description="Enable exact match for condition")):
+                                    exact_match: bool = Query(False, description="Enable exact match for condition"),
+                                    detail: str = Query('full', pattern=DETAIL_PATTERN, description=DESC_DETAIL)):
     validate_user(user)
 
     query = db.query(Software).options(joinedload(Software.category), joinedload(Software.publisher),
                                        joinedload(Software.developer), joinedload(Software.platform),
-                                       joinedload(Software.media_type))
+                                       joinedload(Software.media_type), *detail_options(detail))
 
     if exact_match:
         software_models = query.filter(Software.condition == condition).all()
@@ -975,8 +846,8 @@ async def get_software_by_condition(user: user_dependency, db: db_dependency, co
     if not software_models:
         raise HTTPException(status_code=404, detail="No software found with the specified condition")
 
-    responses = [format_software_response(software, db) for software in software_models]
-    return responses
+    responses = [format_software_response(software, db, detail) for software in software_models]
+    return json_response(responses)
 
 
 @router.get("/search/")
@@ -989,7 +860,8 @@ async def software_search(
         developer: str = None,
         condition: str = None,
         platform: str = None,
-        limit: int = Query(100, description="Limit the number of results", le=1000)
+        limit: int = Query(100, description="Limit the number of results", le=1000),
+        detail: str = Query('full', pattern=DETAIL_PATTERN, description=DESC_DETAIL)
 ):
     validate_user(user)
 
@@ -1011,14 +883,14 @@ async def software_search(
         db.query(Software)
         .options(joinedload(Software.category), joinedload(Software.publisher),
                  joinedload(Software.developer), joinedload(Software.platform),
-                 joinedload(Software.media_type))
+                 joinedload(Software.media_type), *detail_options(detail))
         .filter(*filters)
         .limit(limit)
         .all()
     )
 
-    responses = [format_software_response(software, db) for software in software_models]
-    return responses
+    responses = [format_software_response(software, db, detail) for software in software_models]
+    return json_response(responses)
 
 
 @router.get("/search_by_tags", status_code=200)
@@ -1026,15 +898,49 @@ async def search_by_tags(
         db: db_dependency,
         user: user_dependency,
         tags: List[str] = Query(...),
-        match_type: str = Query("all", regex="^(all|any)$")
+        match_type: str = Query("all", regex="^(all|any)$"),
+        detail: str = Query('full', pattern=DETAIL_PATTERN, description=DESC_DETAIL)
 ):
     validate_user(user)
     if match_type == "all":
-        items = search_all_match(db, tags)
+        items = search_all_match(db, tags, detail)
     else:
-        items = search_any_match(db, tags)
+        items = search_any_match(db, tags, detail)
+
+    return json_response(items)
 
-    return items
+
+@router.get("/redump_lookup", status_code=status.HTTP_200_OK)
+async def redump_lookup(user: user_dependency, disc_id: str = Query(..., description="Redump disc id or disc URL")):
+    validate_user(user)
+
+    redump_id = parse_disc_id(disc_id)
+    if redump_id is None:
+        raise HTTPException(status_code=400, detail="Expected a redump disc id or a redump.org/disc/<id>/ URL")
+
+    game_data = await get_game_info(redump_id)
+    if game_data is None:
+        raise HTTPException(status_code=404, detail="Disc not found on redump.org")
+    return game_data
+
+
+@router.get("/get_redump_info/{software_id}", status_code=status.HTTP_200_OK)
+async def get_redump_info(db: db_dependency, user: user_dependency, software_id: int):
+    validate_user(user)
+
+    redump_disk_ids = db.query(Software.redump_disk_ids).filter(Software.id == software_id).first()
+    if redump_disk_ids is None:
+        raise HTTPException(status_code=404, detail="Software not found")
+
+    disc_ids = {identifier: parse_disc_id(identifier) for identifier in split_disc_ids(redump_disk_ids[0])}
+    if not disc_ids:
+        raise HTTPException(status_code=404, detail="Software has no redump disc ids")
+
+    # stored values that are not redump discs are reported, never fetched
+    games = await get_games_info(redump_id for redump_id in disc_ids.values() if redump_id)
+    discs = [{"disc_id": identifier, "info": games[redump_id] if redump_id else {"error": "Not a redump disc id"}}
+             for identifier, redump_id in disc_ids.items()]
+    return {"software_id": software_id, "discs": discs}
 
 
 @router.post("/add", status_code=status.HTTP_201_CREATED)
@@ -1092,9 +998,11 @@ async def add_software(
             software_tag = SoftwareTag(software_id=software_model.id, tag_id=tag.id)
             db.add(software_tag)
 
+    sync_file_references(db, 'software', software_model.id, software_model)
+
     db.commit()
 
-    await invalidate_redis_cache('cache:all_software')
+    await invalidate_redis_cache('cache:all_software*')
     await invalidate_redis_cache('cache:tags:*')
 
     actionlog.add_log(
@@ -1150,9 +1058,14 @@ async def update_software(
         if software_tag:
             db.delete(software_tag)
 
+    sync_file_references(db, 'software', software_id, software_model)
+
+    # Tag and location changes live in other tables, so bump the row explicitly for /sync.
+    software_model.updated_at = func.now()
+
     db.commit()
 
-    await invalidate_redis_cache('cache:all_software')
+    await invalidate_redis_cache('cache:all_software*')
     await invalidate_redis_cache('cache:tags:*')
 
     return {"message": "Software updated successfully", "id": software_model.id}
@@ -1170,10 +1083,13 @@ async def delete_software(user: user_dependency, db: db_dependency, software_id:
 
     db.query(ItemLocation).filter(ItemLocation.item_id == software_id, ItemLocation.item_type == 'software').delete()
 
+    remove_file_references(db, 'software', software_id)
+
     db.delete(software_model)
+    db.add(SyncTombstone(item_type='software', item_id=software_id))
     db.commit()
 
-    await invalidate_redis_cache('cache:all_software')
+    await invalidate_redis_cache('cache:all_software*')
     await invalidate_redis_cache('cache:tags:*')
 
     actionlog.add_log(
@@ -0,0 +1,90 @@
+"""Sync Module"""
+
+from fastapi import APIRouter, Query
+from sqlalchemy import text
+from sqlalchemy.orm import joinedload
+from starlette import status
+
+from dependencies import db_dependency, user_dependency
+from models import Hardware, Software, Books, SyncTombstone
+from tools.cache import json_response
+from tools.common import validate_user, detail_options
+from .books import format_book_response
+from .hardware import format_hardware_response
+from .software import format_software_response
+
+router = APIRouter(
+    prefix='/sync',
+    tags=['sync']
+)
+
+
+SNAPSHOT_XMIN_QUERY = text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+
+
+def _changes(db, model, options, since: int, xmin: int, limit: int = None, xid: int = None):
+    query = db.query(model).options(*options)
+    if xid is not None:
+        query = query.filter(model.sync_xid == xid)
+    else:
+        query = query.filter(model.sync_xid > since, model.sync_xid < xmin)
+    query = query.order_by(model.sync_xid, model.sync_version)
+    return query.limit(limit).all() if limit else query.all()
+
+
+@router.get("", status_code=status.HTTP_200_OK)
+async def sync_changes(db: db_dependency, user: user_dependency,
+                       since: int = Query(0, ge=0, description="Cursor returned by the previous sync, 0 for a full sync"),
+                       limit: int = Query(500, ge=1, le=5000, description="Maximum number of changes to return")):
+    validate_user(user)
+
+    # Transactions below the snapshot xmin have all finished, so none of them can still add a change the cursor has
+    # already moved past; anything newer waits for a later sync.
+    xmin = db.execute(SNAPSHOT_XMIN_QUERY).scalar()
+    sources = (
+        ('hardware', Hardware,
+         (joinedload(Hardware.brand), joinedload(Hardware.category), *detail_options())),
+        ('software', Software,
+         (joinedload(Software.category), joinedload(Software.publisher), joinedload(Software.developer),
+          joinedload(Software.platform), joinedload(Software.media_type), *detail_options())),
+        ('books', Books, tuple(detail_options())),
+        ('deleted', SyncTombstone, ()),
+    )
+    fetched = {change_type: _changes(db, model, options, since, xmin, limit)
+               for change_type, model, options in sources}
+
+    # Each table is read up to `limit` rows past the cursor. Merging them and keeping the lowest `limit` changes
+    # guarantees nothing at or below the new cursor is skipped, whichever table it lives in.
+    changes = sorted(
+        [(change_type, item) for change_type, rows in fetched.items() for item in rows],
+        key=lambda change: (change[1].sync_xid, change[1].sync_version)
+    )
+    # The cursor is a transaction id, so a page has to end on a whole transaction: rows of the last transaction
+    # read from a full table, or of the first one cut by the limit, may continue past what was fetched.
+    partial_xids = [rows[-1].sync_xid for rows in fetched.values() if len(rows) == limit]
+    if len(changes) > limit:
+        partial_xids.append(changes[limit][1].sync_xid)
+    has_more = bool(partial_xids)
+    if has_more:
+        boundary = min(partial_xids)
+        changes = [change for change in changes[:limit] if change[1].sync_xid < boundary]
+        if not changes:
+            # a single transaction larger than the limit is returned whole
+            changes = [(change_type, item) for change_type, model, options in sources
+                       for item in _changes(db, model, options, since, xmin, xid=boundary)]
+
+    response = {"cursor": changes[-1][1].sync_xid if changes else since, "has_more": has_more,
+                "hardware": [], "software": [], "books": [], "deleted": []}
+
+    for change_type, item in changes:
+        if change_type == 'hardware':
+            response["hardware"].append(format_hardware_response(item, db))
+        elif change_type == 'software':
+            response["software"].append(format_software_response(item, db))
+        elif change_type == 'books':
+            response["books"].append(format_book_response(item, db))
+        else:
+            response["deleted"].append({"item_type": item.item_type, "id": item.item_id,
+                                        "deleted_at": item.deleted_at})
+
+    return json_response(response)
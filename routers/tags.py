@@ -1,15 +1,15 @@
 """Tags Module"""
 
-import json
+from fastapi import APIRouter, HTTPException, Request
+from sqlalchemy import func, select
 
-from fastapi import APIRouter, HTTPException
-from sqlalchemy import func
-
-from database import get_redis_connection, close_redis_connection, invalidate_redis_cache
+from database import invalidate_redis_cache
 from definitions import DESC_TAG_404
 from dependencies import db_dependency, user_dependency
-from models import Tag, HardwareTag, SoftwareTag
-from tools.common import validate_user, validate_admin
+from models import Tag, HardwareTag, SoftwareTag, Hardware, Software
+from tools.cache import get_cached_response, cache_response
+from tools.common import validate_user, validate_admin, touch_synced_items
+from tools.dependency_check import is_referenced
 
 router = APIRouter(
     prefix='/tags',
@@ -18,33 +18,24 @@ router = APIRouter(
 
 
 @router.get("/get_all")
-async def get_all_tags(tag_type: str, db: db_dependency, user: user_dependency):
+async def get_all_tags(request: Request, tag_type: str, db: db_dependency, user: user_dependency):
     validate_user(user)
     if tag_type not in ['hardware', 'software', 'all']:
         raise HTTPException(status_code=400, detail="Invalid tag_type. Must be 'hardware', 'software', or 'all'.")
 
-    redis = await get_redis_connection()
     cache_key = f"cache:tags:{tag_type}"
+    cached_tags = await get_cached_response(request, cache_key)
+    if cached_tags is not None:
+        return cached_tags
 
-    try:
-        cached_tags = await redis.get(cache_key)
-        if cached_tags:
-            print("\033[92m########## CACHE HIT ##########\033[0m")
-            return json.loads(cached_tags)
-
-        if tag_type == 'all':
-            tags = db.query(Tag).all()
-        else:
-            tags = db.query(Tag).filter(Tag.tag_type == tag_type).all()
+    if tag_type == 'all':
+        tags = db.query(Tag).all()
+    else:
+        tags = db.query(Tag).filter(Tag.tag_type == tag_type).all()
 
-        tag_list = [{"id": tag.id, "name": tag.name, "tag_type": tag.tag_type} for tag in tags]
+    tag_list = [{"id": tag.id, "name": tag.name, "tag_type": tag.tag_type} for tag in tags]
 
-        await redis.set(cache_key, json.dumps(tag_list), ex=3600)
-
-        return tag_list
-
-    finally:
-        await close_redis_connection(redis)
+    return await cache_response(request, cache_key, tag_list)
 
 
 @router.get("/get_tag_by_name")
@@ -107,6 +98,10 @@ async def update_tag(tag_id: int, tag_name: str, tag_type: str, db: db_dependenc
 
     tag.name = standardized_tag_name
     tag.tag_type = tag_type
+    tagged_hardware = select(HardwareTag.hardware_id).where(HardwareTag.tag_id == tag_id)
+    tagged_software = select(SoftwareTag.software_id).where(SoftwareTag.tag_id == tag_id)
+    touch_synced_items(db, Hardware, Hardware.id.in_(tagged_hardware))
+    touch_synced_items(db, Software, Software.id.in_(tagged_software))
     db.commit()
     await invalidate_redis_cache("cache:tags:*")
 
@@ -120,10 +115,8 @@ async def remove_tag(tag_id: int, db: db_dependency, user: user_dependency):
     if not tag:
         raise HTTPException(status_code=404, detail=DESC_TAG_404)
 
-    hardware_in_use = db.query(HardwareTag).filter(HardwareTag.tag_id == tag_id).first()
-    software_in_use = db.query(SoftwareTag).filter(SoftwareTag.tag_id == tag_id).first()
-
-    if hardware_in_use or software_in_use:
+    if (is_referenced(db.query(HardwareTag.hardware_id).filter(HardwareTag.tag_id == tag_id))
+            or is_referenced(db.query(SoftwareTag.software_id).filter(SoftwareTag.tag_id == tag_id))):
         raise HTTPException(status_code=400, detail="Cannot remove tag as it is currently in use")
 
     db.delete(tag)
@@ -2,7 +2,6 @@ import secrets
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException
-from passlib.context import CryptContext
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 from starlette import status
@@ -11,6 +10,7 @@ from database import get_db
 from models import Users
 from tools.common import validate_user
 from tools.gmail_reset_pw import send_pw_reset_email
+from tools.passwords import hash_password, verify_password
 from .auth import get_current_user
 
 router = APIRouter(
@@ -20,7 +20,6 @@ router = APIRouter(
 
 db_dependency = Annotated[Session, Depends(get_db)]
 user_dependency = Annotated[dict, Depends(get_current_user)]
-bcrypt_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
 
 
 class UserVerification(BaseModel):
@@ -40,9 +39,10 @@ async def change_password(user: user_dependency, db: db_dependency,
     validate_user(user)
     user_model = db.query(Users).filter(Users.id == user.get('id')).first()
 
-    if not bcrypt_context.verify(user_verification.password, user_model.hashed_password):
+    valid, _ = await verify_password(user_verification.password, user_model.hashed_password)
+    if not valid:
         raise HTTPException(status_code=401, detail='Error on password change')
-    user_model.hashed_password = bcrypt_context.hash(user_verification.new_password)
+    user_model.hashed_password = await hash_password(user_verification.new_password)
     db.add(user_model)
     db.commit()
 
@@ -75,7 +75,7 @@ async def forgot_password(db: db_dependency, request_data: dict):
     if user_to_reset is None or user_to_reset.reset_token == 'NORESET':
         raise HTTPException(status_code=404, detail='Password reset request not found')
     else:
-        user_to_reset.hashed_password = bcrypt_context.hash(new_password)
+        user_to_reset.hashed_password = await hash_password(new_password)
         user_to_reset.reset_token = 'NORESET'
         db.commit()
         db.close()
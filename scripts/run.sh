@@ -24,6 +24,10 @@ if [ $? -ne 0 ]; then
 fi
 echo "Database migrations applied successfully."
 
+# admin and maintenance jobs (vacuum, reindex, SQL imports, file cleanup) run here, off the request path
+echo "Starting job worker..."
+python -u -m tools.job_worker >> "$LOGS_DIR/jobs.log" 2>&1 &
+
 MAX_CORES=4
 
 CPU_CORES=$(lscpu -p=CORE,SOCKET | grep -v '^#' | sort -u | wc -l)
@@ -43,6 +47,11 @@ if [ "$WORKERS" -lt 1 ]; then
 fi
 
 if [ "$MODE" = "multi" ]; then
+    # Shared directory so /metrics aggregates all Gunicorn workers. Stale files from a previous run must go.
+    export PROMETHEUS_MULTIPROC_DIR="/tmp/mancave_metrics"
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
     echo "Number of workers: $WORKERS"
     echo "Starting in multithreaded mode with Gunicorn..."
     gunicorn main:app -w $WORKERS -k uvicorn.workers.UvicornWorker --threads 2 -b 0.0.0.0:8080 --access-logfile $ACCESS_LOG --error-logfile $ERROR_LOG
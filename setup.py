@@ -13,7 +13,7 @@ setup(
     name='mancaveman',
     version='0.2.0',
     author='Omur Ozbahceliler',
-    packages=find_packages(exclude=('tests*', 'docs')),
+    packages=find_packages(exclude=('tests*', 'docs', 'benchmarks*')),
     install_requires=read_requirements(),
     python_requires='==3.10.*',
     description='Mancave manager',
@@ -0,0 +1,109 @@
+"""Shared test fixtures
+
+The app runs against a throwaway SQLite database seeded by benchmarks.seed, with an in-memory stand-in for Redis, so
+the suite needs neither PostgreSQL nor a Redis server.
+"""
+import fnmatch
+import os
+import tempfile
+from datetime import timedelta
+
+DB_DIR = tempfile.mkdtemp(prefix='mancave-tests-')
+os.environ.update(
+    SQLALCHEMY_DATABASE_URL=f"sqlite:///{os.path.join(DB_DIR, 'test.db')}",
+    REDIS_URL='redis://localhost:6379',
+    SECRET_KEY='tests',
+    ALGORITHM='HS256',
+    ACCESS_TOKEN_EXPIRE_MINUTES='60',
+    REFRESH_TOKEN_EXPIRE_HOURS='1',
+)
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy.dialects import sqlite  # noqa: E402
+
+import database  # noqa: E402
+import main  # noqa: E402
+import routers.auth  # noqa: E402
+import tools.cache  # noqa: E402
+from benchmarks import seed  # noqa: E402
+
+# small, fixed data set: query budgets in the tests depend on it
+SEED = dict(hardware=30, software=30, books=20, tags=5, location_depth=2, location_breadth=2, authors=20,
+            book_categories=5)
+
+
+class FakeRedis:
+    """The handful of Redis commands the app uses, kept in a dict shared by every connection."""
+    store = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        return True
+
+    async def keys(self, pattern):
+        return [key for key in self.store if fnmatch.fnmatchcase(key, pattern)]
+
+    async def scan_iter(self, match='*'):
+        for key in list(self.store):
+            if fnmatch.fnmatchcase(key, match):
+                yield key
+
+    async def delete(self, *keys):
+        return sum(self.store.pop(key, None) is not None for key in keys)
+
+    async def close(self):
+        pass
+
+
+async def fake_redis_connection():
+    return FakeRedis()
+
+
+@pytest.fixture(scope='session', autouse=True)
+def seeded_database():
+    database.Base.metadata.create_all(database.engine)
+    seed.seed(**SEED)
+    yield
+    database.engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def fake_redis(monkeypatch):
+    FakeRedis.store.clear()
+    monkeypatch.setattr(database, 'get_redis_connection', fake_redis_connection)
+    monkeypatch.setattr(tools.cache, 'get_redis_binary_connection', fake_redis_connection)
+    return FakeRedis.store
+
+
+@pytest.fixture
+def fake_redis_in(monkeypatch):
+    """Points modules that imported get_redis_connection by name at the fake too."""
+    def patch(*modules):
+        for module in modules:
+            monkeypatch.setattr(module, 'get_redis_connection', fake_redis_connection)
+    return patch
+
+
+@pytest.fixture
+def sqlite_upserts(monkeypatch):
+    """Swaps the PostgreSQL insert for SQLite's in the given modules, both support on_conflict_do_*."""
+    def patch(*modules):
+        for module in modules:
+            monkeypatch.setattr(module, 'insert', sqlite.insert)
+    return patch
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def not_revoked(jti):
+        return False
+
+    monkeypatch.setattr(routers.auth, 'is_revoked', not_revoked)
+    token = routers.auth.create_access_token('admin', 1, True, timedelta(hours=1))
+    return TestClient(main.app, headers={'Authorization': f'Bearer {token}'})
@@ -0,0 +1,52 @@
+import asyncio
+import json
+
+import main
+import tools.book_populator
+
+ISBNS = ['9780000000001', '9780000000002', '9780000000003', '9780000000004']
+
+
+def test_autofill_batch_streams_lines_as_lookups_finish(client, fake_redis_in, monkeypatch):
+    # TestClient collects the whole response before returning, so the app is driven directly to see when each
+    # body chunk is sent
+    finished = []
+
+    async def slow_lookup(redis, isbn, api_key):
+        await asyncio.sleep(0.05 * (ISBNS.index(isbn) + 1))
+        finished.append(isbn)
+        return {"title": f"Book {isbn}"}
+
+    fake_redis_in(tools.book_populator)
+    monkeypatch.setattr(tools.book_populator, '_lookup', slow_lookup)
+
+    body = json.dumps({"isbns": ISBNS}).encode()
+    headers = [(b'content-type', b'application/json'), (b'accept-encoding', b'gzip'),
+               (b'content-length', str(len(body)).encode()),
+               (b'authorization', client.headers['authorization'].encode())]
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'POST', 'scheme': 'http',
+             'path': '/books/autofill/batch', 'raw_path': b'/books/autofill/batch', 'root_path': '',
+             'query_string': b'', 'headers': headers, 'client': ('testclient', 50000), 'server': ('testserver', 80)}
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    start, chunks = {}, []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(10)
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            start.update(message)
+        elif message['type'] == 'http.response.body' and message.get('body'):
+            chunks.append((message['body'], len(finished)))
+
+    asyncio.run(main.app(scope, receive, send))
+
+    assert start['status'] == 200
+    assert b'content-encoding' not in dict(start['headers'])
+    first_line, lookups_done = chunks[0]
+    assert json.loads(first_line) == {"isbn": ISBNS[0], "book": {"title": f"Book {ISBNS[0]}"}}
+    assert lookups_done < len(ISBNS)
+    assert [json.loads(chunk)["isbn"] for chunk, _ in chunks] == ISBNS
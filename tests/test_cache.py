@@ -0,0 +1,21 @@
+import asyncio
+
+from conftest import FakeRedis
+from tools.cache import clear_response_caches
+
+
+def test_clear_response_caches_keeps_jobs_tokens_and_lookups(fake_redis):
+    fake_redis.update({
+        'cache:all_hardware': b'[]',
+        'cache:tags:hardware': b'[]',
+        'cache:isbn:9780000000001': '{}',
+        'cache:redump:1234': '{}',
+        'jobs:queue': 'job-id',
+        'jobs:active:vacuum': 'job-id',
+        'blacklist:token-id': '1',
+    })
+
+    asyncio.run(clear_response_caches(FakeRedis()))
+
+    assert sorted(fake_redis) == ['blacklist:token-id', 'cache:isbn:9780000000001', 'cache:redump:1234',
+                                  'jobs:active:vacuum', 'jobs:queue']
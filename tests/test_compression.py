@@ -0,0 +1,39 @@
+import pytest
+
+from tools.compression import gzip_accepted
+
+
+@pytest.mark.parametrize('accept_encoding, expected', [
+    ('gzip', True),
+    ('gzip, deflate, br', True),
+    ('br;q=1.0, gzip;q=0.8', True),
+    ('x-gzip', True),
+    ('*', True),
+    ('GZIP', True),
+    ('', False),
+    ('gzip;q=0', False),
+    ('gzip; q=0.0, deflate', False),
+    ('*, gzip;q=0', False),
+    ('identity, x-gzip-bogus', False),
+    ('deflate, br', False),
+    ('*;q=0', False),
+])
+def test_gzip_accepted(accept_encoding, expected):
+    assert gzip_accepted(accept_encoding) is expected
+
+
+def test_large_response_honours_gzip_q_zero(client):
+    # the first request stores the cache entry, the second is served from it
+    for _ in range(2):
+        response = client.get('/hardware/get_all', headers={'Accept-Encoding': 'gzip;q=0'})
+
+        assert response.status_code == 200
+        assert 'content-encoding' not in response.headers
+
+
+def test_large_response_is_gzipped(client):
+    response = client.get('/hardware/get_all', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.status_code == 200
+    assert response.headers['content-encoding'] == 'gzip'
+    assert len(response.json()) == 30
@@ -0,0 +1,111 @@
+import asyncio
+import hashlib
+import importlib.util
+import os
+
+import pytest
+
+import database
+import tools.file_cleanup
+import tools.uploads
+from models import Hardware, StoredFile, FileReference
+from tools.file_cleanup import run_cleanup
+from tools.request_stats import count_queries
+from tools.uploads import UPLOAD_DIRS, sync_file_references
+
+OLD_MTIME = 946684800  # 2000-01-01, well outside any grace period
+
+# migrations are not a package, so the backfill is loaded from its file
+_spec = importlib.util.spec_from_file_location(
+    'backfill_file_references',
+    os.path.join(os.path.dirname(__file__), '..', 'alembic', 'versions', 'c52d8e4a9b17_backfill_file_references.py'))
+backfill = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(backfill)
+
+
+def _write_upload(content: bytes, name: str = None):
+    sha256 = hashlib.sha256(content).hexdigest()
+    path = os.path.join(UPLOAD_DIRS['img'], name or f"{sha256}.jpg")
+    with open(path, 'wb') as file:
+        file.write(content)
+    os.utime(path, (OLD_MTIME, OLD_MTIME))
+    return sha256, path
+
+
+@pytest.fixture
+def uploads(tmp_path, monkeypatch, fake_redis_in, sqlite_upserts):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(UPLOAD_DIRS['img'])
+    os.makedirs(UPLOAD_DIRS['doc'])
+    sqlite_upserts(tools.uploads)
+    fake_redis_in(tools.file_cleanup)
+
+    db = database.SessionLocal()
+    yield db
+    db.rollback()
+    db.query(FileReference).delete()
+    db.query(StoredFile).delete()
+    db.query(Hardware).filter(Hardware.model.like('cleanup test %')).delete(synchronize_session=False)
+    db.commit()
+    db.close()
+
+
+def _add_item(db, photos):
+    item = Hardware(model=f"cleanup test {photos}", quantity=1, photos=photos)
+    db.add(item)
+    db.flush()
+    return item
+
+
+def test_dry_run_keeps_files_referenced_in_any_path_form(uploads):
+    db = uploads
+    url_form = _write_upload(b'url form')
+    dot_form = _write_upload(b'dot form')
+    name_form = _write_upload(b'name form')
+    orphan = _write_upload(b'orphan')
+    for sha256, path in (url_form, dot_form, name_form, orphan):
+        db.add(StoredFile(sha256=sha256, path=path, file_type='img', size=os.path.getsize(path)))
+
+    item = _add_item(db, f"/files/{url_form[1]}, ./{dot_form[1]}")
+    other = _add_item(db, os.path.basename(name_form[1]))
+    sync_file_references(db, 'hardware', item.id, item)
+    sync_file_references(db, 'hardware', other.id, other)
+    db.commit()
+
+    references = {sha256 for (sha256,) in db.query(FileReference.sha256)}
+    assert references == {url_form[0], dot_form[0], name_form[0]}
+
+    progress = asyncio.run(run_cleanup(dry_run=True, grace_minutes=0, username='admin'))
+
+    assert progress['status'] == 'finished'
+    assert progress['files'] == [orphan[1]]
+    assert all(os.path.exists(path) for _, path in (url_form, dot_form, name_form, orphan))
+
+
+def test_backfill_links_items_that_only_name_their_files(uploads):
+    db = uploads
+    unsynced = _write_upload(b'referenced before references were recorded')
+    legacy = _write_upload(b'legacy upload', name='holiday.jpg')
+    orphan = _write_upload(b'orphan')
+    for sha256, path in (unsynced, orphan):
+        db.add(StoredFile(sha256=sha256, path=path, file_type='img', size=os.path.getsize(path)))
+    item = _add_item(db, f"./{unsynced[1]}, holiday.jpg")
+    db.commit()
+
+    backfill.backfill_file_references(db.connection())
+    db.commit()
+
+    references = {(sha256, item_id, field) for sha256, item_id, field in
+                  db.query(FileReference.sha256, FileReference.item_id, FileReference.field)}
+    assert references == {(unsynced[0], item.id, 'photos'), (legacy[0], item.id, 'photos')}
+    assert db.query(StoredFile.path).filter(StoredFile.sha256 == legacy[0]).scalar() == legacy[1]
+
+    with count_queries() as stats:
+        progress = asyncio.run(run_cleanup(dry_run=False, grace_minutes=0, username='admin'))
+
+    # orphans are decided from the index, the item tables are never searched
+    assert stats['queries'] and not any('FROM hardware' in statement or 'FROM software' in statement
+                                        for statement in stats['statements'])
+    assert progress['status'] == 'finished' and progress['deleted'] == 1
+    assert not os.path.exists(orphan[1])
+    assert os.path.exists(unsynced[1]) and os.path.exists(legacy[1])
@@ -0,0 +1,149 @@
+import asyncio
+import functools
+import os
+
+import httpx
+import pytest
+
+import database
+import tools.game_populator
+from models import Software
+from tools.game_populator import parse_disc_page, parse_disc_id, get_games_info, get_game_info, REDUMP_DISC_URL
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def _fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as file:
+        return file.read()
+
+
+def test_parse_single_disc_page():
+    assert parse_disc_page(_fixture('redump_disc_single.html')) == {
+        "title": "Tekken 3",
+        "system": "Sony PlayStation",
+        "media": "CD",
+        "category": "Games",
+        "region": "Europe",
+        "languages": "English",
+        "version": None,
+        "edition": "Original",
+    }
+
+
+def test_parse_multilingual_disc_page():
+    assert parse_disc_page(_fixture('redump_disc_multilingual.html')) == {
+        "title": "Grand Theft Auto: Vice City",
+        "system": "Sony PlayStation 2",
+        "media": "DVD-5",
+        "category": "Games",
+        "region": "Europe, Australia",
+        "languages": "English, French, German",
+        "version": "1.03",
+        "edition": "Platinum",
+    }
+
+
+def test_get_games_info_keeps_other_discs_when_one_fails(fake_redis_in, monkeypatch):
+    async def lookup(redis, identifier):
+        if identifier == '2':
+            raise ValueError("unexpected page layout")
+        return {"title": f"Disc {identifier}"}
+
+    fake_redis_in(tools.game_populator)
+    monkeypatch.setattr(tools.game_populator, '_lookup', lookup)
+
+    assert asyncio.run(get_games_info(['1', '2', '3'])) == {
+        '1': {"title": "Disc 1"},
+        '2': {"error": "Lookup failed"},
+        '3': {"title": "Disc 3"},
+    }
+
+
+@pytest.mark.parametrize('identifier, disc_id', [
+    ('4201', '4201'),
+    (' 004201 ', '4201'),
+    ('http://redump.org/disc/4201/', '4201'),
+    ('https://www.redump.org/disc/4201', '4201'),
+    ('http://example.com/disc/4201/', None),
+    ('http://redump.org@example.com/disc/4201/', None),
+    ('http://redump.org.example.com/disc/4201/', None),
+    ('ftp://redump.org/disc/4201/', None),
+    ('https://redump.org/discs/system/psx/', None),
+    ('http://127.0.0.1:6379/', None),
+    ('../admin', None),
+    ('4201?x=1', None),
+])
+def test_parse_disc_id(identifier, disc_id):
+    assert parse_disc_id(identifier) == disc_id
+
+
+def _mock_redump(monkeypatch, handler):
+    # the client is created lazily, so every client made during the test gets the mock transport
+    monkeypatch.setattr(httpx, 'AsyncClient',
+                        functools.partial(httpx.AsyncClient, transport=httpx.MockTransport(handler)))
+    monkeypatch.setitem(tools.game_populator._client_state, 'client', None)
+
+
+@pytest.fixture
+def redump_requests(fake_redis_in, monkeypatch):
+    """Serves every redump request from the single disc fixture and records the requested URLs."""
+    requested = []
+    page = _fixture('redump_disc_single.html')
+
+    def handler(request):
+        requested.append(str(request.url))
+        return httpx.Response(200, text=page)
+
+    fake_redis_in(tools.game_populator)
+    _mock_redump(monkeypatch, handler)
+    return requested
+
+
+@pytest.mark.parametrize('disc_id', ['http://example.com/disc/1/', 'http://169.254.169.254/latest/', 'abc'])
+def test_redump_lookup_rejects_anything_but_a_disc_id(client, redump_requests, disc_id):
+    response = client.get('/software/redump_lookup', params={'disc_id': disc_id})
+
+    assert response.status_code == 400
+    assert redump_requests == []
+
+
+def test_redump_lookup_fetches_the_disc_page_for_a_url(client, redump_requests):
+    response = client.get('/software/redump_lookup', params={'disc_id': 'https://redump.org/disc/4201/'})
+
+    assert response.status_code == 200 and response.json()['title'] == "Tekken 3"
+    assert redump_requests == [f"{REDUMP_DISC_URL}4201/"]
+
+
+def test_redump_info_never_fetches_stored_urls_of_other_hosts(client, redump_requests):
+    db = database.SessionLocal()
+    software = Software(redump_disk_ids="4201, http://example.com/disc/4201/")
+    db.add(software)
+    db.commit()
+    try:
+        response = client.get(f'/software/get_redump_info/{software.id}')
+    finally:
+        db.delete(software)
+        db.commit()
+        db.close()
+
+    assert response.status_code == 200
+    assert response.json()['discs'] == [
+        {"disc_id": "4201", "info": parse_disc_page(_fixture('redump_disc_single.html'))},
+        {"disc_id": "http://example.com/disc/4201/", "info": {"error": "Not a redump disc id"}},
+    ]
+    assert redump_requests == [f"{REDUMP_DISC_URL}4201/"]
+
+
+def test_redirects_off_redump_are_not_followed(fake_redis_in, monkeypatch):
+    requested = []
+
+    def handler(request):
+        requested.append(request.url.host)
+        return httpx.Response(302, headers={'Location': 'http://example.com/internal'})
+
+    fake_redis_in(tools.game_populator)
+    _mock_redump(monkeypatch, handler)
+
+    assert asyncio.run(get_game_info('4201')) is None
+    assert requested == ['redump.org']
@@ -0,0 +1,38 @@
+import pytest
+
+from tools.request_stats import assert_max_queries, count_queries
+
+# What the endpoint runs today for the seeded data; a new per-item query adds one per row and fails the test
+HARDWARE_GET_ALL_QUERIES = 171
+
+
+def test_count_queries_includes_requests(client):
+    with count_queries() as stats:
+        response = client.get('/hardware/get_all')
+
+    assert response.status_code == 200
+    assert stats['queries'] > 0
+
+
+def test_hardware_get_all_query_budget(client):
+    with assert_max_queries(HARDWARE_GET_ALL_QUERIES):
+        response = client.get('/hardware/get_all')
+
+    assert response.status_code == 200
+    assert len(response.json()) == 30
+
+
+def test_assert_max_queries_fails_on_n_plus_one(client, monkeypatch):
+    import routers.hardware
+    from models import Hardware
+
+    format_response = routers.hardware.format_hardware_response
+
+    def format_with_extra_query(hardware, db, detail='full'):
+        db.query(Hardware.model).filter(Hardware.id == hardware.id).scalar()
+        return format_response(hardware, db, detail)
+
+    monkeypatch.setattr(routers.hardware, 'format_hardware_response', format_with_extra_query)
+    with pytest.raises(AssertionError, match='Expected at most'):
+        with assert_max_queries(HARDWARE_GET_ALL_QUERIES):
+            client.get('/hardware/get_all')
@@ -1,17 +1,52 @@
 """Log populator module"""
 import datetime
+import queue
+import threading
 
 from sqlalchemy.orm import sessionmaker
 
 import database
 from models import ActionLog
+from tools.metrics import ACTIONLOG_QUEUE
 
 Session = sessionmaker(bind=database.engine)
-session = Session()
+
+ACTIONLOG_BATCH_SIZE = 100
+
+# Handlers only enqueue; a single writer thread commits, so logging never costs a request a DB round trip
+_log_queue = queue.Queue()
+
+
+def _write_logs():
+    while True:
+        entries = [_log_queue.get()]
+        while len(entries) < ACTIONLOG_BATCH_SIZE:
+            try:
+                entries.append(_log_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        session = Session()
+        try:
+            session.add_all(entries)
+            session.commit()
+        except Exception as e:
+            print(f"Error writing action log: {e}")
+            session.rollback()
+        finally:
+            session.close()
+            for _ in entries:
+                _log_queue.task_done()
+            ACTIONLOG_QUEUE.set(_log_queue.qsize())
 
 
 def add_log(action: str, log: str, user: str):
-    log_entry = ActionLog(action=action, user=user, log=log, log_date=datetime.date.today())
-    session.add(log_entry)
-    session.commit()
-    session.close()
+    _log_queue.put(ActionLog(action=action, user=user, log=log, log_date=datetime.date.today()))
+    ACTIONLOG_QUEUE.set(_log_queue.qsize())
+
+
+def flush_logs():
+    _log_queue.join()
+
+
+threading.Thread(target=_write_logs, name='actionlog-writer', daemon=True).start()
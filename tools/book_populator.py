@@ -1,49 +1,212 @@
-import requests
+"""Book populator module
 
+Looks up ISBNs on Google Books with a shared async httpx client. Results, including "not found", are cached in
+Redis and in a small per-worker cache, and calls are rate limited per API key across all workers.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from collections import OrderedDict
 
-async def get_book_info(isbn, api_key=None):
-    base_url = "https://www.googleapis.com/books/v1/volumes"
+import httpx
 
-    params = {"q": f"isbn:{isbn}"}
+from database import get_redis_connection, close_redis_connection
+
+# point this at benchmarks/books_stub.py to work without hitting Google
+GOOGLE_BOOKS_URL = os.getenv("GOOGLE_BOOKS_URL", "https://www.googleapis.com/books/v1/volumes")
+BOOKS_API_TIMEOUT = httpx.Timeout(float(os.getenv("BOOKS_API_TIMEOUT", "10")), connect=3.0)
+BOOKS_API_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+BOOKS_API_RETRIES = 3
+BOOKS_API_BACKOFF_SECONDS = 0.5
+BOOKS_API_RATE_PER_SECOND = int(os.getenv("BOOKS_API_RATE_PER_SECOND", "5"))
+BOOKS_API_MAX_WAIT_SECONDS = 10
+BATCH_CONCURRENCY = int(os.getenv("BOOKS_BATCH_CONCURRENCY", "8"))
+
+ISBN_CACHE_PREFIX = 'cache:isbn:'
+ISBN_CACHE_SECONDS = int(os.getenv("ISBN_CACHE_HOURS", "720")) * 3600
+# unknown ISBNs are cached too, but not as long, Google may add them later
+ISBN_NEGATIVE_CACHE_SECONDS = int(os.getenv("ISBN_NEGATIVE_CACHE_HOURS", "24")) * 3600
+LOCAL_CACHE_SIZE = 1024
+LOCAL_CACHE_SECONDS = 300
+NOT_FOUND = 'null'
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_client_state = {'client': None}
+_local_cache = OrderedDict()
+
+
+def _get_client() -> httpx.AsyncClient:
+    if _client_state['client'] is None:
+        _client_state['client'] = httpx.AsyncClient(timeout=BOOKS_API_TIMEOUT, limits=BOOKS_API_LIMITS)
+    return _client_state['client']
+
+
+async def close_books_client():
+    client = _client_state['client']
+    _client_state['client'] = None
+    if client is not None:
+        await client.aclose()
+
+
+def normalize_isbn(isbn: str) -> str:
+    return isbn.replace('-', '').replace(' ', '').strip().upper()
+
+
+def _local_get(isbn: str):
+    entry = _local_cache.get(isbn)
+    if entry is None:
+        return None
+    expires_at, value = entry
+    if expires_at < time.monotonic():
+        del _local_cache[isbn]
+        return None
+    _local_cache.move_to_end(isbn)
+    return value
+
+
+def _local_set(isbn: str, value: str):
+    _local_cache[isbn] = (time.monotonic() + LOCAL_CACHE_SECONDS, value)
+    _local_cache.move_to_end(isbn)
+    while len(_local_cache) > LOCAL_CACHE_SIZE:
+        _local_cache.popitem(last=False)
+
+
+async def _wait_for_rate_slot(redis, api_key) -> bool:
+    # fixed one second windows shared by all workers; keys are hashed so they never end up in Redis
+    bucket = hashlib.sha256((api_key or 'anonymous').encode()).hexdigest()[:16]
+    deadline = time.time() + BOOKS_API_MAX_WAIT_SECONDS
+    while True:
+        window = int(time.time())
+        key = f'ratelimit:books:{bucket}:{window}'
+        count = await redis.incr(key)
+        if count == 1:
+            await redis.expire(key, 2)
+        if count <= BOOKS_API_RATE_PER_SECOND:
+            return True
+        if time.time() >= deadline:
+            return False
+        await asyncio.sleep(max(window + 1 - time.time(), 0.01))
+
+
+def _parse_book(book_data):
+    if "items" not in book_data:
+        return None
+
+    this_book = {}
+    volume_info = book_data["items"][0]["volumeInfo"]
+
+    this_book.update({'title': volume_info.get('title', '')})
+    this_book.update({'subtitle': volume_info.get('subtitle', '')})
+    this_book.update({'author': volume_info.get('authors', [])})
+    this_book.update({'publisher': volume_info.get('publisher', '')})
+    this_book.update({'published_date': volume_info.get('publishedDate', '')})
+    this_book.update({'description': volume_info.get('description', '')})
+    this_book.update({'category': volume_info.get('categories', [])})
+    this_book.update({'print_type': volume_info.get('printType', '')})
+    this_book.update({'maturity_rating': volume_info.get('maturityRating', '')})
 
+    identifiers = volume_info.get('industryIdentifiers', [])
+    this_book.update({'isbn_10': identifiers[1]['identifier'] if len(identifiers) > 1 else ''})
+    this_book.update({'isbn_13': identifiers[0]['identifier'] if identifiers else ''})
+
+    return this_book
+
+
+async def _fetch_book(redis, isbn: str, api_key=None):
+    """Returns (book or None, cacheable); errors are returned as {"error": ...} and never cached."""
+    params = {"q": f"isbn:{isbn}"}
     if api_key:
         params["key"] = api_key
 
-    try:
-        response = requests.get(base_url, params=params)
+    response = None
+    for attempt in range(BOOKS_API_RETRIES + 1):
+        if attempt:
+            await asyncio.sleep(BOOKS_API_BACKOFF_SECONDS * 2 ** (attempt - 1) * (1 + random.random()))
+        if not await _wait_for_rate_slot(redis, api_key):
+            return {"error": "Too many requests"}, False
+
+        try:
+            response = await _get_client().get(GOOGLE_BOOKS_URL, params=params)
+        except httpx.HTTPError as e:
+            print(f"Error making API request: {e}")
+            continue
 
         if response.status_code == 400:
-            error_message = "Bad Request: Invalid API Key"
-            return {"error": error_message}
-        elif response.status_code == 429:
-            error_message = "Too many requests"
-            return {"error": error_message}
-
-        response.raise_for_status()
-        book_data = response.json()
-
-        if "items" in book_data:
-            this_book = {}
-            volume_info = book_data["items"][0]["volumeInfo"]
-
-            this_book.update({'title': volume_info.get('title', '')})
-            this_book.update({'subtitle': volume_info.get('subtitle', '')})
-            this_book.update({'author': volume_info.get('authors', [])})
-            this_book.update({'publisher': volume_info.get('publisher', '')})
-            this_book.update({'published_date': volume_info.get('publishedDate', '')})
-            this_book.update({'description': volume_info.get('description', '')})
-            this_book.update({'category': volume_info.get('categories', [])})
-            this_book.update({'print_type': volume_info.get('printType', '')})
-            this_book.update({'maturity_rating': volume_info.get('maturityRating', '')})
-
-            identifiers = volume_info.get('industryIdentifiers', [])
-            this_book.update({'isbn_10': identifiers[1]['identifier'] if len(identifiers) > 1 else ''})
-            this_book.update({'isbn_13': identifiers[0]['identifier'] if identifiers else ''})
-
-            return this_book
-        else:
-            return None
-
-    except requests.exceptions.RequestException as e:
-        print(f"Error making API request: {e}")
-        return None
+            return {"error": "Bad Request: Invalid API Key"}, False
+        if response.status_code in RETRY_STATUSES:
+            continue
+        if response.status_code >= 400:
+            print(f"Error making API request: HTTP {response.status_code}")
+            return None, False
+
+        return _parse_book(response.json()), True
+
+    if response is not None and response.status_code == 429:
+        return {"error": "Too many requests"}, False
+    return None, False
+
+
+async def _lookup(redis, isbn: str, api_key=None):
+    cached = _local_get(isbn)
+    if cached is not None:
+        return json.loads(cached)
+
+    cached = await redis.get(ISBN_CACHE_PREFIX + isbn)
+    if cached is not None:
+        _local_set(isbn, cached)
+        return json.loads(cached)
+
+    book, cacheable = await _fetch_book(redis, isbn, api_key)
+    if cacheable:
+        value = json.dumps(book) if book else NOT_FOUND
+        await redis.set(ISBN_CACHE_PREFIX + isbn, value,
+                        ex=ISBN_CACHE_SECONDS if book else ISBN_NEGATIVE_CACHE_SECONDS)
+        _local_set(isbn, value)
+    return book
+
+
+async def get_book_info(isbn, api_key=None):
+    isbn = normalize_isbn(isbn)
+    cached = _local_get(isbn)
+    if cached is not None:
+        return json.loads(cached)
+
+    redis = await get_redis_connection()
+    try:
+        return await _lookup(redis, isbn, api_key)
+    finally:
+        await close_redis_connection(redis)
+
+
+async def get_books_info(isbns, api_key=None, concurrency: int = BATCH_CONCURRENCY):
+    """
+    Looks up many ISBNs at once and yields (isbn, book) as each one completes, not in request order. Duplicates are
+    looked up once, at most `concurrency` requests are in flight and all of them share one Redis connection.
+    """
+    unique_isbns = list(dict.fromkeys(normalize_isbn(isbn) for isbn in isbns if isbn.strip()))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    redis = await get_redis_connection()
+
+    async def lookup(isbn):
+        async with semaphore:
+            try:
+                return isbn, await _lookup(redis, isbn, api_key)
+            except Exception as e:
+                print(f"Error looking up ISBN {isbn}: {e}")
+                return isbn, {"error": "Lookup failed"}
+
+    tasks = [asyncio.create_task(lookup(isbn)) for isbn in unique_isbns]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        # the client may hang up halfway through the stream
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await close_redis_connection(redis)
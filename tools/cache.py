@@ -0,0 +1,92 @@
+"""Response cache module"""
+import gzip
+import os
+
+import orjson
+from starlette.responses import Response
+
+from database import get_redis_binary_connection, close_redis_connection
+from tools.book_populator import ISBN_CACHE_PREFIX
+from tools.compression import gzip_accepted
+from tools.game_populator import REDUMP_CACHE_PREFIX
+
+CACHE_SECONDS = 3600
+# bodies smaller than this are stored and sent as-is, compressing them gains nothing
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "6"))
+GZIP_MAGIC = b'\x1f\x8b'
+RESPONSE_CACHE_PATTERN = 'cache:*'
+# lookups from external APIs stay valid whatever the app version, only cached responses are dropped on shutdown
+PERSISTENT_CACHE_PREFIXES = (ISBN_CACHE_PREFIX, REDUMP_CACHE_PREFIX)
+CLEAR_BATCH_SIZE = 500
+
+
+class RawJSONResponse(Response):
+    """Sends an already encoded JSON body as-is, skipping FastAPI's encode step."""
+    media_type = "application/json"
+
+
+def json_response(data) -> RawJSONResponse:
+    # for plain dicts/lists built by the formatters; orjson is several times faster than jsonable_encoder + json
+    return RawJSONResponse(orjson.dumps(data))
+
+
+def accepts_gzip(request) -> bool:
+    return gzip_accepted(request.headers.get('accept-encoding', ''))
+
+
+def _gzip_response(body: bytes) -> RawJSONResponse:
+    return RawJSONResponse(body, headers={'Content-Encoding': 'gzip', 'Vary': 'Accept-Encoding'})
+
+
+async def get_cached_response(request, key: str):
+    redis = await get_redis_binary_connection()
+    try:
+        cached = await redis.get(key)
+    finally:
+        await close_redis_connection(redis)
+
+    if cached is None:
+        return None
+    # large entries are stored gzipped (JSON can never start with the gzip magic bytes), and sent without
+    # recompressing; only clients that don't accept gzip pay for a decompress
+    if not cached.startswith(GZIP_MAGIC):
+        return RawJSONResponse(cached)
+    if accepts_gzip(request):
+        return _gzip_response(cached)
+    return RawJSONResponse(gzip.decompress(cached))
+
+
+def encode_cache_entry(data):
+    """Returns (JSON body, what goes into Redis): the body itself, or its gzip when it is large enough."""
+    body = orjson.dumps(data)
+    return body, gzip.compress(body, COMPRESS_LEVEL) if len(body) >= COMPRESS_MIN_BYTES else body
+
+
+def decode_cache_entry(stored: bytes):
+    return orjson.loads(gzip.decompress(stored) if stored.startswith(GZIP_MAGIC) else stored)
+
+
+async def cache_response(request, key: str, data, ex: int = CACHE_SECONDS) -> RawJSONResponse:
+    body, stored = encode_cache_entry(data)
+
+    redis = await get_redis_binary_connection()
+    try:
+        await redis.set(key, stored, ex=ex)
+    finally:
+        await close_redis_connection(redis)
+
+    if stored is not body and accepts_gzip(request):
+        return _gzip_response(stored)
+    return RawJSONResponse(body)
+
+
+async def clear_response_caches(redis):
+    """
+    Deletes the cached responses, leaving everything else in Redis alone: the job queue and its records, revoked
+    tokens, rate limits and the ISBN / redump lookups.
+    """
+    keys = [key async for key in redis.scan_iter(match=RESPONSE_CACHE_PATTERN)
+            if not key.startswith(PERSISTENT_CACHE_PREFIXES)]
+    for start in range(0, len(keys), CLEAR_BATCH_SIZE):
+        await redis.delete(*keys[start:start + CLEAR_BATCH_SIZE])
@@ -1,12 +1,15 @@
 # shared functions
 import json
-import random
 import secrets
-import string
 from datetime import datetime
 
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import undefer_group
 from starlette.exceptions import HTTPException
 
+from models import DETAILS_GROUP, Hardware, Software, Books, ItemLocation, Location
+
 
 def validate_user(user):
     if user is None:
@@ -20,10 +23,41 @@ def validate_admin(user):
     return True
 
 
-def randomize_filename(file_to_rename: str, filename_length: int = 16):
-    file_extension = file_to_rename.split(".")[-1]
-    random_name = ''.join(random.choice(string.ascii_lowercase) for _ in range(filename_length))
-    return f"{random_name}.{file_extension}"
+def detail_options(detail: str = 'full'):
+    # full responses load the deferred columns in the main query instead of one lazy load per row
+    return [undefer_group(DETAILS_GROUP)] if detail == 'full' else []
+
+
+def insert_unique_name(db, model, name: str):
+    """
+    Inserts a lookup row (brand, category, publisher...) in one statement, relying on the unique lower(name) index
+    instead of a check-then-insert. Returns the new id, or None if the name already exists in any case.
+    """
+    statement = (
+        insert(model)
+        .values(name=name)
+        .on_conflict_do_nothing(index_elements=[func.lower(model.name)])
+        .returning(model.id)
+    )
+    return db.execute(statement).scalar()
+
+
+def touch_synced_items(db, model, condition):
+    """
+    Gives the matching items a new sync_version, for changes to a name their responses embed (brand, category, tag,
+    location...), so /sync sends them again. Runs in the caller's transaction.
+    """
+    db.query(model).filter(condition).update({model.updated_at: func.now()}, synchronize_session=False)
+
+
+def touch_items_in_location(db, location_id: int):
+    # responses carry the whole location path, so items anywhere below the location change too
+    subtree = select(Location.id).where(Location.id == location_id).cte(recursive=True)
+    subtree = subtree.union_all(select(Location.id).where(Location.parent_id == subtree.c.id))
+    for model, item_type in ((Hardware, 'hardware'), (Software, 'software'), (Books, 'book')):
+        item_ids = select(ItemLocation.item_id).where(ItemLocation.item_type == item_type,
+                                                      ItemLocation.location_id.in_(select(subtree.c.id)))
+        touch_synced_items(db, model, model.id.in_(item_ids))
 
 
 def version_generator(version: str, buildname: str, buildnumber: str, version_file):
@@ -0,0 +1,63 @@
+"""Response compression module"""
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder, IdentityResponder
+
+# uploaded photos and documents are already compressed, and range requests must see the original bytes
+UNCOMPRESSED_PATHS = ('/files/', '/favicon.ico')
+# sent a record at a time (e.g. /books/autofill/batch); gzip would hold records back until its buffer fills
+STREAMING_CONTENT_TYPES = ('text/event-stream', 'application/x-ndjson')
+
+
+def gzip_accepted(accept_encoding: str) -> bool:
+    """
+    Reads an Accept-Encoding header: gzip (or its alias x-gzip) is allowed when it is listed, or covered by *, with a
+    q-value above 0. "gzip;q=0" refuses it even when * is listed.
+    """
+    qualities = {}
+    for item in accept_encoding.split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+
+    for coding in ('gzip', 'x-gzip'):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return qualities.get('*', 0) > 0
+
+
+class StreamingAwareGZipResponder(GZipResponder):
+    """GZipResponder that also passes STREAMING_CONTENT_TYPES through, Starlette only exempts text/event-stream."""
+
+    async def send_with_compression(self, message):
+        await super().send_with_compression(message)
+        if message["type"] == "http.response.start":
+            content_type = Headers(raw=message["headers"]).get("content-type", "")
+            self.content_type_is_excluded = content_type.startswith(STREAMING_CONTENT_TYPES)
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    GZip for API responses above minimum_size. Responses that already carry a Content-Encoding, like the
+    precompressed cache hits from tools.cache, and streamed responses are passed through untouched.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(UNCOMPRESSED_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        # GZipMiddleware only looks for "gzip" anywhere in the header, which also matches gzip;q=0
+        if gzip_accepted(Headers(scope=scope).get("accept-encoding", "")):
+            responder = StreamingAwareGZipResponder(self.app, self.minimum_size, compresslevel=self.compresslevel)
+        else:
+            responder = IdentityResponder(self.app, self.minimum_size)
+        await responder(scope, receive, send)
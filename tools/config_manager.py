@@ -1,20 +1,16 @@
 """Config Generator module"""
-import logging
 import os
 
-from passlib.context import CryptContext
-from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
 
 import database
 from models import Users, InitDB
+from tools.passwords import bcrypt_context
+from tools.seed_loader import load_sql_files
 
 Session = sessionmaker(bind=database.engine)
 session = Session()
 
-bcrypt_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
-logging.getLogger('passlib').setLevel(logging.ERROR)
-
 
 def _is_no_users():
     userlist = session.query(Users.username).all()
@@ -31,27 +27,15 @@ def _create_admin_user():
         session.close()
 
 
-def _inject_sql_file(file_path):
-    try:
-        with open(file_path, 'r') as file:
-            sql_commands = file.read()
-            statements = sql_commands.split(';')
-            for statement in statements:
-                if statement.strip() != "":
-                    session.execute(text(statement.strip()))
-                    session.commit()
-        print(f"{file_path} loaded successfully")
-    except Exception as e:
-        print(f"Error occurred while executing {file_path}: {e}")
-        session.rollback()
-
-
-def inject_sql_data(prefixes):
+def component_sql_files(prefixes):
     components_path = 'sql/components'
     component_files = sorted(os.listdir(components_path))
-    for component_file in component_files:
-        if component_file.endswith('.sql') and any(component_file.startswith(prefix) for prefix in prefixes):
-            _inject_sql_file(os.path.join(components_path, component_file))
+    return [os.path.join(components_path, component_file) for component_file in component_files
+            if component_file.endswith('.sql') and any(component_file.startswith(prefix) for prefix in prefixes)]
+
+
+def inject_sql_data(prefixes, force: bool = False):
+    return load_sql_files(component_sql_files(prefixes), force)
 
 
 def is_initdb():
@@ -0,0 +1,24 @@
+"""Dependency check module
+
+Used by the reference data delete paths (categories, brands, publishers, platforms, tags...) to find out whether a
+row is still in use without loading the rows that use it.
+"""
+PREVIEW_LIMIT = 50
+
+
+def is_referenced(query) -> bool:
+    """Runs `SELECT EXISTS(...)` for a filtered query, the database stops at the first matching row."""
+    return query.session.query(query.exists()).scalar()
+
+
+def reference_preview(query, limit: int = PREVIEW_LIMIT):
+    """
+    Returns None when the filtered query matches nothing, otherwise the total number of matches and the first
+    `limit` rows as dicts keyed by the selected column labels, e.g. db.query(Software.id, Software.name).filter(...)
+    """
+    rows = query.limit(limit).all()
+    if not rows:
+        return None
+    # a short preview already is the whole result, only count when it was cut off
+    total = len(rows) if len(rows) < limit else query.order_by(None).count()
+    return {"total": total, "items": [dict(row._mapping) for row in rows]}
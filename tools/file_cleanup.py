@@ -0,0 +1,153 @@
+"""Orphaned file cleanup module
+
+Runs as a job (see tools/jobs.py): the upload directories are walked with os.scandir in batches and every batch is
+checked against the stored_files / file_references index alone, so the cost per file does not depend on how many
+items exist. Uploads that items only named by path were linked once by the c52d8e4a9b17 migration; since then every
+item write maintains its references. Progress is reported to the job after every batch and kept in Redis for
+GET /admin/cleanup_orphaned_files.
+"""
+import json
+import os
+import time
+from datetime import datetime
+
+from starlette.concurrency import run_in_threadpool
+
+import database
+from database import get_redis_connection, close_redis_connection
+from models import StoredFile, FileReference
+from tools import actionlog
+from tools.jobs import JobCancelled
+from tools.uploads import UPLOAD_DIRS, IMAGE_VARIANTS, variant_path
+
+CLEANUP_PROGRESS_KEY = 'cleanup:files:progress'
+CLEANUP_BATCH_SIZE = int(os.getenv("CLEANUP_BATCH_SIZE", "500"))
+# files younger than this are skipped, they may belong to an item that is still being filled in
+CLEANUP_GRACE_MINUTES = int(os.getenv("CLEANUP_GRACE_MINUTES", "60"))
+PROGRESS_FILES_LIMIT = 100
+IGNORED_FILES = {"favicon.ico", "DOCUMENTS"}
+
+
+def _scan_batches(directory: str, batch_size: int):
+    batch = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name in IGNORED_FILES or not entry.is_file(follow_symlinks=False):
+                continue
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def _remove_file(path: str, file_type: str):
+    os.remove(path)
+    if file_type == 'img':
+        for variant in IMAGE_VARIANTS:
+            if os.path.exists(variant_path(path, variant)):
+                os.remove(variant_path(path, variant))
+
+
+def _process_batch(entries, file_type: str, cutoff: float, dry_run: bool, progress):
+    directory = UPLOAD_DIRS[file_type]
+    candidates = {}
+    for entry in entries:
+        progress['scanned'] += 1
+        stat_result = entry.stat(follow_symlinks=False)
+        if stat_result.st_mtime > cutoff:
+            progress['skipped_recent'] += 1
+        else:
+            candidates[os.path.join(directory, entry.name)] = stat_result.st_size
+    if not candidates:
+        return
+
+    db = database.SessionLocal()
+    try:
+        known = dict(db.query(StoredFile.path, StoredFile.sha256).filter(StoredFile.path.in_(candidates)))
+        referenced_hashes = {sha256 for (sha256,) in db.query(FileReference.sha256).filter(
+            FileReference.sha256.in_(set(known.values()))).distinct()}
+        referenced = {path for path, sha256 in known.items() if sha256 in referenced_hashes}
+
+        orphans = [path for path in candidates if path not in referenced]
+        for path in orphans:
+            progress['orphaned'] += 1
+            if len(progress['files']) < PROGRESS_FILES_LIMIT:
+                progress['files'].append(path)
+            if dry_run:
+                continue
+            try:
+                _remove_file(path, file_type)
+            except OSError as e:
+                print(f"Error deleting orphaned file {path}: {e}")
+                continue
+            progress['deleted'] += 1
+            progress['bytes_freed'] += candidates[path]
+
+        if not dry_run:
+            deleted_known = [path for path in orphans if path in known and not os.path.exists(path)]
+            if deleted_known:
+                db.query(StoredFile).filter(StoredFile.path.in_(deleted_known)).delete(synchronize_session=False)
+            db.commit()
+    finally:
+        db.close()
+
+
+async def _save_progress(progress):
+    redis = await get_redis_connection()
+    try:
+        await redis.set(CLEANUP_PROGRESS_KEY, json.dumps(progress))
+    finally:
+        await close_redis_connection(redis)
+
+
+async def get_cleanup_progress():
+    redis = await get_redis_connection()
+    try:
+        stored = await redis.get(CLEANUP_PROGRESS_KEY)
+    finally:
+        await close_redis_connection(redis)
+    return json.loads(stored) if stored else None
+
+
+async def run_cleanup(dry_run: bool, grace_minutes: int, username: str, job=None):
+    """
+    Walks both upload directories and deletes (or with dry_run only lists) unreferenced files. Returns the final
+    progress; with a job it stops after the current batch when the job is cancelled.
+    """
+    progress = {
+        'status': 'running', 'dry_run': dry_run, 'grace_minutes': grace_minutes,
+        'started_at': datetime.now().isoformat(timespec='seconds'), 'finished_at': None,
+        'scanned': 0, 'skipped_recent': 0, 'orphaned': 0, 'deleted': 0, 'bytes_freed': 0,
+        'files': [], 'error': None,
+    }
+    cutoff = time.time() - grace_minutes * 60
+    try:
+        await _save_progress(progress)
+        for file_type, directory in UPLOAD_DIRS.items():
+            if not os.path.isdir(directory):
+                continue
+            batches = _scan_batches(directory, CLEANUP_BATCH_SIZE)
+            # scandir and the deletes block, so every batch runs in the threadpool
+            while (batch := await run_in_threadpool(next, batches, None)) is not None:
+                await run_in_threadpool(_process_batch, batch, file_type, cutoff, dry_run, progress)
+                await _save_progress(progress)
+                if job is not None:
+                    await job.set_progress(progress)
+                    await job.check_cancelled()
+        progress['status'] = 'finished'
+    except JobCancelled:
+        progress['status'] = 'cancelled'
+    except Exception as e:
+        print(f"Error during orphaned file cleanup: {e}")
+        progress['status'] = 'failed'
+        progress['error'] = str(e)
+    finally:
+        progress['finished_at'] = datetime.now().isoformat(timespec='seconds')
+        await _save_progress(progress)
+
+    mode = "Found" if dry_run else "Deleted"
+    count = progress['orphaned'] if dry_run else progress['deleted']
+    actionlog.add_log("Cleanup Orphaned Files", f"{mode} {count} orphaned files", username)
+    return progress
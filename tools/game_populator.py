@@ -1,62 +1,182 @@
+"""Game populator module
+
+Reads disc metadata from redump.org disc pages. Only disc ids are accepted (a disc page URL is reduced to its id) and
+the page URL is always built from REDUMP_DISC_URL, so a lookup can not be pointed at another server. Pages are fetched
+with a shared async httpx client and parsed with selectolax in a single pass over the info table; results are cached
+in Redis by disc id, since a dumped disc does not change.
+"""
+import asyncio
+import json
+import os
+import re
 from urllib.parse import urlparse
 
-import requests
-from bs4 import BeautifulSoup
+import httpx
+from selectolax.lexbor import LexborHTMLParser
+
+from database import get_redis_connection, close_redis_connection
+
+REDUMP_DISC_URL = os.getenv("REDUMP_DISC_URL", "http://redump.org/disc/")
+REDUMP_TIMEOUT = httpx.Timeout(float(os.getenv("REDUMP_TIMEOUT", "10")), connect=3.0)
+REDUMP_LIMITS = httpx.Limits(max_connections=10, max_keepalive_connections=5)
+REDUMP_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+                  'Chrome/91.0.4472.124 Safari/537.36'}
+# redump asks scrapers to be gentle, so batches never run more than a few requests at a time
+REDUMP_CONCURRENCY = int(os.getenv("REDUMP_CONCURRENCY", "4"))
+
+REDUMP_CACHE_PREFIX = 'cache:redump:'
+REDUMP_CACHE_SECONDS = int(os.getenv("REDUMP_CACHE_DAYS", "30")) * 86400
+REDUMP_NEGATIVE_CACHE_SECONDS = 3600
+NOT_FOUND = 'null'
+
+DISC_ID_PATTERN = re.compile(r'[0-9]{1,9}')
+DISC_PATH_PATTERN = re.compile(r'/disc/([0-9]{1,9})/?')
+# redirects are followed (http -> https, a missing slash) but never off redump.org or the configured mirror
+REDUMP_HOSTS = {'redump.org', 'www.redump.org', urlparse(REDUMP_DISC_URL).hostname}
+# table label -> (response field, attribute of the flag <img>s to read instead of the cell text)
+DISC_FIELDS = {
+    'System': ('system', None),
+    'Media': ('media', None),
+    'Category': ('category', None),
+    'Region': ('region', 'title'),
+    'Languages': ('languages', 'alt'),
+    'Version': ('version', None),
+    'Edition': ('edition', None),
+}
+
+_client_state = {'client': None}
+
+
+async def _check_host(request: httpx.Request):
+    if request.url.host not in REDUMP_HOSTS:
+        raise httpx.RequestError(f"Refusing to follow a redirect to {request.url}", request=request)
+
 
+def _get_client() -> httpx.AsyncClient:
+    if _client_state['client'] is None:
+        _client_state['client'] = httpx.AsyncClient(timeout=REDUMP_TIMEOUT, limits=REDUMP_LIMITS,
+                                                     headers=REDUMP_HEADERS, follow_redirects=True,
+                                                     event_hooks={'request': [_check_host]})
+    return _client_state['client']
+
+
+async def close_redump_client():
+    client = _client_state['client']
+    _client_state['client'] = None
+    if client is not None:
+        await client.aclose()
+
+
+def split_disc_ids(redump_disk_ids) -> list:
+    """Software.redump_disk_ids holds one or more ids or disc URLs separated by commas or whitespace."""
+    if not redump_disk_ids:
+        return []
+    return list(dict.fromkeys(part for part in re.split(r'[,\s]+', redump_disk_ids) if part))
+
+
+def parse_disc_id(game_identifier: str):
+    """Returns the disc id of a numeric id or a http(s)://redump.org/disc/<id>/ URL, None for anything else."""
+    game_identifier = game_identifier.strip()
+    if DISC_ID_PATTERN.fullmatch(game_identifier):
+        return str(int(game_identifier))
 
-def get_game_info(game_identifier: str):
     parsed_url = urlparse(game_identifier)
-    if parsed_url.netloc and parsed_url.scheme:
-        url = game_identifier
-    else:
-        url = f'http://redump.org/disc/{game_identifier}'
+    if parsed_url.scheme in ('http', 'https') and parsed_url.hostname in ('redump.org', 'www.redump.org'):
+        match = DISC_PATH_PATTERN.fullmatch(parsed_url.path)
+        if match:
+            return str(int(match.group(1)))
+    return None
+
 
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
+def parse_disc_page(html: str):
+    tree = LexborHTMLParser(html)
+    title = tree.css_first('h1')
 
+    game_data = {"title": title.text(strip=True) if title else None}
+    game_data.update({field: None for field, _ in DISC_FIELDS.values()})
+
+    # one walk over the table headers instead of a search per field
+    for header in tree.css('th'):
+        label = DISC_FIELDS.get(header.text(strip=True))
+        if label is None or game_data[label[0]] is not None:
+            continue
+        field, attribute = label
+        cell = header.next
+        while cell is not None and cell.tag != 'td':
+            cell = cell.next
+        if cell is None:
+            continue
+        if attribute:
+            # multi-region and multilingual discs have one flag per region / language
+            values = [image.attributes.get(attribute) for image in cell.css('img')]
+            game_data[field] = ', '.join(value for value in values if value) or None
+        else:
+            game_data[field] = cell.text(strip=True)
+
+    return game_data
+
+
+async def _fetch_game(url: str):
+    """Returns (game data or None, cacheable)."""
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-    except requests.exceptions.RequestException as e:
+        response = await _get_client().get(url)
+    except httpx.HTTPError as e:
         print(f"Error in request: {e}")
-        return None
-
-    html = response.text
-    soup = BeautifulSoup(html, 'html.parser')
-
-    title = soup.find('h1')
-    if title:
-        title = title.string
-
-    system = get_value('System', soup)
-    media = get_value('Media', soup)
-    category = get_value('Category', soup)
-    region = get_value('Region', soup, 'img', 'title')
-    languages = get_value('Languages', soup, 'img', 'alt')
-    version = get_value('Version', soup)
-    edition = get_value('Edition', soup)
-
-    game_data = {
-        "title": title,
-        "system": system,
-        "media": media,
-        "category": category,
-        "region": region,
-        "languages": languages,
-        "version": version,
-        "edition": edition
-    }
+        return None, False
+
+    if response.status_code == 404:
+        return None, True
+    if response.status_code >= 400:
+        print(f"Error in request: HTTP {response.status_code} for {url}")
+        return None, False
+    return parse_disc_page(response.text), True
+
+
+async def _lookup(redis, disc_id: str):
+    if not DISC_ID_PATTERN.fullmatch(disc_id):
+        raise ValueError(f"Not a redump disc id: {disc_id!r}")
 
+    cached = await redis.get(REDUMP_CACHE_PREFIX + disc_id)
+    if cached is not None:
+        return json.loads(cached)
+
+    game_data, cacheable = await _fetch_game(f'{REDUMP_DISC_URL}{disc_id}/')
+    if cacheable:
+        await redis.set(REDUMP_CACHE_PREFIX + disc_id, json.dumps(game_data) if game_data else NOT_FOUND,
+                        ex=REDUMP_CACHE_SECONDS if game_data else REDUMP_NEGATIVE_CACHE_SECONDS)
     return game_data
 
 
-def get_value(label, soup, tag='td', attribute=None):
-    element = soup.find('th', string=label)
-    if element:
-        next_element = element.find_next(tag)
-        if next_element:
-            if attribute:
-                return next_element[attribute]
-            return next_element.text.strip()
+async def get_game_info(disc_id: str):
+    """Takes a disc id from parse_disc_id."""
+    redis = await get_redis_connection()
+    try:
+        return await _lookup(redis, disc_id)
+    finally:
+        await close_redis_connection(redis)
+
 
-    return None
+async def get_games_info(disc_ids, concurrency: int = REDUMP_CONCURRENCY):
+    """
+    Resolves several discs at once, e.g. all of a Software's redump_disk_ids; takes disc ids from parse_disc_id and
+    returns {disc id: data}. A disc whose lookup fails gets {"error": ...} instead of failing the others.
+    """
+    identifiers = list(dict.fromkeys(disc_ids))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    redis = await get_redis_connection()
+
+    async def lookup(identifier):
+        async with semaphore:
+            try:
+                return await _lookup(redis, identifier)
+            except Exception as e:
+                print(f"Error looking up redump disc {identifier}: {e}")
+                return {"error": "Lookup failed"}
+
+    try:
+        results = await asyncio.gather(*(lookup(identifier) for identifier in identifiers))
+    finally:
+        await close_redis_connection(redis)
+    return dict(zip(identifiers, results))
@@ -1,46 +1,25 @@
 import psutil
-from sqlalchemy import select, text
+from sqlalchemy import text
 
 from definitions import DESC_CPU, DESC_MEMORY
 
 
-def postgres_health_check(db):
-    try:
-        result_proxy = db.execute(select(1))
-        result = result_proxy.scalar()
-
-        if result == 1:
-            return {'check': 'PostgreSQL Health', 'status': 'OK'}
-        else:
-            return {'check': 'PostgreSQL Health', 'status': 'FAIL'}
-
-    except Exception as e:
-        print(e)  # log to console
-        return {'check': 'PostgreSQL Health', 'status': 'ERROR', 'detail': 'Internal server error'}
-
-
-async def redis_health_check(redis):
-    try:
-        pong = await redis.ping()
-        if pong:
-            return {'check': 'Redis Health', 'status': 'OK'}
-        else:
-            return {'check': 'Redis Health', 'status': 'FAIL'}
-
-    except Exception as e:
-        print(e)  # log to console
-        return {'check': 'Redis Health', 'status': 'ERROR', 'detail': 'Internal server error'}
+def latency_check(check: str, latency_ms):
+    if latency_ms is None:
+        return {'check': check, 'status': 'ERROR', 'detail': 'Internal server error'}
+    return {'check': check, 'status': 'OK', 'detail': f'{latency_ms} ms'}
 
 
-def check_cpu():
+def check_cpu(cpu_percent=None):
     try:
-        cpu_percent = psutil.cpu_percent()
+        if cpu_percent is None:
+            cpu_percent = psutil.cpu_percent()
 
         if 0 <= cpu_percent <= 70:
             return {'check': 'CPU', 'status': 'OK', 'detail': DESC_CPU + str(cpu_percent)}
-        elif 71 <= cpu_percent <= 90:
+        elif 70 < cpu_percent <= 90:
             return {'check': 'CPU', 'status': 'WARNING', 'detail': DESC_CPU + str(cpu_percent)}
-        elif 91 <= cpu_percent <= 100:
+        elif 90 < cpu_percent <= 100:
             return {'check': 'CPU', 'status': 'HIGH', 'detail': DESC_CPU + str(cpu_percent)}
         else:
             return {'check': 'CPU', 'status': 'UNKNOWN', 'detail': 'Cannot determine CPU usage'}
@@ -49,16 +28,15 @@ def check_cpu():
         return {'check': 'CPU', 'status': 'UNKNOWN', 'detail': 'Cannot determine CPU usage'}
 
 
-def check_memory():
-    bytes_to_gbs = 1073741824
-    avail = round(psutil.virtual_memory().available / bytes_to_gbs, 1)
-    total = round(psutil.virtual_memory().total / bytes_to_gbs, 1)
-    used_mem = round(((total - avail) / total * 100), 1)  # returning total memory in use in %
+def check_memory(used_mem=None):
+    if used_mem is None:
+        memory = psutil.virtual_memory()
+        used_mem = round((memory.total - memory.available) / memory.total * 100, 1)  # total memory in use in %
     if 0 <= used_mem <= 70:
         return {'check': 'MEM', 'status': 'OK', 'detail': DESC_MEMORY + str(used_mem)}
-    elif 71 <= used_mem <= 90:
+    elif 70 < used_mem <= 90:
         return {'check': 'MEM', 'status': 'WARNING', 'detail': DESC_MEMORY + str(used_mem)}
-    elif 91 <= used_mem <= 100:
+    elif 90 < used_mem <= 100:
         return {'check': 'MEM', 'status': 'HIGH', 'detail': DESC_MEMORY + str(used_mem)}
     else:
         return {'check': 'MEM', 'status': 'UNKNOWN', 'detail': 'Cannot determine MEM usage'}
@@ -88,21 +66,23 @@ def analyze_db(db):
         return {"status": "error", "message": str(e)}
 
 
-def reindex_db(db):
-    try:
-        with db.connection() as conn:
-            if conn.in_transaction():
-                conn.rollback()
+def list_indexes(conn):
+    result = conn.execute(text(
+        "SELECT schemaname, indexname FROM pg_indexes WHERE schemaname NOT IN ('pg_catalog', 'information_schema') "
+        "ORDER BY schemaname, indexname"))
+    return [(row[0], row[1]) for row in result]
 
-            conn.execution_options(isolation_level="AUTOCOMMIT")
 
-            result = conn.execute(
-                text("SELECT indexname FROM pg_indexes WHERE schemaname NOT IN ('pg_catalog', 'information_schema')"))
-            indexes = [row[0] for row in result]
+def supports_concurrent_reindex(conn) -> bool:
+    # REINDEX CONCURRENTLY exists since PostgreSQL 12
+    return int(conn.execute(text("SHOW server_version_num")).scalar()) >= 120000
 
-            for index_name in indexes:
-                conn.execute(text(f"REINDEX INDEX {index_name}"))
 
-        return {"status": "success", "message": "REINDEX operation for all indexes completed successfully."}
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
+def quote_relation(schema_name: str, relation_name: str) -> str:
+    return '.'.join('"{}"'.format(name.replace('"', '""')) for name in (schema_name, relation_name))
+
+
+def reindex_index(conn, schema_name: str, index_name: str, concurrently: bool = False):
+    # one index per call on an AUTOCOMMIT connection, so the reindex job can report progress and stop in between
+    option = " CONCURRENTLY" if concurrently else ""
+    conn.execute(text(f"REINDEX INDEX{option} {quote_relation(schema_name, index_name)}"))
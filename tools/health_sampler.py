@@ -0,0 +1,92 @@
+"""Health sampler module"""
+import asyncio
+import os
+import time
+from collections import deque
+
+import psutil
+from sqlalchemy import select
+
+import database
+from tools.metrics import DB_POOL_CHECKED_OUT, DB_POOL_SIZE, PASSWORD_QUEUE
+from tools.passwords import get_password_pool_stats
+
+HEALTH_SAMPLE_SECONDS = int(os.getenv("HEALTH_SAMPLE_SECONDS", "15"))
+HEALTH_SAMPLE_WINDOW = int(os.getenv("HEALTH_SAMPLE_WINDOW", "40"))
+WINDOW_METRICS = ('cpu', 'memory', 'postgres_ms', 'redis_ms', 'pool_checked_out')
+
+_samples = deque(maxlen=HEALTH_SAMPLE_WINDOW)
+
+
+def _postgres_latency_ms():
+    start = time.perf_counter()
+    with database.engine.connect() as conn:
+        conn.execute(select(1)).scalar()
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+async def _redis_latency_ms(redis):
+    start = time.perf_counter()
+    await redis.ping()
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+async def take_sample(redis):
+    memory = psutil.virtual_memory()
+    pool = database.engine.pool
+    sample = {
+        'timestamp': time.time(),
+        'cpu': psutil.cpu_percent(interval=None),
+        'memory': round((memory.total - memory.available) / memory.total * 100, 1),
+        'postgres_ms': None,
+        'redis_ms': None,
+        'pool_size': pool.size(),
+        'pool_checked_out': pool.checkedout(),
+        'pool_overflow': pool.overflow(),
+        'password_pool': get_password_pool_stats(),
+    }
+
+    try:
+        # the DB driver is blocking, keep it off the event loop
+        sample['postgres_ms'] = await asyncio.to_thread(_postgres_latency_ms)
+    except Exception as e:
+        print(e)  # log to console
+    try:
+        sample['redis_ms'] = await _redis_latency_ms(redis)
+    except Exception as e:
+        print(e)  # log to console
+
+    DB_POOL_SIZE.set(sample['pool_size'])
+    DB_POOL_CHECKED_OUT.set(sample['pool_checked_out'])
+    PASSWORD_QUEUE.set(sample['password_pool']['queued'])
+
+    _samples.append(sample)
+    return sample
+
+
+async def health_sampler(redis):
+    # the first cpu_percent() call has nothing to compare against and always returns 0.0, the first real sample
+    # needs an interval to measure over
+    psutil.cpu_percent(interval=None)
+    await asyncio.sleep(HEALTH_SAMPLE_SECONDS)
+    while True:
+        try:
+            await take_sample(redis)
+        except Exception as e:
+            print(f"Health sampler error: {e}")
+        await asyncio.sleep(HEALTH_SAMPLE_SECONDS)
+
+
+def get_latest_sample():
+    return _samples[-1] if _samples else None
+
+
+def get_window_stats():
+    stats = {'samples': len(_samples), 'interval_seconds': HEALTH_SAMPLE_SECONDS}
+    for metric in WINDOW_METRICS:
+        values = [sample[metric] for sample in _samples if sample[metric] is not None]
+        if values:
+            stats[metric] = {'min': min(values), 'avg': round(sum(values) / len(values), 2), 'max': max(values)}
+        else:
+            stats[metric] = None
+    return stats
@@ -0,0 +1,93 @@
+"""Job handlers module
+
+The admin and maintenance operations that run through the job queue. Blocking database work goes to the threadpool,
+so a job can still report progress and notice a cancel between steps.
+"""
+from starlette.concurrency import run_in_threadpool
+
+import database
+from tools.config_manager import component_sql_files
+from tools.file_cleanup import run_cleanup
+from tools.health_benchmark import vacuum_db, analyze_db, list_indexes, reindex_index, supports_concurrent_reindex
+from tools.jobs import JobCancelled, job_handler
+from tools.maintenance_planner import plan_maintenance, run_maintenance_action
+from tools.seed_loader import load_sql_file, summarize_results
+
+
+async def _run_maintenance(operation):
+    db = database.SessionLocal()
+    try:
+        result = await run_in_threadpool(operation, db)
+    finally:
+        db.close()
+    if result["status"] == "error":
+        raise RuntimeError(result["message"])
+    return result
+
+
+@job_handler('vacuum')
+async def vacuum(job):
+    return await _run_maintenance(vacuum_db)
+
+
+@job_handler('analyze')
+async def analyze(job):
+    return await _run_maintenance(analyze_db)
+
+
+@job_handler('reindex')
+async def reindex(job):
+    with database.engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT")
+        indexes = await run_in_threadpool(list_indexes, conn)
+        # CONCURRENTLY keeps the tables writable while their indexes are rebuilt
+        concurrently = await run_in_threadpool(supports_concurrent_reindex, conn)
+        for position, (schema_name, index_name) in enumerate(indexes):
+            await job.check_cancelled()
+            await job.set_progress({"done": position, "total": len(indexes), "current": index_name})
+            await run_in_threadpool(reindex_index, conn, schema_name, index_name, concurrently)
+
+    return {"status": "success", "message": f"REINDEX completed for {len(indexes)} indexes."}
+
+
+@job_handler('maintenance')
+async def maintenance(job):
+    # the plan is made when the job starts, not when it was queued, so it works from current statistics
+    with database.engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT")
+        plan = await run_in_threadpool(plan_maintenance, conn)
+        results = []
+        for position, action in enumerate(plan["actions"]):
+            await job.check_cancelled()
+            await job.set_progress({"done": position, "total": len(plan["actions"]), "current": action["sql"]})
+            try:
+                await run_in_threadpool(run_maintenance_action, conn, action)
+                results.append({**action, "status": "success"})
+            except Exception as e:
+                print(f"Error running maintenance action {action['sql']}: {e}")
+                results.append({**action, "status": "error", "message": str(e)})
+
+    plan["actions"] = results
+    return plan
+
+
+@job_handler('import_sql')
+async def import_sql(job, prefixes, force=False):
+    file_paths = component_sql_files(prefixes)
+    results = []
+    for position, file_path in enumerate(file_paths):
+        await job.check_cancelled()
+        await job.set_progress({"done": position, "total": len(file_paths), "current": file_path})
+        results.append(await run_in_threadpool(load_sql_file, file_path, force))
+
+    return summarize_results(results)
+
+
+@job_handler('cleanup_orphaned_files')
+async def cleanup_orphaned_files(job, dry_run, grace_minutes):
+    progress = await run_cleanup(dry_run, grace_minutes, job.job['username'], job)
+    if progress['status'] == 'cancelled':
+        raise JobCancelled()
+    if progress['status'] == 'failed':
+        raise RuntimeError(progress['error'])
+    return progress
@@ -0,0 +1,42 @@
+"""Job worker module
+
+Runs the jobs queued through tools.jobs, one at a time:
+
+    python -m tools.job_worker
+
+scripts/run.sh starts one next to the API. Run only one: the jobs are maintenance work that should not overlap, and a
+starting worker fails whatever is still marked as running.
+"""
+import asyncio
+import signal
+
+import tools.job_handlers  # noqa: F401 registers the handlers
+from database import get_redis_connection, close_redis_connection
+from tools.actionlog import flush_logs
+from tools.jobs import JOB_QUEUE_KEY, fail_interrupted_jobs, run_job
+
+JOB_POLL_SECONDS = 5
+
+
+async def run_worker():
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signal_number, stop.set)
+
+    redis = await get_redis_connection()
+    try:
+        await fail_interrupted_jobs(redis)
+        print("Job worker started")
+        while not stop.is_set():
+            # a short blocking pop, so a stop signal is noticed between jobs
+            item = await redis.brpop(JOB_QUEUE_KEY, timeout=JOB_POLL_SECONDS)
+            if item:
+                await run_job(redis, item[1])
+    finally:
+        flush_logs()
+        await close_redis_connection(redis)
+
+
+if __name__ == '__main__':
+    asyncio.run(run_worker())
@@ -0,0 +1,211 @@
+"""Jobs module
+
+A small Redis backed job queue for admin and maintenance work that takes longer than a request should. Endpoints
+enqueue a job and return straight away; the worker (python -m tools.job_worker) runs the jobs one at a time and keeps
+their status, progress and result in Redis, where the /jobs endpoints read them.
+"""
+import json
+import os
+import uuid
+from datetime import datetime
+
+from starlette.exceptions import HTTPException
+
+from database import get_redis_connection, close_redis_connection
+from tools import actionlog
+
+JOB_QUEUE_KEY = 'jobs:queue'
+JOB_RECENT_KEY = 'jobs:recent'
+JOB_RUNNING_KEY = 'jobs:running'
+JOB_KEY_PREFIX = 'jobs:job:'
+JOB_CANCEL_PREFIX = 'jobs:cancel:'
+JOB_ACTIVE_PREFIX = 'jobs:active:'
+
+JOB_RECENT_LIMIT = 100
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_DAYS", "7")) * 86400
+# upper bound for an exclusive job type staying blocked if a worker dies without cleaning up
+JOB_ACTIVE_SECONDS = 6 * 3600
+FINAL_STATUSES = {'finished', 'failed', 'cancelled'}
+
+JOB_HANDLERS = {}
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def job_handler(job_type: str):
+    """Registers `async def handler(job: JobContext, **params)` for a job type; whatever it returns is the result."""
+    def register(func):
+        JOB_HANDLERS[job_type] = func
+        return func
+    return register
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+async def save_job(redis, job):
+    await redis.set(JOB_KEY_PREFIX + job['id'], json.dumps(job), ex=JOB_TTL_SECONDS)
+
+
+async def load_job(redis, job_id: str):
+    stored = await redis.get(JOB_KEY_PREFIX + job_id)
+    return json.loads(stored) if stored else None
+
+
+async def release_job(redis, job):
+    # only drop the exclusive slot if it still belongs to this job
+    active_key = JOB_ACTIVE_PREFIX + job['type']
+    if await redis.get(active_key) == job['id']:
+        await redis.delete(active_key)
+    await redis.srem(JOB_RUNNING_KEY, job['id'])
+    await redis.delete(JOB_CANCEL_PREFIX + job['id'])
+
+
+class JobContext:
+    """Handed to job handlers to report progress and to stop early when the job is cancelled."""
+
+    def __init__(self, redis, job):
+        self.redis = redis
+        self.job = job
+
+    async def set_progress(self, progress):
+        self.job['progress'] = progress
+        await save_job(self.redis, self.job)
+
+    async def is_cancelled(self) -> bool:
+        return bool(await self.redis.exists(JOB_CANCEL_PREFIX + self.job['id']))
+
+    async def check_cancelled(self):
+        if await self.is_cancelled():
+            raise JobCancelled()
+
+
+async def enqueue_job(job_type: str, params: dict, username: str, exclusive: bool = True):
+    """
+    Queues a job and returns it. Exclusive job types run one at a time: while one is queued or running this returns
+    None instead.
+    """
+    job = {
+        'id': uuid.uuid4().hex, 'type': job_type, 'params': params, 'username': username, 'status': 'queued',
+        'progress': None, 'result': None, 'error': None,
+        'created_at': _now(), 'started_at': None, 'finished_at': None,
+    }
+    redis = await get_redis_connection()
+    try:
+        if exclusive and not await redis.set(JOB_ACTIVE_PREFIX + job_type, job['id'], nx=True,
+                                             ex=JOB_ACTIVE_SECONDS):
+            return None
+        await save_job(redis, job)
+        await redis.lpush(JOB_RECENT_KEY, job['id'])
+        await redis.ltrim(JOB_RECENT_KEY, 0, JOB_RECENT_LIMIT - 1)
+        await redis.lpush(JOB_QUEUE_KEY, job['id'])
+        return job
+    finally:
+        await close_redis_connection(redis)
+
+
+async def start_job(job_type: str, params: dict, user, exclusive: bool = True):
+    """enqueue_job for endpoints: answers 409 with the blocking job's id when an exclusive job is already pending."""
+    job = await enqueue_job(job_type, params, user.get('username'), exclusive)
+    if job is None:
+        active = await get_active_job(job_type)
+        detail = f"A {job_type} job is already queued or running"
+        raise HTTPException(status_code=409, detail=f"{detail}: {active['id']}" if active else detail)
+    return job
+
+
+async def get_job(job_id: str):
+    redis = await get_redis_connection()
+    try:
+        return await load_job(redis, job_id)
+    finally:
+        await close_redis_connection(redis)
+
+
+async def get_active_job(job_type: str):
+    redis = await get_redis_connection()
+    try:
+        job_id = await redis.get(JOB_ACTIVE_PREFIX + job_type)
+        return await load_job(redis, job_id) if job_id else None
+    finally:
+        await close_redis_connection(redis)
+
+
+async def get_recent_jobs(job_type: str = None, status: str = None):
+    redis = await get_redis_connection()
+    try:
+        job_ids = await redis.lrange(JOB_RECENT_KEY, 0, -1)
+        stored = await redis.mget([JOB_KEY_PREFIX + job_id for job_id in job_ids]) if job_ids else []
+    finally:
+        await close_redis_connection(redis)
+
+    jobs = [json.loads(value) for value in stored if value]
+    return [job for job in jobs
+            if (job_type is None or job['type'] == job_type) and (status is None or job['status'] == status)]
+
+
+async def cancel_job(job_id: str):
+    """A queued job is cancelled right away, a running one stops at the next point its handler checks."""
+    redis = await get_redis_connection()
+    try:
+        job = await load_job(redis, job_id)
+        if job is None or job['status'] in FINAL_STATUSES:
+            return job
+
+        await redis.set(JOB_CANCEL_PREFIX + job_id, '1', ex=JOB_TTL_SECONDS)
+        if job['status'] == 'queued' and await redis.lrem(JOB_QUEUE_KEY, 0, job_id):
+            job.update({'status': 'cancelled', 'finished_at': _now()})
+            await save_job(redis, job)
+            await release_job(redis, job)
+        return job
+    finally:
+        await close_redis_connection(redis)
+
+
+async def run_job(redis, job_id: str):
+    job = await load_job(redis, job_id)
+    if job is None or job['status'] != 'queued':
+        return
+    if await redis.exists(JOB_CANCEL_PREFIX + job_id):
+        job.update({'status': 'cancelled', 'finished_at': _now()})
+        await save_job(redis, job)
+        await release_job(redis, job)
+        return
+
+    job.update({'status': 'running', 'started_at': _now()})
+    await save_job(redis, job)
+    await redis.sadd(JOB_RUNNING_KEY, job_id)
+
+    try:
+        handler = JOB_HANDLERS.get(job['type'])
+        if handler is None:
+            raise ValueError(f"Unknown job type: {job['type']}")
+        job['result'] = await handler(JobContext(redis, job), **job['params'])
+        job['status'] = 'finished'
+    except JobCancelled:
+        job['status'] = 'cancelled'
+    except Exception as e:
+        print(f"Error running job {job_id} ({job['type']}): {e}")
+        job.update({'status': 'failed', 'error': str(e)})
+    finally:
+        job['finished_at'] = _now()
+        await save_job(redis, job)
+        await release_job(redis, job)
+
+    actionlog.add_log("Job", f"{job['type']} job {job['id']} {job['status']}", job['username'])
+
+
+async def fail_interrupted_jobs(redis):
+    """Jobs still marked running when a worker starts were left behind by one that died, they can never finish."""
+    for job_id in await redis.smembers(JOB_RUNNING_KEY):
+        job = await load_job(redis, job_id)
+        if job is None:
+            await redis.srem(JOB_RUNNING_KEY, job_id)
+            continue
+        job.update({'status': 'failed', 'error': 'The worker stopped while the job was running',
+                    'finished_at': _now()})
+        await save_job(redis, job)
+        await release_job(redis, job)
@@ -0,0 +1,180 @@
+"""Maintenance planner module
+
+Decides which tables and indexes actually need maintenance, from the statistics PostgreSQL already keeps
+(pg_stat_user_tables, pg_stat_user_indexes and pg_stats), instead of vacuuming or reindexing the whole database:
+
+- VACUUM (ANALYZE) for tables with many dead tuples that autovacuum has not dealt with recently
+- ANALYZE for tables that changed a lot since their last analyze, or were never analyzed
+- REINDEX (CONCURRENTLY where the server supports it) for btree indexes whose estimated bloat is high
+
+Index bloat is an estimate: the expected size is computed from the row count and average key width in pg_stats, the
+same approach as the usual btree bloat queries, so it needs analyzed tables and is skipped when stats are missing.
+"""
+import math
+import os
+import re
+from datetime import timedelta
+
+from sqlalchemy import text
+
+import database
+from tools.health_benchmark import supports_concurrent_reindex, quote_relation
+
+MIN_DEAD_TUPLES = int(os.getenv("MAINTENANCE_MIN_DEAD_TUPLES", "1000"))
+DEAD_TUPLE_RATIO = float(os.getenv("MAINTENANCE_DEAD_TUPLE_RATIO", "0.1"))
+MIN_MODIFIED_TUPLES = int(os.getenv("MAINTENANCE_MIN_MODIFIED_TUPLES", "500"))
+MODIFIED_TUPLE_RATIO = float(os.getenv("MAINTENANCE_MODIFIED_TUPLE_RATIO", "0.1"))
+# dead tuples that survived a vacuum this recent are held by a long transaction, vacuuming again won't help
+RECENT_VACUUM_MINUTES = int(os.getenv("MAINTENANCE_RECENT_VACUUM_MINUTES", "60"))
+INDEX_BLOAT_RATIO = float(os.getenv("MAINTENANCE_INDEX_BLOAT_RATIO", "0.3"))
+MIN_INDEX_BYTES = int(os.getenv("MAINTENANCE_MIN_INDEX_MB", "8")) * 1024 * 1024
+
+BTREE_FILLFACTOR = 90
+PAGE_HEADER_BYTES = 24
+BTREE_SPECIAL_BYTES = 16
+INDEX_TUPLE_HEADER_BYTES = 8
+ITEM_POINTER_BYTES = 4
+MAXALIGN = 8
+CCNEW_PATTERN = re.compile(r'_ccnew\d*$')
+
+TABLE_STATS_QUERY = text("""
+    SELECT schemaname, relname, n_live_tup, n_dead_tup, n_mod_since_analyze,
+           greatest(last_vacuum, last_autovacuum) AS last_vacuum,
+           greatest(last_analyze, last_autoanalyze) AS last_analyze,
+           pg_total_relation_size(relid) AS total_bytes
+    FROM pg_stat_user_tables
+    ORDER BY schemaname, relname
+""")
+
+INDEX_STATS_QUERY = text("""
+    SELECT s.schemaname, s.relname AS table_name, s.indexrelname AS index_name, s.idx_scan,
+           pg_relation_size(s.indexrelid) AS index_bytes, ic.reltuples, x.indisvalid, x.indnatts,
+           (SELECT count(*) FROM pg_attribute a
+              JOIN pg_stats st ON st.schemaname = s.schemaname AND st.tablename = s.relname AND st.attname = a.attname
+             WHERE a.attrelid = x.indrelid AND a.attnum = ANY(x.indkey))
+         + (SELECT count(*) FROM pg_stats st WHERE st.schemaname = s.schemaname AND st.tablename = s.indexrelname)
+           AS stats_columns,
+           coalesce((SELECT sum(st.avg_width) FROM pg_attribute a
+              JOIN pg_stats st ON st.schemaname = s.schemaname AND st.tablename = s.relname AND st.attname = a.attname
+             WHERE a.attrelid = x.indrelid AND a.attnum = ANY(x.indkey)), 0)
+         + coalesce((SELECT sum(st.avg_width) FROM pg_stats st
+             WHERE st.schemaname = s.schemaname AND st.tablename = s.indexrelname), 0) AS key_width,
+           current_setting('block_size')::int AS block_size
+    FROM pg_stat_user_indexes s
+    JOIN pg_index x ON x.indexrelid = s.indexrelid
+    JOIN pg_class ic ON ic.oid = s.indexrelid
+    JOIN pg_am am ON am.oid = ic.relam
+    WHERE am.amname = 'btree'
+    ORDER BY s.schemaname, s.relname, s.indexrelname
+""")
+
+
+def _align(size: int) -> int:
+    return int(math.ceil(size / MAXALIGN) * MAXALIGN)
+
+
+def estimate_index_bloat(index_bytes: int, reltuples: float, key_width: float, block_size: int):
+    """Returns (expected bytes, bloat ratio) for a btree index with the given row count and average key width."""
+    tuple_bytes = _align(INDEX_TUPLE_HEADER_BYTES + key_width) + ITEM_POINTER_BYTES
+    usable_bytes = (block_size - PAGE_HEADER_BYTES - BTREE_SPECIAL_BYTES) * BTREE_FILLFACTOR / 100
+    # +1 for the metapage
+    expected_bytes = (math.ceil(max(reltuples, 0) * tuple_bytes / usable_bytes) + 1) * block_size
+    if index_bytes <= 0:
+        return expected_bytes, 0.0
+    return expected_bytes, max(0.0, 1 - expected_bytes / index_bytes)
+
+
+def _table_actions(row, now):
+    target = quote_relation(row.schemaname, row.relname)
+    name = f"{row.schemaname}.{row.relname}"
+    live, dead = row.n_live_tup or 0, row.n_dead_tup or 0
+    dead_ratio = dead / (live + dead) if live + dead else 0.0
+
+    if dead >= MIN_DEAD_TUPLES and dead_ratio >= DEAD_TUPLE_RATIO:
+        reason = f"{dead} dead tuples ({dead_ratio:.0%} of the table)"
+        if row.last_vacuum and row.last_vacuum > now - timedelta(minutes=RECENT_VACUUM_MINUTES):
+            return None, {"target": name, "reason": f"{reason}, but vacuumed at {row.last_vacuum.isoformat()}; "
+                                                    "a long running transaction may be holding them"}
+        return {"action": "vacuum", "target": name, "sql": f"VACUUM (ANALYZE) {target}", "reason": reason,
+                "total_bytes": row.total_bytes}, None
+
+    modified = row.n_mod_since_analyze or 0
+    if live and row.last_analyze is None:
+        reason = "never analyzed"
+    elif modified >= MIN_MODIFIED_TUPLES and modified >= live * MODIFIED_TUPLE_RATIO:
+        reason = f"{modified} rows changed since the last analyze"
+    else:
+        return None, None
+    return {"action": "analyze", "target": name, "sql": f"ANALYZE {target}", "reason": reason,
+            "total_bytes": row.total_bytes}, None
+
+
+def _index_action(row, concurrently: bool):
+    name = f"{row.schemaname}.{row.index_name}"
+    option = " CONCURRENTLY" if concurrently else ""
+    reindex_sql = f"REINDEX INDEX{option} {quote_relation(row.schemaname, row.index_name)}"
+
+    if not row.indisvalid:
+        # left over by an interrupted CREATE INDEX / REINDEX CONCURRENTLY, it is maintained on every write but never
+        # used; the _ccnew copies of a failed REINDEX CONCURRENTLY should be dropped, not rebuilt
+        if CCNEW_PATTERN.search(row.index_name):
+            return None, {"target": name, "reason": "invalid copy left by an interrupted REINDEX CONCURRENTLY, "
+                                                    "drop it"}
+        return {"action": "reindex", "target": name, "sql": reindex_sql, "reason": "index is invalid",
+                "index_bytes": row.index_bytes}, None
+    if row.index_bytes < MIN_INDEX_BYTES:
+        return None, None
+    if row.stats_columns < row.indnatts:
+        return None, {"target": name, "reason": "no column statistics to estimate bloat, run ANALYZE first"}
+
+    expected_bytes, bloat_ratio = estimate_index_bloat(row.index_bytes, row.reltuples, row.key_width, row.block_size)
+    if bloat_ratio < INDEX_BLOAT_RATIO:
+        return None, None
+    return {"action": "reindex", "target": name, "sql": reindex_sql,
+            "reason": f"estimated {bloat_ratio:.0%} bloat ({row.index_bytes} bytes, about {expected_bytes} needed)",
+            "index_bytes": row.index_bytes, "idx_scan": row.idx_scan}, None
+
+
+def plan_maintenance(conn):
+    """
+    Reads the statistics views and returns the report: the planned actions with the SQL each would run and why, and
+    the tables or indexes that look like they need work but were left alone.
+    """
+    now = conn.execute(text("SELECT now()")).scalar()
+    concurrently = supports_concurrent_reindex(conn)
+
+    actions, skipped = [], []
+    table_rows = conn.execute(TABLE_STATS_QUERY).all()
+    for row in table_rows:
+        action, skip = _table_actions(row, now)
+        if action:
+            actions.append(action)
+        if skip:
+            skipped.append(skip)
+
+    index_rows = conn.execute(INDEX_STATS_QUERY).all()
+    for row in index_rows:
+        action, skip = _index_action(row, concurrently)
+        if action:
+            actions.append(action)
+        if skip:
+            skipped.append(skip)
+
+    return {
+        "generated_at": now.isoformat(timespec='seconds'),
+        "concurrent_reindex": concurrently,
+        "tables_checked": len(table_rows),
+        "indexes_checked": len(index_rows),
+        "actions": actions,
+        "skipped": skipped,
+    }
+
+
+def run_maintenance_action(conn, action):
+    # VACUUM and REINDEX CONCURRENTLY cannot run in a transaction block, conn has to be in AUTOCOMMIT mode
+    conn.execute(text(action["sql"]))
+
+
+def get_maintenance_plan():
+    with database.engine.connect() as conn:
+        return plan_maintenance(conn)
@@ -0,0 +1,87 @@
+"""Prometheus metrics module"""
+import os
+import re
+import time
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess
+from starlette.routing import Match
+
+from tools import request_stats
+
+# With gunicorn, run.sh points PROMETHEUS_MULTIPROC_DIR at a shared directory and every worker writes there
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+REQUEST_LATENCY = Histogram('mancave_request_duration_seconds', 'Request latency by route template',
+                            ['method', 'route'],
+                            buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+REQUESTS = Counter('mancave_requests_total', 'Requests by route template and status', ['method', 'route', 'status'])
+REQUESTS_IN_FLIGHT = Gauge('mancave_requests_in_flight', 'Requests currently being handled',
+                           multiprocess_mode='livesum')
+REQUEST_QUERIES = Histogram('mancave_request_sql_queries', 'SQL statements executed per request', ['route'],
+                            buckets=(0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000))
+SQL_QUERIES = Counter('mancave_sql_queries_total', 'SQL statements executed', ['route'])
+SQL_SECONDS = Counter('mancave_sql_seconds_total', 'Time spent in SQL statements', ['route'])
+REDIS_COMMANDS = Counter('mancave_redis_commands_total', 'Redis commands sent', ['command'])
+CACHE_REQUESTS = Counter('mancave_cache_requests_total', 'Response cache lookups', ['namespace', 'result'])
+DB_POOL_CHECKED_OUT = Gauge('mancave_db_pool_checked_out', 'DB pool connections in use',
+                            multiprocess_mode='livesum')
+DB_POOL_SIZE = Gauge('mancave_db_pool_size', 'DB pool size', multiprocess_mode='livesum')
+ACTIONLOG_QUEUE = Gauge('mancave_actionlog_queue_depth', 'Action log entries waiting to be written',
+                        multiprocess_mode='livesum')
+PASSWORD_QUEUE = Gauge('mancave_password_pool_queued', 'Password hash operations waiting for a worker',
+                       multiprocess_mode='livesum')
+
+CACHE_PREFIX = 'cache:'
+
+
+def route_template(request):
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    # unknown paths share one label so 404 scans can't blow up the series count
+    return 'unmatched'
+
+
+async def observe_request(request, call_next):
+    REQUESTS_IN_FLIGHT.inc()
+    stats, token = request_stats.start_request()
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        response.headers['Server-Timing'] = request_stats.server_timing_header(stats, time.perf_counter() - start)
+        return response
+    finally:
+        duration = time.perf_counter() - start
+        route = route_template(request)
+        request_stats.warn_repeated_statements(stats, route)
+        REQUESTS_IN_FLIGHT.dec()
+        REQUEST_LATENCY.labels(request.method, route).observe(duration)
+        REQUESTS.labels(request.method, route, str(status_code)).inc()
+        REQUEST_QUERIES.labels(route).observe(stats['queries'])
+        if stats['queries']:
+            SQL_QUERIES.labels(route).inc(stats['queries'])
+            SQL_SECONDS.labels(route).inc(stats['db_seconds'])
+        request_stats.end_request(token)
+
+
+def cache_namespace(key: str) -> str:
+    # cache:tags:hardware -> tags, cache:component_types_12 -> component_types
+    return re.sub(r'_\d+$', '', key[len(CACHE_PREFIX):].split(':')[0])
+
+
+def record_redis_command(args, result):
+    command = str(args[0]).upper()
+    REDIS_COMMANDS.labels(command).inc()
+    if command == 'GET' and len(args) > 1 and str(args[1]).startswith(CACHE_PREFIX):
+        CACHE_REQUESTS.labels(cache_namespace(str(args[1])), 'miss' if result is None else 'hit').inc()
+
+
+def render_metrics() -> bytes:
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
@@ -0,0 +1,79 @@
+"""Password hashing module"""
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+from passlib.context import CryptContext
+from starlette.exceptions import HTTPException
+
+load_dotenv()
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", "2"))
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", "32"))
+
+# min/max pin the cost, so hashes made with any other rounds value are flagged for rehash on the next login
+bcrypt_context = CryptContext(schemes=['bcrypt'], deprecated='auto', bcrypt__default_rounds=BCRYPT_ROUNDS,
+                              bcrypt__min_rounds=BCRYPT_ROUNDS, bcrypt__max_rounds=BCRYPT_ROUNDS)
+logging.getLogger('passlib').setLevel(logging.ERROR)
+
+# bcrypt releases the GIL while hashing, so a small thread pool is enough to keep it off the event loop
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_WORKERS, thread_name_prefix='bcrypt')
+_stats_lock = threading.Lock()
+_stats = {'pending': 0, 'running': 0, 'completed': 0, 'rejected': 0, 'rehashed': 0}
+
+
+def _tracked(func, *args):
+    with _stats_lock:
+        _stats['running'] += 1
+    try:
+        return func(*args)
+    finally:
+        with _stats_lock:
+            _stats['running'] -= 1
+            _stats['completed'] += 1
+
+
+async def _run_in_pool(func, *args):
+    with _stats_lock:
+        if _stats['pending'] >= PASSWORD_WORKERS + PASSWORD_QUEUE_LIMIT:
+            _stats['rejected'] += 1
+            raise HTTPException(status_code=503, detail='Too many password operations in progress, try again shortly')
+        _stats['pending'] += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, _tracked, func, *args)
+    finally:
+        with _stats_lock:
+            _stats['pending'] -= 1
+
+
+async def hash_password(password: str) -> str:
+    return await _run_in_pool(bcrypt_context.hash, password)
+
+
+async def verify_password(password: str, hashed_password: str):
+    """
+    Verifies a password in the worker pool.
+    Returns (valid, new_hash); new_hash is set when the stored hash uses outdated cost parameters.
+    """
+    valid, new_hash = await _run_in_pool(bcrypt_context.verify_and_update, password, hashed_password)
+    if valid and new_hash:
+        with _stats_lock:
+            _stats['rehashed'] += 1
+    return valid, new_hash
+
+
+def get_password_pool_stats():
+    with _stats_lock:
+        return {
+            'workers': PASSWORD_WORKERS,
+            'queue_limit': PASSWORD_QUEUE_LIMIT,
+            'running': _stats['running'],
+            'queued': _stats['pending'] - _stats['running'],
+            'completed': _stats['completed'],
+            'rejected': _stats['rejected'],
+            'rehashed': _stats['rehashed'],
+        }
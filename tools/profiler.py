@@ -0,0 +1,149 @@
+"""Request profiling module"""
+import asyncio
+import json
+import os
+import random
+import re
+import secrets
+import time
+
+from dotenv import load_dotenv
+from pyinstrument import Profiler
+from pyinstrument.renderers import HTMLRenderer, SpeedscopeRenderer
+from pyinstrument.session import Session
+
+from database import get_redis_connection, close_redis_connection
+from tools import request_stats
+from tools.metrics import route_template
+
+load_dotenv()
+
+PROFILES_DIR = os.getenv("PROFILES_DIR", "logs/profiles")
+PROFILES_KEEP = int(os.getenv("PROFILES_KEEP", "200"))
+PROFILE_CONFIG_KEY = 'profiling:config'
+PROFILE_CONFIG_REFRESH_SECONDS = 10
+PROFILE_ID_PATTERN = re.compile(r'^[0-9]+-[0-9a-f]{8}$')
+
+DEFAULT_CONFIG = {
+    'enabled': os.getenv("PROFILING_ENABLED", "False") == "True",
+    'sample_rate': float(os.getenv("PROFILE_SAMPLE_RATE", "0.01")),
+    'slow_ms': float(os.getenv("PROFILE_SLOW_MS", "1000")),
+}
+
+_config = dict(DEFAULT_CONFIG)
+_config_state = {'loaded_at': 0.0}
+
+
+async def get_profiling_config():
+    # Admin changes go through Redis so every worker picks them up within PROFILE_CONFIG_REFRESH_SECONDS
+    now = time.monotonic()
+    if now - _config_state['loaded_at'] < PROFILE_CONFIG_REFRESH_SECONDS:
+        return _config
+
+    _config_state['loaded_at'] = now
+    redis = await get_redis_connection()
+    try:
+        stored = await redis.get(PROFILE_CONFIG_KEY)
+    except Exception as e:
+        print(f"Error loading profiling config: {e}")
+        stored = None
+    finally:
+        await close_redis_connection(redis)
+
+    _config.clear()
+    _config.update(DEFAULT_CONFIG)
+    if stored:
+        _config.update(json.loads(stored))
+    return _config
+
+
+async def set_profiling_config(enabled: bool, sample_rate: float, slow_ms: float):
+    config = {'enabled': enabled, 'sample_rate': sample_rate, 'slow_ms': slow_ms}
+    redis = await get_redis_connection()
+    try:
+        await redis.set(PROFILE_CONFIG_KEY, json.dumps(config))
+    finally:
+        await close_redis_connection(redis)
+    _config_state['loaded_at'] = 0.0
+    return config
+
+
+def _save_profile(session, metadata):
+    os.makedirs(PROFILES_DIR, exist_ok=True)
+    session.save(os.path.join(PROFILES_DIR, f"{metadata['id']}.pyisession"))
+    with open(os.path.join(PROFILES_DIR, f"{metadata['id']}.json"), 'w') as file:
+        json.dump(metadata, file)
+
+    stored = sorted(name for name in os.listdir(PROFILES_DIR) if name.endswith('.json'))
+    for name in stored[:max(len(stored) - PROFILES_KEEP, 0)]:
+        profile_id = name[:-len('.json')]
+        for extension in ('.json', '.pyisession'):
+            path = os.path.join(PROFILES_DIR, profile_id + extension)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+async def profile_request(request, call_next):
+    config = await get_profiling_config()
+    if not config['enabled'] or request.url.path.startswith('/admin/profiles'):
+        return await call_next(request)
+
+    sampled = random.random() < config['sample_rate']
+    # A slow request can't be known in advance, so with a threshold set every request is profiled
+    # and only the slow (or sampled) ones are kept.
+    if not sampled and config['slow_ms'] <= 0:
+        return await call_next(request)
+
+    profiler = Profiler(async_mode='enabled')
+    start = time.perf_counter()
+    status_code = 500
+    profiler.start()
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        session = profiler.stop()
+        duration_ms = (time.perf_counter() - start) * 1000
+        if sampled or (config['slow_ms'] > 0 and duration_ms >= config['slow_ms']):
+            stats = request_stats.get_current_stats()
+            metadata = {
+                'id': f"{int(time.time() * 1000)}-{secrets.token_hex(4)}",
+                'method': request.method,
+                'route': route_template(request),
+                'path': request.url.path,
+                'status': status_code,
+                'duration_ms': round(duration_ms, 1),
+                'queries': stats['queries'] if stats else None,
+                'db_ms': round(stats['db_seconds'] * 1000, 1) if stats else None,
+                'reason': 'sampled' if sampled else 'slow',
+                'created_at': time.time(),
+            }
+            await asyncio.to_thread(_save_profile, session, metadata)
+
+
+def list_profiles():
+    if not os.path.isdir(PROFILES_DIR):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(PROFILES_DIR), reverse=True):
+        if name.endswith('.json'):
+            with open(os.path.join(PROFILES_DIR, name)) as file:
+                profiles.append(json.load(file))
+    return profiles
+
+
+def render_profile(profile_id: str, output_format: str):
+    """
+    Renders a stored profile as a self-contained HTML page or as speedscope JSON.
+    Returns None when the id is malformed or unknown.
+    """
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    path = os.path.join(PROFILES_DIR, f"{profile_id}.pyisession")
+    if not os.path.exists(path):
+        return None
+
+    session = Session.load(path)
+    renderer = SpeedscopeRenderer() if output_format == 'speedscope' else HTMLRenderer()
+    return renderer.render(session)
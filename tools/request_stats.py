@@ -0,0 +1,95 @@
+"""Per-request statistics module"""
+import logging
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Warn when one request runs the same statement shape more than this many times (typical N+1 loop)
+QUERY_REPEAT_WARN = int(os.getenv("QUERY_REPEAT_WARN", "20"))
+
+logger = logging.getLogger('mancave.queries')
+
+_current_stats = ContextVar('request_stats', default=None)
+
+
+def _new_stats(parent=None):
+    return {'queries': 0, 'db_seconds': 0.0, 'statements': Counter(), 'parent': parent}
+
+
+def start_request():
+    # a request served inside count_queries() (a test calling the app) also counts towards the enclosing block
+    stats = _new_stats(_current_stats.get())
+    return stats, _current_stats.set(stats)
+
+
+def end_request(token):
+    _current_stats.reset(token)
+
+
+def get_current_stats():
+    return _current_stats.get()
+
+
+def server_timing_header(stats, total_seconds: float) -> str:
+    return 'db;dur={:.1f};desc="{} queries", app;dur={:.1f}'.format(
+        stats['db_seconds'] * 1000, stats['queries'], total_seconds * 1000)
+
+
+def repeated_statements(stats, threshold: int = QUERY_REPEAT_WARN):
+    return [(statement, count) for statement, count in stats['statements'].most_common() if count > threshold]
+
+
+def warn_repeated_statements(stats, route: str):
+    for statement, count in repeated_statements(stats):
+        logger.warning("Possible N+1 on %s: statement ran %d times: %s", route, count, ' '.join(statement.split()))
+
+
+@contextmanager
+def count_queries():
+    """
+    Counts the statements run inside the block, outside of any HTTP request.
+    Intended for tests and benchmarks: `with count_queries() as stats: ...; stats['queries']`.
+    """
+    stats = _new_stats(_current_stats.get())
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+@contextmanager
+def assert_max_queries(max_queries: int):
+    """
+    Fails with the most repeated statements when the block runs more than max_queries statements.
+    Lets a test pin an endpoint's query budget so N+1 regressions fail CI.
+    """
+    with count_queries() as stats:
+        yield stats
+    if stats['queries'] > max_queries:
+        top = '\n'.join(f"  {count}x {' '.join(statement.split())[:200]}"
+                        for statement, count in stats['statements'].most_common(5))
+        raise AssertionError(f"Expected at most {max_queries} queries, ran {stats['queries']}:\n{top}")
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start_time'].pop()
+    # background threads (action log writer, sampler) are not part of any request and have no stats
+    stats = _current_stats.get()
+    while stats is not None:
+        stats['queries'] += 1
+        stats['db_seconds'] += elapsed
+        # statements are parameterized, so the SQL text itself is the statement shape
+        stats['statements'][statement] += 1
+        stats = stats['parent']
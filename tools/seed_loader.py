@@ -0,0 +1,142 @@
+"""Seed loader module
+
+Loads the reference data in sql/components. Every file runs in a single transaction, so a failing statement leaves
+nothing of its file behind. Applied files are recorded in seed_files with their checksum; a rerun skips files that
+have not changed since.
+"""
+import hashlib
+import os
+import re
+import time
+
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert
+
+import database
+from models import SeedFile
+
+DOLLAR_QUOTE_TAG = re.compile(r'\$(?:[A-Za-z_][A-Za-z0-9_]*)?\$')
+
+
+def _skip_quoted(sql: str, position: int, quote: str, backslash_escapes: bool = False) -> int:
+    """Returns the position after the literal or identifier starting at `position`; doubled quotes are escapes."""
+    position += 1
+    while position < len(sql):
+        char = sql[position]
+        if backslash_escapes and char == '\\':
+            position += 2
+            continue
+        if char == quote:
+            if sql.startswith(quote * 2, position):
+                position += 2
+                continue
+            return position + 1
+        position += 1
+    return position
+
+
+def _skip_block_comment(sql: str, position: int) -> int:
+    # PostgreSQL block comments nest
+    depth, position = 1, position + 2
+    while position < len(sql) and depth:
+        if sql.startswith('/*', position):
+            depth, position = depth + 1, position + 2
+        elif sql.startswith('*/', position):
+            depth, position = depth - 1, position + 2
+        else:
+            position += 1
+    return position
+
+
+def split_sql_statements(sql: str) -> list:
+    """
+    Splits a script on the semicolons that end statements, leaving alone the ones inside string literals (including
+    E'' and dollar quoted strings), quoted identifiers and comments. Statements that are only comments are dropped.
+    """
+    statements = []
+    start, position, has_code = 0, 0, False
+    while position < len(sql):
+        char = sql[position]
+        previous = sql[position - 1] if position else ''
+
+        if sql.startswith('--', position):
+            newline = sql.find('\n', position)
+            position = len(sql) if newline == -1 else newline + 1
+        elif sql.startswith('/*', position):
+            position = _skip_block_comment(sql, position)
+        elif char == "'":
+            escape_string = previous != '' and previous in 'eE' and not (position > 1 and (sql[position - 2].isalnum()
+                                                                         or sql[position - 2] == '_'))
+            position = _skip_quoted(sql, position, "'", escape_string)
+            has_code = True
+        elif char == '"':
+            position = _skip_quoted(sql, position, '"')
+            has_code = True
+        elif char == '$' and not (previous.isalnum() or previous == '_') \
+                and (tag := DOLLAR_QUOTE_TAG.match(sql, position)):
+            end = sql.find(tag.group(0), tag.end())
+            position = len(sql) if end == -1 else end + len(tag.group(0))
+            has_code = True
+        elif char == ';':
+            if has_code:
+                statements.append(sql[start:position].strip())
+            start, position, has_code = position + 1, position + 1, False
+        else:
+            has_code = has_code or not char.isspace()
+            position += 1
+
+    if has_code:
+        statements.append(sql[start:].strip())
+    return statements
+
+
+def load_sql_file(file_path: str, force: bool = False):
+    """
+    Runs one seed file in a transaction and records it in seed_files. Unchanged files are skipped unless forced.
+    Returns {"file", "status": applied/skipped/failed, "statements", "ms", "error"}.
+    """
+    with open(file_path, 'rb') as file:
+        content = file.read()
+    checksum = hashlib.sha256(content).hexdigest()
+    filename = os.path.basename(file_path)
+    result = {"file": file_path, "status": "skipped", "statements": 0, "ms": 0.0, "error": None}
+
+    start = time.perf_counter()
+    try:
+        with database.engine.begin() as conn:
+            applied_checksum = conn.execute(select(SeedFile.checksum).where(SeedFile.filename == filename)).scalar()
+            if applied_checksum == checksum and not force:
+                return result
+
+            statements = split_sql_statements(content.decode('utf-8'))
+            for statement in statements:
+                # straight to the driver, so colons and percent signs in the data are not taken for parameters
+                conn.exec_driver_sql(statement)
+
+            duration_ms = round((time.perf_counter() - start) * 1000, 2)
+            values = {"checksum": checksum, "statements": len(statements), "duration_ms": duration_ms}
+            conn.execute(
+                insert(SeedFile).values(filename=filename, **values)
+                .on_conflict_do_update(index_elements=[SeedFile.filename],
+                                       set_={**values, "applied_at": func.now()})
+            )
+        result.update({"status": "applied", "statements": len(statements), "ms": duration_ms})
+        print(f"{file_path} loaded successfully: {len(statements)} statements in {duration_ms} ms")
+    except Exception as e:
+        result.update({"status": "failed", "error": str(e), "ms": round((time.perf_counter() - start) * 1000, 2)})
+        print(f"Error occurred while executing {file_path}: {e}")
+    return result
+
+
+def summarize_results(results):
+    return {
+        "files": results,
+        "applied": sum(1 for result in results if result["status"] == "applied"),
+        "skipped": sum(1 for result in results if result["status"] == "skipped"),
+        "failed": sum(1 for result in results if result["status"] == "failed"),
+        "ms": round(sum(result["ms"] for result in results), 2),
+    }
+
+
+def load_sql_files(file_paths, force: bool = False):
+    return summarize_results([load_sql_file(file_path, force) for file_path in file_paths])
@@ -0,0 +1,110 @@
+"""Token cache module"""
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+
+from database import get_redis_connection, close_redis_connection
+
+TOKEN_CACHE_SECONDS = int(os.getenv("TOKEN_CACHE_SECONDS", "30"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+REVOCATION_CHANNEL = 'auth:revoked'
+
+# sha256(token) -> (claims, cached_until). Per worker, never shared.
+_claims_cache = OrderedDict()
+# jti -> token expiry timestamp. Entries are dropped once the token would have expired anyway.
+_revoked = {}
+_listener = {'healthy': False}
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def get_cached_claims(token: str):
+    key = _token_key(token)
+    entry = _claims_cache.get(key)
+    if entry is None:
+        return None
+
+    claims, cached_until = entry
+    now = time.time()
+    if cached_until < now or claims['exp'] < now:
+        _claims_cache.pop(key, None)
+        return None
+    return claims
+
+
+def cache_claims(token: str, claims: dict):
+    _claims_cache[_token_key(token)] = (claims, time.time() + TOKEN_CACHE_SECONDS)
+    while len(_claims_cache) > TOKEN_CACHE_SIZE:
+        _claims_cache.popitem(last=False)
+
+
+def mark_revoked(jti: str, expiration: float):
+    _revoked[jti] = expiration
+
+
+def _prune_revoked():
+    now = time.time()
+    for jti in [jti for jti, expiration in _revoked.items() if expiration < now]:
+        del _revoked[jti]
+
+
+async def is_revoked(jti: str) -> bool:
+    if jti in _revoked:
+        return True
+    if _listener['healthy']:
+        return False
+
+    # Without a live subscription we could miss a logout from another worker, so ask Redis directly.
+    redis = await get_redis_connection()
+    try:
+        return bool(await redis.exists(f"blacklist:{jti}"))
+    finally:
+        await close_redis_connection(redis)
+
+
+async def publish_revocation(redis, jti: str, expiration: float):
+    mark_revoked(jti, expiration)
+    await redis.publish(REVOCATION_CHANNEL, f"{jti}:{expiration}")
+
+
+async def _load_blacklist(redis):
+    now = time.time()
+    async for key in redis.scan_iter(match="blacklist:*"):
+        ttl = await redis.ttl(key)
+        if ttl > 0:
+            mark_revoked(key.split(":", 1)[1], now + ttl)
+
+
+async def revocation_listener():
+    """
+    Keeps the local revocation set in sync with /auth/logout calls made on any worker.
+    Runs for the lifetime of the app; is_revoked falls back to Redis while the subscription is down.
+    """
+    while True:
+        redis = await get_redis_connection()
+        pubsub = redis.pubsub()
+        try:
+            await pubsub.subscribe(REVOCATION_CHANNEL)
+            # Subscribe first, then load existing entries, so nothing revoked in between is lost.
+            await _load_blacklist(redis)
+            _listener['healthy'] = True
+
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message:
+                    jti, expiration = message['data'].rsplit(':', 1)
+                    mark_revoked(jti, float(expiration))
+                _prune_revoked()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Token revocation listener error: {e}")
+            await asyncio.sleep(5)
+        finally:
+            _listener['healthy'] = False
+            await pubsub.close()
+            await close_redis_connection(redis)
@@ -0,0 +1,197 @@
+"""Uploads module"""
+import hashlib
+import os
+import re
+import secrets
+
+import aiofiles
+from fastapi import HTTPException
+from PIL import Image, ImageOps
+from sqlalchemy import or_
+from sqlalchemy.dialects.postgresql import insert
+
+from models import StoredFile, FileReference
+
+UPLOAD_DIRS = {
+    'doc': os.path.join("uploads", "documents"),
+    'img': os.path.join("uploads", "images"),
+}
+VARIANTS_DIR = os.path.join("uploads", "images", "variants")
+MAX_UPLOAD_BYTES = {
+    'doc': int(os.getenv("MAX_DOC_UPLOAD_MB", "512")) * 1024 * 1024,
+    'img': int(os.getenv("MAX_IMG_UPLOAD_MB", "25")) * 1024 * 1024,
+}
+CHUNK_SIZE = 1024 * 1024
+# longest side in pixels; thumbnails for list views, web for item pages
+IMAGE_VARIANTS = {
+    'thumb': int(os.getenv("THUMBNAIL_SIZE", "256")),
+    'web': int(os.getenv("WEB_IMAGE_SIZE", "1280")),
+}
+VARIANT_QUALITY = 82
+EXTENSION_PATTERN = re.compile(r'^[a-z0-9]{1,10}$')
+SHA256_PATTERN = '^[0-9a-f]{64}$'
+UPLOADS_ROOT = "uploads"
+SERVED_DIRS = {UPLOAD_DIRS['doc'], UPLOAD_DIRS['img'], VARIANTS_DIR}
+SERVED_NAME_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.-]*$')
+# content addressed names never change, anything else may be replaced under the same name
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+MUTABLE_CACHE_CONTROL = "private, max-age=3600"
+# '' serves files from the app, 'x-accel-redirect' (nginx) or 'x-sendfile' (apache, caddy) hand them to the proxy
+FILES_OFFLOAD = os.getenv("FILES_OFFLOAD", "").lower()
+FILES_ACCEL_PREFIX = os.getenv("FILES_ACCEL_PREFIX", "/internal-uploads/")
+# item columns holding upload paths; photos may hold several, comma separated
+FILE_FIELDS = {
+    'hardware': ('photos', 'user_manual', 'invoice'),
+    'software': ('photo',),
+    'book': (),
+}
+
+
+async def save_upload(upload, directory: str, max_bytes: int):
+    """
+    Copies an upload into `directory` chunk by chunk under a temporary name, hashing as it goes, so memory use stays
+    at one chunk whatever the file size. Returns (temporary path, size, sha256 hex digest); the partial file is
+    removed if the size limit is exceeded.
+    """
+    os.makedirs(directory, exist_ok=True)
+    partial_path = os.path.join(directory, f".{secrets.token_hex(8)}.part")
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        async with aiofiles.open(partial_path, "wb") as file_object:
+            while chunk := await upload.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413,
+                                        detail=f"File too large, the limit is {max_bytes // (1024 * 1024)} MB")
+                digest.update(chunk)
+                await file_object.write(chunk)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+    return partial_path, size, digest.hexdigest()
+
+
+def file_extension(filename: str) -> str:
+    extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    return extension if EXTENSION_PATTERN.match(extension) else "bin"
+
+
+def content_path(file_type: str, sha256: str, extension: str) -> str:
+    return os.path.join(UPLOAD_DIRS[file_type], f"{sha256}.{extension}")
+
+
+def resolve_served_path(relative_path: str):
+    """Maps a path below uploads/ to a servable file, or None; hidden, partial and out-of-tree names never match."""
+    directory, _, name = relative_path.rpartition("/")
+    path = os.path.join(UPLOADS_ROOT, directory, name) if directory else os.path.join(UPLOADS_ROOT, name)
+    if os.path.dirname(path) not in SERVED_DIRS or not SERVED_NAME_PATTERN.match(name) or not os.path.isfile(path):
+        return None
+    return path
+
+
+def content_hash(path: str):
+    """The sha256 a content addressed file is named after, or None for legacy and variant names."""
+    stem = os.path.basename(path).split(".", 1)[0]
+    return stem if re.match(SHA256_PATTERN, stem) else None
+
+
+def find_stored_file(db, sha256: str):
+    """The stored file for a hash, or None if it is unknown or its file has gone missing from disk."""
+    stored_file = db.get(StoredFile, sha256)
+    if stored_file is None or not os.path.exists(stored_file.path):
+        return None
+    return stored_file
+
+
+def store_file(db, temp_path: str, sha256: str, file_type: str, extension: str, size: int) -> str:
+    """
+    Moves a finished upload to its content addressed path and records it, returns the path. When the same content
+    was stored meanwhile (two uploads racing) the existing path wins; the caller commits.
+    """
+    path = content_path(file_type, sha256, extension)
+    os.replace(temp_path, path)
+    inserted = db.execute(
+        insert(StoredFile)
+        .values(sha256=sha256, path=path, file_type=file_type, size=size)
+        .on_conflict_do_nothing(index_elements=[StoredFile.sha256])
+        .returning(StoredFile.path)
+    ).scalar()
+    if inserted is not None:
+        return path
+
+    existing_path = db.query(StoredFile.path).filter(StoredFile.sha256 == sha256).scalar()
+    if existing_path != path:
+        if os.path.exists(existing_path):
+            os.remove(path)
+            return existing_path
+        # the recorded file is gone from disk, the new copy replaces it
+        db.query(StoredFile).filter(StoredFile.sha256 == sha256).update({'path': path, 'size': size})
+    return path
+
+
+def split_paths(value):
+    return [path.strip() for path in value.split(",") if path.strip()] if value else []
+
+
+def upload_name(value: str) -> str:
+    """
+    The file name an item field points at. Items hold upload paths in several forms, uploads/images/<name>,
+    /files/uploads/images/<name> (the URL), ./uploads/images/<name> or just <name>; the name is what they share.
+    """
+    return os.path.basename(value.split("?", 1)[0].rstrip("/"))
+
+
+def sync_file_references(db, item_type: str, item_id: int, item):
+    """Re-links an item to the stored files named in its file fields, without committing."""
+    remove_file_references(db, item_type, item_id)
+    names = {(field, upload_name(path))
+             for field in FILE_FIELDS[item_type] for path in split_paths(getattr(item, field))}
+    if not names:
+        return
+
+    # files uploaded before content addressing have no stored_files row and are simply not counted
+    wanted = {name for _, name in names}
+    candidate_paths = {os.path.join(directory, name) for directory in UPLOAD_DIRS.values() for name in wanted}
+    candidate_hashes = {content_hash(name) for name in wanted} - {None}
+    stored = db.query(StoredFile.path, StoredFile.sha256).filter(
+        or_(StoredFile.path.in_(candidate_paths), StoredFile.sha256.in_(candidate_hashes))).all()
+    hashes_by_name = {os.path.basename(path): sha256 for path, sha256 in stored}
+    known_hashes = {sha256 for _, sha256 in stored}
+
+    # two spellings of the same file in one field are still one reference
+    references = set()
+    for field, name in names:
+        sha256 = hashes_by_name.get(name) or content_hash(name)
+        if sha256 in known_hashes:
+            references.add((field, sha256))
+    for field, sha256 in references:
+        db.add(FileReference(sha256=sha256, item_type=item_type, item_id=item_id, field=field))
+
+
+def remove_file_references(db, item_type: str, item_id: int):
+    db.query(FileReference).filter(FileReference.item_type == item_type, FileReference.item_id == item_id).delete()
+
+
+def variant_path(image_path: str, variant: str) -> str:
+    name = os.path.splitext(os.path.basename(image_path))[0]
+    return os.path.join(VARIANTS_DIR, f"{name}_{variant}.webp")
+
+
+def generate_image_variants(image_path: str):
+    # runs as a background task (in the threadpool), after the upload response has been sent
+    try:
+        with Image.open(image_path) as image:
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+            os.makedirs(VARIANTS_DIR, exist_ok=True)
+            for variant, max_side in IMAGE_VARIANTS.items():
+                resized = image.copy()
+                resized.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+                resized.save(variant_path(image_path, variant), "WEBP", quality=VARIANT_QUALITY)
+    except Exception as e:
+        print(f"Error generating image variants for {image_path}: {e}")